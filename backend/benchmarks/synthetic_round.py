@@ -0,0 +1,345 @@
+'''
+Render synthetic target rounds with a known ground truth.
+
+A model image is warped into each frame with a random homography, then camera shake,
+lighting changes and sensor noise are applied. Arrows are drawn at known positions on the target,
+each from a known frame onwards, their shafts lying on the target's plane so they move along with it.
+
+Usage (from the backend directory):
+    python -m benchmarks.synthetic_round <output video> [--model olympic_standard_target] [--model-document <json>] \
+        [--model-image <path>] [--seed 0] [--frames 240] [--arrows 3] [--width 1280] [--height 720] \
+        [--shake 3] [--lighting 0.05] [--spread 0.6]
+
+Writes the video and its ground truth next to it (<output video>.json).
+'''
+
+from project.core.target_scoring.TargetModel import get_target_model_path
+from project.core.target_scoring.ModelFeatures import load_model_image
+import numpy as np
+import argparse
+import json
+import os
+import cv2
+
+FPS = 30
+FRAME_SIZE = (1280, 720)
+FRAMES_AMOUNT = 240
+ARROWS_AMOUNT = 3
+SHAKE_PX = 3.0
+LIGHTING_VARIATION = 0.05
+ARROWS_SPREAD = 0.6
+NOISE_LEVEL = 3
+# bumped whenever the rendering changes, so rounds rendered by an older version are not reused
+ROUND_VERSION = 2
+BACKGROUND_COLOR = (90, 90, 90)
+ARROW_COLOR = (20, 20, 20)
+# the part of each shaft within the outer ring [fraction of its radius]
+MIN_SHAFT_IN_RING = 0.8
+# the distance between parallel shafts, so they're found as separate hits [inner diameters]
+MIN_SHAFTS_GAP = 1.2
+# attempts at placing an arrow before the round is given up on
+MAX_PLACEMENT_ATTEMPTS = 10000
+RES_INPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'project', 'core', 'res', 'input')
+
+def load_model(modelName=None, documentPath=None, imagePath=None):
+    '''
+    Load a target model and its image without depending on the database or the network,
+    when the image is available locally.
+
+    Parameters:
+        {String} modelName - The name of a model in TargetModel
+        {String} documentPath - A JSON export of a model_collection document (used instead of modelName)
+        {String} imagePath - A local model image (the document's model_path is used if None)
+
+    Returns:
+        {Dict} The model document.
+        {Numpy.array} The model image [BGR].
+    '''
+
+    if documentPath is not None:
+        with open(documentPath) as document_file:
+            model_data = json.load(document_file)
+    else:
+        model_data = get_target_model_path(modelName)
+
+    if imagePath is None:
+        # the container paths of the bundled models are resolved against this checkout
+        bundled_path = os.path.join(RES_INPUT_DIR, os.path.basename(model_data['model_path']))
+        if os.path.isfile(model_data['model_path']):
+            imagePath = model_data['model_path']
+        elif os.path.isfile(bundled_path):
+            imagePath = bundled_path
+
+    model = cv2.imread(imagePath) if imagePath is not None else load_model_image(model_data['model_path'])
+    if model is None:
+        raise FileNotFoundError(f"could not load the model image of {model_data.get('model', documentPath)}")
+
+    return model_data, model
+
+def hit_score(modelPoint, modelData):
+    '''
+    Parameters:
+        {Tuple} modelPoint - A point on the model image (x, y)
+        {Dict} modelData - The model document
+
+    Returns:
+        {Number} The score of a hit at the point, by the same ring rule as the scoring pipeline.
+    '''
+
+    distance = np.hypot(modelPoint[0] - modelData['bullseye_point'][0], modelPoint[1] - modelData['bullseye_point'][1])
+    score = 10 - int(distance / modelData['inner_diameter_px'])
+    return score if score >= 10 - modelData['rings_amount'] + 1 else 0
+
+def random_base_homography(rng, modelShape, frameSize):
+    '''
+    Place the model in the frame with a random size, rotation, position and perspective.
+
+    Parameters:
+        {Generator} rng - The random generator of the round
+        {Tuple} modelShape - The shape of the model image
+        {Tuple} frameSize - The size of the frames (width, height)
+
+    Returns:
+        {Numpy.array} (3,3) The homography from the model to the frame.
+    '''
+
+    model_h, model_w = modelShape[:2]
+    frame_h = frameSize[1]
+    corners = np.float32([[0, 0], [model_w, 0], [model_w, model_h], [0, model_h]])
+
+    # fit the target's height to a random part of the frame's height
+    size = frame_h * rng.uniform(0.5, 0.7)
+    scale = size / max(model_w, model_h)
+    angle = np.deg2rad(rng.uniform(-10, 10))
+    rotation = np.float32([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    placed = (corners - (model_w / 2, model_h / 2)) * scale @ rotation.T
+
+    # perspective, by moving each corner independently
+    placed += rng.uniform(-0.06, 0.06, placed.shape) * size
+
+    # keep the whole target within the frame, with room for the camera shake
+    margin = 0.05 * frame_h
+    low = -placed.min(axis=0) + margin
+    high = np.float32(frameSize) - placed.max(axis=0) - margin
+    placed += rng.uniform(low, np.maximum(low, high))
+
+    return cv2.getPerspectiveTransform(corners, np.float32(placed))
+
+def shaft_in_ring_length(modelPoint, direction, length, modelData):
+    '''
+    Parameters:
+        {Tuple} modelPoint - The tip of an arrow on the model image (x, y)
+        {Numpy.array} direction - The unit direction of the shaft from its tip on the model image (x, y)
+        {Number} length - The length of the shaft on the model image [px]
+        {Dict} modelData - The model document
+
+    Returns:
+        {Number} The length of the part of the shaft within the target's outer ring, on the model image [px].
+    '''
+
+    radius = modelData['inner_diameter_px'] * modelData['rings_amount']
+    relative = np.float64(modelPoint) - modelData['bullseye_point']
+    along = relative @ direction
+    exit_distance = -along + np.sqrt(max(0, along ** 2 - relative @ relative + radius ** 2))
+    return min(length, exit_distance)
+
+def random_arrows(rng, modelData, modelSize, arrowsAmount, framesAmount, spread=ARROWS_SPREAD):
+    '''
+    Shoot arrows whose shafts lie in a common direction on the target's plane,
+    as seen by a camera that is far away from the target and off its axis.
+    Each shaft points away from the bull'seye and lies within the outer ring for
+    at least MIN_SHAFT_IN_RING of its radius, so it's long enough to be found as a straight segment,
+    and is at least MIN_SHAFTS_GAP away from the lines of the other shafts.
+    Shafts that would be longer are cut at the outer ring.
+
+    Parameters:
+        {Generator} rng - The random generator of the round
+        {Dict} modelData - The model document
+        {Number} modelSize - The size of the model image [px]
+        {Number} arrowsAmount - Amount of arrows to shoot
+        {Number} framesAmount - Amount of frames in the round
+        {Number} spread - The radius the arrows land within [fraction of the target's outer ring]
+
+    Raises:
+        {ValueError} If the arrows don't fit on the target.
+
+    Returns:
+        {List} The ground truth of the arrows, sorted by frame [
+                   {Dict} {
+                              "frame": The first frame the arrow appears in,
+                              "model_point": The tip of the arrow on the model image [x, y],
+                              "model_nock": The rear of the shaft on the model image [x, y],
+                              "score": The score of the arrow,
+                              "length": The length of the shaft [fraction of the model's size]
+                          }
+                   ...
+               ]
+    '''
+
+    # arrows are shot at a regular pace, leaving time to verify the last one
+    spacing = framesAmount / (arrowsAmount + 1)
+    outer_radius = modelData['inner_diameter_px'] * modelData['rings_amount']
+    max_radius = outer_radius * spread
+    bullseye = modelData['bullseye_point']
+    shaft_angle = rng.uniform(0, 2 * np.pi)
+    direction = np.float64([np.cos(shaft_angle), np.sin(shaft_angle)])
+    normal = np.float64([-direction[1], direction[0]])
+    min_gap = MIN_SHAFTS_GAP * modelData['inner_diameter_px']
+    arrows = []
+
+    for index in range(arrowsAmount):
+        length = rng.uniform(0.4, 0.55) * modelSize
+
+        for _ in range(MAX_PLACEMENT_ATTEMPTS):
+            radius = max_radius * np.sqrt(rng.uniform(0, 1))
+            angle = rng.uniform(0, 2 * np.pi)
+            model_point = [float(bullseye[0] + radius * np.cos(angle)), float(bullseye[1] + radius * np.sin(angle))]
+
+            outwards = (np.float64(model_point) - bullseye) @ direction >= 0
+            in_ring = (shaft_in_ring_length(model_point, direction, length, modelData)
+                       >= MIN_SHAFT_IN_RING * outer_radius)
+            apart = all(abs((np.float64(model_point) - arrow['model_point']) @ normal) >= min_gap for arrow in arrows)
+            if outwards and in_ring and apart:
+                break
+        else:
+            raise ValueError(f"{arrowsAmount} arrows don't fit within a spread of {spread}")
+
+        # the rear of the shaft is cut at the outer ring, beyond it the shaft would only hide the corners of the model
+        length = shaft_in_ring_length(model_point, direction, length, modelData)
+
+        arrows.append({
+            "frame": int(spacing * (index + 0.5) + rng.uniform(0, spacing / 2)),
+            "model_point": model_point,
+            "model_nock": [float(model_point[0] + direction[0] * length), float(model_point[1] + direction[1] * length)],
+            "score": hit_score(model_point, modelData),
+            "length": float(length / modelSize)
+        })
+
+    return arrows
+
+def draw_arrow(frame, arrow, homography, targetSize):
+    '''
+    Draw an arrow stuck in the target, its shaft lying on the target's plane.
+
+    Parameters:
+        {Numpy.array} frame - The frame to draw on
+        {Dict} arrow - The ground truth of the arrow
+        {Numpy.array} homography - (3,3) The homography from the model to the frame
+        {Number} targetSize - The size of the target in the frame [px]
+    '''
+
+    tip, nock = cv2.perspectiveTransform(np.float32([[arrow['model_point'], arrow['model_nock']]]), homography)[0]
+    thickness = max(5, int(round(targetSize / 60)))
+
+    cv2.line(frame, tuple(np.int32(np.round(tip))), tuple(np.int32(np.round(nock))), ARROW_COLOR, thickness)
+
+def generate_round(outputPath, modelData, model, seed=0, framesAmount=FRAMES_AMOUNT, arrowsAmount=ARROWS_AMOUNT,
+                   frameSize=FRAME_SIZE, shake=SHAKE_PX, lighting=LIGHTING_VARIATION, spread=ARROWS_SPREAD, fps=FPS):
+    '''
+    Render a synthetic round.
+
+    Parameters:
+        {String} outputPath - The path of the output video
+        {Dict} modelData - The model document
+        {Numpy.array} model - The model image
+        {Number} seed - The seed of the round, the same seed renders the same round
+        {Number} framesAmount - Amount of frames in the round
+        {Number} arrowsAmount - Amount of arrows to shoot
+        {Tuple} frameSize - The size of the frames (width, height)
+        {Number} shake - The amplitude of the camera shake [px]
+        {Number} lighting - The amplitude of the lighting changes [fraction of the brightness]
+        {Number} spread - The radius the arrows land within [fraction of the target's outer ring]
+        {Number} fps - The frame rate of the output video
+
+    Returns:
+        {Dict} The ground truth of the round {
+                   "frames": Amount of frames,
+                   "fps": The frame rate,
+                   "bullseye": The bull'seye point in the last frame [x, y],
+                   "arrows": The arrows (see random_arrows), with the tip in the last frame as "point" [x, y]
+               }
+    '''
+
+    rng = np.random.default_rng(seed)
+    frame_w, frame_h = frameSize
+    model_h, model_w = model.shape[:2]
+
+    base_homography = random_base_homography(rng, model.shape, frameSize)
+    arrows = random_arrows(rng, modelData, max(model_w, model_h), arrowsAmount, framesAmount, spread)
+    corners = np.float32([[[0, 0], [model_w, 0], [model_w, model_h], [0, model_h]]])
+    target_size = np.sqrt(cv2.contourArea(cv2.perspectiveTransform(corners, base_homography)))
+
+    # smooth random motions, a slow drift of the camera plus a faster tremble
+    shake_phases = rng.uniform(0, 2 * np.pi, 4)
+    drift = rng.uniform(-1, 1, 2) * shake / framesAmount
+    lighting_phase = rng.uniform(0, 2 * np.pi)
+    lighting_step = rng.integers(framesAmount // 4, 3 * framesAmount // 4)
+
+    out = cv2.VideoWriter(outputPath, cv2.VideoWriter_fourcc(*'mp4v'), fps, frameSize)
+    homography = base_homography
+
+    for frame_index in range(framesAmount):
+        offset = drift * frame_index + shake * np.array([
+            np.sin(frame_index / 7 + shake_phases[0]) + 0.5 * np.sin(frame_index / 2.3 + shake_phases[1]),
+            np.cos(frame_index / 5 + shake_phases[2]) + 0.5 * np.cos(frame_index / 1.7 + shake_phases[3])
+        ]) / 1.5
+        translation = np.array([[1, 0, offset[0]], [0, 1, offset[1]], [0, 0, 1]])
+        homography = translation @ base_homography
+
+        frame = np.empty((frame_h, frame_w, 3), np.uint8)
+        frame[:] = BACKGROUND_COLOR
+        cv2.warpPerspective(model, homography, frameSize, frame, borderMode=cv2.BORDER_TRANSPARENT)
+
+        for arrow in arrows:
+            if frame_index >= arrow['frame']:
+                draw_arrow(frame, arrow, homography, target_size)
+
+        # a slow change of brightness, and a step (a cloud passing by) halfway through the round
+        gain = 1 + lighting * np.sin(2 * np.pi * frame_index / framesAmount + lighting_phase)
+        if frame_index >= lighting_step:
+            gain -= lighting / 2
+
+        frame = cv2.convertScaleAbs(frame, alpha=gain, beta=0)
+        noise = rng.integers(0, NOISE_LEVEL + 1, frame.shape, dtype=np.uint8)
+        out.write(cv2.add(frame, noise))
+
+    out.release()
+
+    # the hits are reported relative to the target's position in the last frames
+    for arrow in arrows:
+        point = cv2.perspectiveTransform(np.float32([[arrow['model_point']]]), homography)[0][0]
+        arrow['point'] = [float(point[0]), float(point[1])]
+
+    bullseye = cv2.perspectiveTransform(np.float32([[modelData['bullseye_point']]]), homography)[0][0]
+    return {"frames": framesAmount, "fps": fps, "bullseye": [float(bullseye[0]), float(bullseye[1])], "arrows": arrows}
+
+def main():
+    parser = argparse.ArgumentParser(description='Render a synthetic target round with a known ground truth.')
+    parser.add_argument('output')
+    parser.add_argument('--model', default='olympic_standard_target', help='the name of a model in TargetModel')
+    parser.add_argument('--model-document', help='a JSON export of a model_collection document')
+    parser.add_argument('--model-image', help='a local image of the model')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--frames', type=int, default=FRAMES_AMOUNT)
+    parser.add_argument('--arrows', type=int, default=ARROWS_AMOUNT)
+    parser.add_argument('--width', type=int, default=FRAME_SIZE[0])
+    parser.add_argument('--height', type=int, default=FRAME_SIZE[1])
+    parser.add_argument('--shake', type=float, default=SHAKE_PX, help='amplitude of the camera shake [px]')
+    parser.add_argument('--lighting', type=float, default=LIGHTING_VARIATION,
+                        help='amplitude of the lighting changes [fraction of the brightness]')
+    parser.add_argument('--spread', type=float, default=ARROWS_SPREAD,
+                        help="radius the arrows land within [fraction of the target's outer ring]")
+    args = parser.parse_args()
+
+    model_data, model = load_model(args.model, args.model_document, args.model_image)
+    truth = generate_round(args.output, model_data, model, args.seed, args.frames, args.arrows,
+                           (args.width, args.height), args.shake, args.lighting, args.spread)
+
+    with open(f"{args.output}.json", 'w') as truth_file:
+        json.dump(truth, truth_file, indent=2)
+
+    for arrow in truth['arrows']:
+        print(f"frame {arrow['frame']}: {arrow['point']} score {arrow['score']}")
+
+if __name__ == '__main__':
+    main()
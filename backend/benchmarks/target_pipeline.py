@@ -0,0 +1,328 @@
+'''
+Accuracy and throughput benchmark of the target scoring pipeline, on synthetic rounds.
+
+Renders a set of rounds with benchmarks.synthetic_round, runs target_scoring.VideoAnalyzer on each of them
+and reports frames per second, the time of each stage, the peak memory and the hits' precision,
+recall and score error against the ground truth. Runs offline on the CPU only.
+
+Usage (from the backend directory):
+    python -m benchmarks.target_pipeline [--rounds 20] [--seed 0] [--frames 240] [--arrows 3] \
+        [--options '{"reconstruction": "raster"}'] [--no-draw] [--profile] [--workdir <dir>] [--report <json>] \
+        [--min-fps 0] [--min-precision 1] [--min-recall 0.9] [--max-score-error 10]
+
+Exits with a non zero status if any of the thresholds is not met, so it can gate performance and accuracy work.
+The precision and recall are gated by default, the rest of the thresholds only when they're given.
+'''
+
+from project.core.target_scoring.VideoAnalyzer import VideoAnalyzer
+from project.core.target_scoring.AnalysisConfig import AnalysisConfig, HIT_TOLERANCE_PX
+from project.core.target_scoring.Sketcher import Sketcher
+from project.core.target_scoring import Geometry2D as geo2D
+from project.core.Profiler import Profiler, profile_report
+from project.core.target_scoring.MotionGate import GateStats
+from benchmarks.synthetic_round import FPS, FRAMES_AMOUNT, ARROWS_AMOUNT, SHAKE_PX, LIGHTING_VARIATION, ARROWS_SPREAD, \
+    ROUND_VERSION, load_model, generate_round
+import tempfile
+import argparse
+import resource
+import json
+import time
+import sys
+import os
+import cv2
+
+ROUNDS_AMOUNT = 20
+# the default rounds have no false hits and almost no missed ones, so even a single false hit fails
+MIN_PRECISION = 1.0
+MIN_RECALL = .9
+
+def peak_rss_mb():
+    '''
+    Returns:
+        {Number} The peak resident memory of the process so far [MB].
+    '''
+
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def decode_video(videoPath):
+    '''
+    Decode a video without analyzing it, the baseline every other stage includes.
+
+    Parameters:
+        {String} videoPath - The path of the video
+
+    Returns:
+        {Number} Amount of decoded frames.
+    '''
+
+    cap = cv2.VideoCapture(videoPath)
+    frames_amount = 0
+    while cap.grab():
+        cap.retrieve()
+        frames_amount += 1
+
+    cap.release()
+    return frames_amount
+
+def frame_point(hit, analyzer):
+    '''
+    Parameters:
+        {Hit} hit - A verified hit
+        {VideoAnalyzer} analyzer - The analyzer that found the hit
+
+    Returns:
+        {Tuple} The hit's point in the last analyzed frame (x, y), before the target's oval was straightened.
+    '''
+
+    origin = analyzer.warped_vertices[0]
+    return ((hit.point[0] - origin[0]) / analyzer.scale[0] + origin[0],
+            (hit.point[1] - origin[1]) / analyzer.scale[1] + origin[1])
+
+def match_hits(truth, points, tolerance):
+    '''
+    Pair each ground truth arrow with the closest unpaired detected hit.
+
+    Parameters:
+        {List} truth - The ground truth arrows of the round
+        {List} points - The points of the detected hits in the last frame
+        {Number} tolerance - The maximum distance between an arrow and its hit [px]
+
+    Returns:
+        {List} [
+                  {Tuple} (
+                             {Dict} The ground truth arrow,
+                             {Number} The index of the paired hit (None if there is none)
+                          )
+                  ...
+               ]
+    '''
+
+    unpaired = list(range(len(points)))
+    pairs = []
+
+    for arrow in truth:
+        candidates = [index for index in unpaired if geo2D.euclidean_dist(arrow['point'], points[index]) <= tolerance]
+        match = min(candidates, key=lambda x: geo2D.euclidean_dist(arrow['point'], points[x]), default=None)
+        if match is not None:
+            unpaired.remove(match)
+
+        pairs.append((arrow, match))
+
+    return pairs
+
+def run_round(videoPath, truth, modelData, model, options, outputPath, tolerance, profiler=None):
+    '''
+    Analyze a synthetic round and measure it.
+
+    Parameters:
+        {String} videoPath - The path of the round's video
+        {Dict} truth - The ground truth of the round
+        {Dict} modelData - The model document
+        {Numpy.array} model - The model image
+        {Dict} options - The analysis options
+        {String} outputPath - The path of the processed video (None to skip drawing)
+        {Number} tolerance - The maximum distance between an arrow and its hit [px]
+        {Profiler} profiler - Times the stages within the analysis and the drawing, if given
+
+    Returns:
+        {Dict} The measurements of the round.
+    '''
+
+    stages = {}
+
+    start = time.perf_counter()
+    frames_amount = decode_video(videoPath)
+    stages['decode'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    config = AnalysisConfig(options)
+    gate_stats = GateStats()
+    analyzer = VideoAnalyzer(videoPath, model, modelData['bullseye_point'], modelData['rings_amount'],
+                             modelData['inner_diameter_px'], config, profiler=profiler, gateStats=gate_stats)
+    stages['setup'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hits = sorted(analyzer.collect_hits(truth['fps']), key=lambda x: x.frame_count)
+    stages['analysis'] = time.perf_counter() - start
+
+    if outputPath is not None:
+        start = time.perf_counter()
+        sketcher = Sketcher(modelData['inner_diameter_inch'] / modelData['inner_diameter_px'] * 2.54, 'cm')
+        analyzer.draw_hits(outputPath, sketcher, hits, analyzer.read_source_frames(), truth['fps'])
+        stages['drawing'] = time.perf_counter() - start
+
+    points = [frame_point(hit, analyzer) for hit in hits]
+    pairs = match_hits(truth['arrows'], points, tolerance)
+    matched = [(arrow, index) for arrow, index in pairs if index is not None]
+
+    return {
+        "frames": frames_amount,
+        "stages": stages,
+        "fps": frames_amount / (stages['setup'] + stages['analysis']),
+        "arrows": len(truth['arrows']),
+        "hits": len(hits),
+        "matched": len(matched),
+        "score_errors": [int(abs(hits[index].score - arrow['score'])) for arrow, index in matched],
+        "frame_delays": [int(hits[index].frame_count - arrow['frame']) for arrow, index in matched],
+        "position_errors": [float(geo2D.euclidean_dist(arrow['point'], points[index])) for arrow, index in matched],
+        "motion_gate": gate_stats.to_dict(),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def summarize(rounds):
+    '''
+    Parameters:
+        {List} rounds - The measurements of each round
+
+    Returns:
+        {Dict} The measurements of all of the rounds together.
+    '''
+
+    def mean(values):
+        return sum(values) / len(values) if values else 0
+
+    frames = sum(measurements['frames'] for measurements in rounds)
+    stages = {}
+    for measurements in rounds:
+        for stage, duration in measurements['stages'].items():
+            stages[stage] = stages.get(stage, 0) + duration
+
+    score_errors = [error for measurements in rounds for error in measurements['score_errors']]
+    hits = sum(measurements['hits'] for measurements in rounds)
+    arrows = sum(measurements['arrows'] for measurements in rounds)
+    matched = sum(measurements['matched'] for measurements in rounds)
+    gated = [measurements['motion_gate'] for measurements in rounds if measurements['motion_gate'] is not None]
+    checked = sum(stats['checked'] for stats in gated)
+
+    return {
+        "frames": frames,
+        "stages": stages,
+        "fps": frames / (stages['setup'] + stages['analysis']),
+        "precision": matched / hits if hits else 1,
+        "recall": matched / arrows if arrows else 1,
+        "score_error": mean(score_errors),
+        "exact_scores": score_errors.count(0) / len(score_errors) if score_errors else 1,
+        "frame_delay": mean([delay for measurements in rounds for delay in measurements['frame_delays']]),
+        "position_error": mean([error for measurements in rounds for error in measurements['position_errors']]),
+        "skip_ratio": sum(stats['skipped'] for stats in gated) / checked if checked else 0,
+        "peak_rss_mb": max(measurements['peak_rss_mb'] for measurements in rounds)
+    }
+
+def check_thresholds(summary, args):
+    '''
+    Parameters:
+        {Dict} summary - The measurements of all of the rounds together
+        {Namespace} args - The command line arguments
+
+    Returns:
+        {List} A description of each threshold that was not met.
+    '''
+
+    failures = []
+    if args.min_fps is not None and summary['fps'] < args.min_fps:
+        failures.append(f"fps {summary['fps']:.1f} < {args.min_fps}")
+    if args.min_precision is not None and summary['precision'] < args.min_precision:
+        failures.append(f"precision {summary['precision']:.2f} < {args.min_precision}")
+    if args.min_recall is not None and summary['recall'] < args.min_recall:
+        failures.append(f"recall {summary['recall']:.2f} < {args.min_recall}")
+    if args.max_score_error is not None and summary['score_error'] > args.max_score_error:
+        failures.append(f"score error {summary['score_error']:.2f} > {args.max_score_error}")
+
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the target scoring pipeline on synthetic rounds.')
+    parser.add_argument('--model', default='olympic_standard_target', help='the name of a model in TargetModel')
+    parser.add_argument('--model-document', help='a JSON export of a model_collection document')
+    parser.add_argument('--model-image', help='a local image of the model')
+    parser.add_argument('--rounds', type=int, default=ROUNDS_AMOUNT)
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the first round')
+    parser.add_argument('--frames', type=int, default=FRAMES_AMOUNT)
+    parser.add_argument('--arrows', type=int, default=ARROWS_AMOUNT)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--shake', type=float, default=SHAKE_PX)
+    parser.add_argument('--lighting', type=float, default=LIGHTING_VARIATION)
+    parser.add_argument('--spread', type=float, default=ARROWS_SPREAD)
+    parser.add_argument('--options', type=json.loads, default={}, help='analysis options of the rounds (JSON)')
+    parser.add_argument('--no-draw', action='store_true', help="don't write the processed videos")
+    parser.add_argument('--profile', action='store_true', help='time the stages within the analysis and the drawing')
+    parser.add_argument('--tolerance', type=float, default=HIT_TOLERANCE_PX,
+                        help='maximum distance between an arrow and its detected hit [px]')
+    parser.add_argument('--workdir', help='keep the rendered rounds in this directory and reuse them')
+    parser.add_argument('--report', help='write the measurements to this JSON file')
+    parser.add_argument('--min-fps', type=float)
+    parser.add_argument('--min-precision', type=float, default=MIN_PRECISION)
+    parser.add_argument('--min-recall', type=float, default=MIN_RECALL)
+    parser.add_argument('--max-score-error', type=float)
+    args = parser.parse_args()
+
+    model_data, model = load_model(args.model, args.model_document, args.model_image)
+    temporary_dir = tempfile.TemporaryDirectory() if args.workdir is None else None
+    workdir = args.workdir or temporary_dir.name
+    os.makedirs(workdir, exist_ok=True)
+
+    profiler = Profiler() if args.profile else None
+    rounds = []
+    try:
+        for seed in range(args.seed, args.seed + args.rounds):
+            name = (f"round_v{ROUND_VERSION}_{seed}_{args.frames}f_{args.arrows}a_{args.width}x{args.height}"
+                    f"_s{args.shake}_l{args.lighting}_r{args.spread}")
+            video_path = os.path.join(workdir, f"{name}.mp4")
+            truth_path = f"{video_path}.json"
+
+            if os.path.isfile(truth_path):
+                with open(truth_path) as truth_file:
+                    truth = json.load(truth_file)
+            else:
+                truth = generate_round(video_path, model_data, model, seed, args.frames, args.arrows,
+                                       (args.width, args.height), args.shake, args.lighting, args.spread, FPS)
+                with open(truth_path, 'w') as truth_file:
+                    json.dump(truth, truth_file)
+
+            output_path = None if args.no_draw else os.path.join(workdir, f"{name}_processed.mp4")
+            measurements = run_round(video_path, truth, model_data, model, args.options, output_path, args.tolerance,
+                                     profiler)
+            rounds.append(measurements)
+
+            stages = ', '.join(f"{stage} {duration:.2f}s" for stage, duration in measurements['stages'].items())
+            print(f"seed {seed}: {measurements['fps']:.1f} fps, {measurements['matched']}/{measurements['arrows']} arrows, "
+                  f"{measurements['hits']} hits, score errors {measurements['score_errors']}, "
+                  f"frame delays {measurements['frame_delays']} ({stages})")
+            if measurements['motion_gate'] is not None:
+                print(f"  motion gate skipped {measurements['motion_gate']['skipped']}/{measurements['motion_gate']['checked']} "
+                      f"checked frames, histogram {measurements['motion_gate']['histogram']}")
+    finally:
+        if temporary_dir is not None:
+            temporary_dir.cleanup()
+
+    summary = summarize(rounds)
+    print(f"{summary['frames']} frames at {summary['fps']:.1f} fps, peak RSS {summary['peak_rss_mb']:.0f}MB")
+    print(', '.join(f"{stage} {duration:.2f}s ({summary['frames'] / duration:.1f} fps)"
+                    for stage, duration in summary['stages'].items()))
+    print(f"precision {summary['precision']:.2f}, recall {summary['recall']:.2f}, "
+          f"score error {summary['score_error']:.2f} ({summary['exact_scores']:.0%} exact), "
+          f"position error {summary['position_error']:.1f}px, frame delay {summary['frame_delay']:.1f}, "
+          f"motion gate skip ratio {summary['skip_ratio']:.2f}")
+
+    profile = None
+    if profiler is not None:
+        profile = profiler.to_dict()
+        for stage in profile_report(profile):
+            print(f"  {stage['stage']:<24}{stage['count']:>7} runs {stage['total_s']:>8.2f}s {stage['share']:>6.1%}  "
+                  f"mean {stage['mean_ms']:.2f}ms, p50 <{stage['p50_ms']}ms, p95 <{stage['p95_ms']}ms, max {stage['max_ms']:.1f}ms")
+
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump({"arguments": vars(args), "rounds": rounds, "summary": summary, "profile": profile},
+                      report_file, indent=2)
+
+    failures = check_thresholds(summary, args)
+    for failure in failures:
+        print(f"threshold not met: {failure}")
+
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
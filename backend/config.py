@@ -6,7 +6,20 @@ class Config:
     DEBUG = True
     MONGO_URI = os.getenv("MONGODB_URI")
     SECRET_KEY = os.getenv("SECRET_KEY")
-    CELERY_CONFIG = {"broker_url": "redis://redis", "result_backend": "redis://redis"}
+    CELERY_CONFIG = {
+        "broker_url": "redis://redis",
+        "result_backend": "redis://redis",
+        # the analyses hold a CPU slot each, the uploads mostly wait on the network and run with a high concurrency
+        "task_default_queue": "cpu",
+        "task_routes": {
+            "project.controllers.processing_controller.upload_target_videos": {"queue": "io"},
+            "project.controllers.processing_controller.upload_pose_videos": {"queue": "io"},
+        },
+    }
+    # lets the celery workers emit to the Socket.IO rooms
+    SOCKETIO_MESSAGE_QUEUE = "redis://redis"
+    # on the res volume shared by every worker pool, so the features computed by one are read by the others
+    FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", "/app/project/core/res/cache/model_features")
     BYTEARK_TOKEN = os.getenv("BYTEARK_TOKEN")
     BYTEARK_PROJECT_KEY = os.getenv("BYTEARK_PROJECT_KEY")
     FRONTEND_BASE_URL = os.getenv("VITE_FRONTEND_URL")
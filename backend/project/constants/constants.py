@@ -7,6 +7,8 @@ SHOT_COLLECTION = "shots"
 RECORDING_COLLECTION = "recordings"
 ROUND_COLLECTION = 'rounds'
 MODEL_COLLECTION = 'models'
+MODEL_FEATURE_COLLECTION = 'model_features'
+OVERLAY_TRACK_COLLECTION = 'overlay_tracks'
 
 UPLOAD_FOLDER = './videos'
 ALLOWED_EXTENSIONS = {'mp4', 'webm', 'avi', 'mov'}  # Allowed video formats
\ No newline at end of file
@@ -0,0 +1,225 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from flask import jsonify, request
+from project.constants.constants import ROUND_COLLECTION, SESSION_COLLECTION
+from project.core.VideoDecoder import StreamDecoder, probe_frame_size
+from project.utils.token import UPLOAD_SUBJECT_PREFIX
+from ..db import db
+
+round_collection = db[ROUND_COLLECTION]
+session_collection = db[SESSION_COLLECTION]
+
+UPLOAD_DIR = '/app/project/core/res/output'
+# bytes of a chunk read from the request at a time
+UPLOAD_BLOCK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+# seconds between the checks of an upload in progress
+UPLOAD_POLL_INTERVAL = .5
+# seconds without a new chunk after which an upload in progress is considered abandoned
+UPLOAD_STALL_TIMEOUT = 600
+
+class UploadStalledError(Exception):
+    pass
+
+def raw_video_path(kind, round_id):
+    return os.path.join(UPLOAD_DIR, f'{kind}_video_raw_{round_id}.webm')
+
+def scratch_video_path(kind, round_id):
+    # the chunks are appended to the scratch file, which is renamed to the raw video once it's finalized
+    return raw_video_path(kind, round_id) + '.part'
+
+def can_upload_round_videos(user_id, round_id):
+    """Check that the round exists, and that the token is of its session's user or was issued for the round."""
+    try:
+        existing_round = round_collection.find_one({"_id": ObjectId(round_id)}, {"session_id": 1})
+        if not existing_round:
+            return False
+        
+        if user_id == f"{UPLOAD_SUBJECT_PREFIX}{round_id}":
+            return True
+        
+        return session_collection.count_documents(
+            {"_id": existing_round['session_id'], "user_id": ObjectId(user_id)}, limit=1
+        ) > 0
+    except (InvalidId, TypeError):
+        return False
+
+def is_video_upload_in_progress(kind, round_id):
+    return os.path.exists(scratch_video_path(kind, round_id)) and not os.path.exists(raw_video_path(kind, round_id))
+
+def start_video_upload(user_id, kind, round_id):
+    """Start a chunked upload, or report how much of it was received so it can be resumed."""
+    if not can_upload_round_videos(user_id, round_id):
+        return jsonify({"error": "Round not found"}), 404
+    
+    try:
+        raw_path = raw_video_path(kind, round_id)
+        if os.path.exists(raw_path):
+            return jsonify({"offset": os.path.getsize(raw_path), "complete": True}), 200
+
+        # appending creates the scratch file without truncating the chunks that were received
+        scratch_path = scratch_video_path(kind, round_id)
+        open(scratch_path, 'ab').close()
+
+        return jsonify({"offset": os.path.getsize(scratch_path), "complete": False}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def append_video_chunk(user_id, kind, round_id):
+    """Append the chunk in the request body to the scratch file, at the offset it was sent for."""
+    if not can_upload_round_videos(user_id, round_id):
+        return jsonify({"error": "Round not found"}), 404
+    
+    try:
+        offset = int(request.headers['Upload-Offset'])
+        checksum = request.headers['Upload-Checksum'].lower()
+    except (KeyError, ValueError):
+        return jsonify({"error": "The Upload-Offset and Upload-Checksum (SHA-256) headers are required"}), 400
+
+    if request.content_length is None or request.content_length > MAX_CHUNK_SIZE:
+        return jsonify({"error": f"Chunks are limited to {MAX_CHUNK_SIZE} bytes"}), 413
+
+    try:
+        if os.path.exists(raw_video_path(kind, round_id)):
+            return jsonify({"error": "The upload is already finalized"}), 409
+
+        scratch_path = scratch_video_path(kind, round_id)
+        if not os.path.exists(scratch_path):
+            return jsonify({"error": "The upload was not started"}), 404
+
+        with open(scratch_path, 'ab') as scratch:
+            try:
+                fcntl.flock(scratch, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return jsonify({"error": "Another chunk of this upload is being received"}), 409
+
+            received = os.fstat(scratch.fileno()).st_size
+            if offset != received:
+                # the client resumes from the received offset
+                return jsonify({"error": "The chunk does not continue the upload", "offset": received}), 409
+
+            # the chunk is verified before it's appended, the received prefix may already be analyzed
+            with tempfile.TemporaryFile(dir=UPLOAD_DIR) as chunk:
+                digest = hashlib.sha256()
+                while True:
+                    block = request.stream.read(UPLOAD_BLOCK_SIZE)
+                    if not block:
+                        break
+                    digest.update(block)
+                    chunk.write(block)
+
+                if digest.hexdigest() != checksum:
+                    return jsonify({"error": "The checksum of the chunk does not match", "offset": received}), 422
+
+                chunk.seek(0)
+                shutil.copyfileobj(chunk, scratch, UPLOAD_BLOCK_SIZE)
+                scratch.flush()
+
+            return jsonify({"offset": os.fstat(scratch.fileno()).st_size}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def finalize_video_upload(user_id, kind, round_id):
+    """Complete a chunked upload once all of its bytes were received."""
+    if not can_upload_round_videos(user_id, round_id):
+        return jsonify({"error": "Round not found"}), 404
+    
+    try:
+        raw_path = raw_video_path(kind, round_id)
+        if os.path.exists(raw_path):
+            return jsonify({"message": "The upload is already finalized", "size": os.path.getsize(raw_path)}), 200
+
+        scratch_path = scratch_video_path(kind, round_id)
+        if not os.path.exists(scratch_path):
+            return jsonify({"error": "The upload was not started"}), 404
+
+        size = request.form.get('size', type=int)
+
+        with open(scratch_path, 'ab') as scratch:
+            # the server is single threaded, it can't wait for a chunk that is still being appended
+            try:
+                fcntl.flock(scratch, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return jsonify({"error": "A chunk of this upload is still being received"}), 409
+
+            received = os.fstat(scratch.fileno()).st_size
+            if size is not None and size != received:
+                return jsonify({"error": "The upload is incomplete", "offset": received}), 409
+
+            os.replace(scratch_path, raw_path)
+
+        return jsonify({"message": f"{kind.capitalize()} video uploaded successfully", "size": received}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def wait_for_video_upload(kind, round_id):
+    """Wait for a chunked upload in progress to be finalized."""
+    scratch_path = scratch_video_path(kind, round_id)
+    last_size, last_growth = -1, time.monotonic()
+
+    while is_video_upload_in_progress(kind, round_id):
+        try:
+            size = os.path.getsize(scratch_path)
+        except FileNotFoundError:
+            # finalized meanwhile
+            break
+
+        if size != last_size:
+            last_size, last_growth = size, time.monotonic()
+        elif time.monotonic() - last_growth > UPLOAD_STALL_TIMEOUT:
+            raise UploadStalledError(f'The {kind} video upload stalled at {size} bytes')
+
+        time.sleep(UPLOAD_POLL_INTERVAL)
+
+def follow_video_upload(kind, round_id):
+    """Yield the bytes of a video as they are uploaded, until the upload is finalized."""
+    raw_path = raw_video_path(kind, round_id)
+
+    try:
+        video = open(scratch_video_path(kind, round_id), 'rb')
+    except FileNotFoundError:
+        video = open(raw_path, 'rb')
+
+    with video:
+        last_growth = time.monotonic()
+        while True:
+            # the scratch file keeps being read after it's renamed, finalizing only ends the following
+            complete = os.path.exists(raw_path)
+            block = video.read(UPLOAD_BLOCK_SIZE)
+
+            if block:
+                last_growth = time.monotonic()
+                yield block
+            elif complete:
+                return
+            elif time.monotonic() - last_growth > UPLOAD_STALL_TIMEOUT:
+                raise UploadStalledError(f'The {kind} video upload stalled at {video.tell()} bytes')
+            else:
+                time.sleep(UPLOAD_POLL_INTERVAL)
+
+def open_video_upload(kind, round_id, trim_range=None):
+    """Decode a video while it is uploaded, from the first received frame on (see VideoDecoder.StreamDecoder)."""
+    raw_path = raw_video_path(kind, round_id)
+    started_at = time.monotonic()
+
+    while True:
+        complete = os.path.exists(raw_path)
+        frame_size = probe_frame_size(raw_path if complete else scratch_video_path(kind, round_id))
+
+        if frame_size is not None:
+            break
+        if complete:
+            raise ValueError(f'The {kind} video can not be decoded')
+        if time.monotonic() - started_at > UPLOAD_STALL_TIMEOUT:
+            raise UploadStalledError(f'No frame of the {kind} video was received')
+
+        time.sleep(UPLOAD_POLL_INTERVAL)
+
+    # every frame is kept, the frames are numbered as in the file
+    return StreamDecoder(follow_video_upload(kind, round_id), frame_size, fps=None, trimRange=trim_range)
@@ -0,0 +1,132 @@
+from celery import shared_task
+from flask import current_app, jsonify
+from flask_socketio import SocketIO
+from functools import partial
+from bson.objectid import ObjectId
+from project.constants.constants import ROUND_COLLECTION, SESSION_COLLECTION, MODEL_COLLECTION
+from project.controllers.model_controller import load_model_features
+from project.controllers.processing_controller import MissingTargetModelError, ModelNotExistError
+from project.core.VideoDecoder import STREAM_FPS, StreamDecoder
+from project.core.target_scoring.AnalysisConfig import AnalysisConfig
+from project.core.target_scoring.VideoAnalyzer import VideoAnalyzer, hits_to_results
+from project.redis_client import binary_redis_client
+from ..db import db
+
+round_collection = db[ROUND_COLLECTION]
+session_collection = db[SESSION_COLLECTION]
+model_collection = db[MODEL_COLLECTION]
+
+# seconds without a chunk after which a live recording is considered abandoned
+LIVE_CHUNK_TIMEOUT = 30
+# seconds the chunks of a recording are kept when nobody consumes them
+LIVE_CHUNKS_EXPIRY = 3600
+END_OF_STREAM = b''
+
+def live_chunks_key(round_id):
+    return f"live_target_chunks:{round_id}"
+
+def push_live_chunk(round_id, chunk):
+    """Queue a chunk of a live target recording for its scoring worker."""
+    key = live_chunks_key(round_id)
+    pipeline = binary_redis_client.pipeline()
+    pipeline.rpush(key, bytes(chunk))
+    pipeline.expire(key, LIVE_CHUNKS_EXPIRY)
+    pipeline.execute()
+
+def end_live_stream(round_id):
+    """Mark the end of a live target recording, the worker scores the rest of the queued chunks."""
+    push_live_chunk(round_id, END_OF_STREAM)
+
+def receive_live_chunks(round_id):
+    """Yield the chunks of a live target recording as they arrive, until the recording ends."""
+    key = live_chunks_key(round_id)
+
+    while True:
+        item = binary_redis_client.blpop(key, timeout=LIVE_CHUNK_TIMEOUT)
+        if item is None:
+            print(f"live recording {round_id} timed out")
+            return
+
+        _, chunk = item
+        if chunk == END_OF_STREAM:
+            binary_redis_client.delete(key)
+            return
+
+        yield chunk
+
+@shared_task(bind=True)
+def score_target_live(self, round_id, session_id, frame_size, analysis_options=None):
+    task_id = self.request.id
+    emitter = SocketIO(message_queue=current_app.config['SOCKETIO_MESSAGE_QUEUE'])
+
+    round_collection.update_one(
+        {"_id": ObjectId(round_id)},
+        {"$set": {"live_task_id": task_id, "live_status": "PROCESSING"}}
+    )
+
+    decoder = None
+    try:
+        existing_round = round_collection.find_one({"_id": ObjectId(round_id)})
+        existing_session = session_collection.find_one({"_id": ObjectId(session_id)})
+
+        if 'model' not in existing_session:
+            raise MissingTargetModelError('Model is required in the request body')
+
+        existing_model = model_collection.find_one({"model": existing_session['model']})
+
+        if not existing_model:
+            raise ModelNotExistError('This model is not exist in the data base')
+
+        # The homography and the hits are kept by a single analyzer while the chunks arrive.
+        # Every frame of the recording is kept, so the live hits are at the frames the processing of the
+        # uploaded recording numbers them with, and their times are computed at the same nominal rate
+        start_time = existing_round['created_at']
+        decoder = StreamDecoder(receive_live_chunks(round_id), tuple(frame_size), fps=None)
+        analyzer = VideoAnalyzer(None, None, existing_model['bullseye_point'], existing_model['rings_amount'],
+                                 existing_model['inner_diameter_px'], AnalysisConfig(analysis_options),
+                                 partial(load_model_features, existing_model), capture=decoder)
+
+        def report_hits(hits):
+            score = hits_to_results(sorted(hits, key=lambda x: x.frame_count), start_time, STREAM_FPS)
+            emitter.emit('liveScoreUpdate', {"round_id": round_id, "score": score}, to=session_id)
+
+        hits = analyzer.collect_hits(STREAM_FPS, on_verified=report_hits)
+        live_score = hits_to_results(sorted(hits, key=lambda x: x.frame_count), start_time, STREAM_FPS)
+
+        round_collection.update_one(
+            {"_id": ObjectId(round_id)},
+            {"$set": {"live_status": "SUCCESS", "live_score": live_score}}
+        )
+        emitter.emit('liveScoreReady', {"round_id": round_id, "score": live_score}, to=session_id)
+
+        return live_score
+
+    except Exception as e:
+        # stop decoding and drop the chunks that were not consumed
+        if decoder is not None:
+            decoder.release()
+        binary_redis_client.delete(live_chunks_key(round_id))
+
+        round_collection.update_one(
+            {"_id": ObjectId(round_id)},
+            {"$set": {"live_status": "FAILURE", "live_error_message": str(e)}}
+        )
+        emitter.emit('liveScoreFailed', {"round_id": round_id, "error": str(e)}, to=session_id)
+
+def get_live_score(round_id):
+    try:
+        existing_round = round_collection.find_one({"_id": ObjectId(round_id)}, {"live_status": 1, "live_score": 1})
+        
+        if not existing_round:
+            return jsonify({"error": "Round not found"}), 404
+        
+        if 'live_status' not in existing_round:
+            return jsonify({"error": "The round was not scored live"}), 404
+        
+        return jsonify({
+            "_id": round_id,
+            "live_status": existing_round['live_status'],
+            "live_score": existing_round.get('live_score', [])
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,5 +1,9 @@
 from datetime import datetime, timezone
-from project.constants.constants import ACCOUNT_COLLECTION, MODEL_COLLECTION
+from celery import current_app, shared_task
+from project.constants.constants import ACCOUNT_COLLECTION, MODEL_COLLECTION, MODEL_FEATURE_COLLECTION
+from project.core.target_scoring.ModelFeatures import compute_model_features, features_key, features_from_bytes, features_to_bytes, load_model_image
+from project.core.target_scoring.FeatureCache import FeatureCache
+from project.core.target_scoring.FeatureDetector import SIFT, create_detector
 from bson.objectid import ObjectId
 from flask import jsonify, request
 from ..db import db
@@ -7,6 +11,14 @@ import cloudinary.uploader
 
 model_collection = db[MODEL_COLLECTION]
 account_collection = db[ACCOUNT_COLLECTION]
+model_feature_collection = db[MODEL_FEATURE_COLLECTION]
+
+# frame shapes of the phones and cameras we commonly get videos from (landscape and portrait)
+COMMON_FRAME_SHAPES = [(1080, 1920, 3), (1920, 1080, 3), (720, 1280, 3), (1280, 720, 3)]
+FEATURE_CACHE_DIR = current_app.conf['FEATURE_CACHE_DIR']
+FEATURE_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+feature_cache = FeatureCache(FEATURE_CACHE_DIR, FEATURE_CACHE_MAX_BYTES)
 
 def add_creator_to_models(models):
     """Helper function to add round results to each session and determine processing status."""
@@ -28,6 +40,56 @@ def convert_object_ids(data):
         item['_id'] = str(item['_id'])
     return data
 
+def save_model_features(model, frame_shape, detector_name, features):
+    """Persist the features of a model version for one frame shape and detector."""
+    key = features_key(model, frame_shape, detector_name)
+    data = features_to_bytes(features)
+    model_feature_collection.update_one(
+        {"key": key},
+        {"$set": {
+            "key": key,
+            "model_id": model['_id'],
+            "version": model.get('version', 0),
+            "frame_shape": list(frame_shape),
+            "detector": detector_name,
+            "artifact": data,
+            "created_at": datetime.now(timezone.utc),
+        }},
+        upsert=True
+    )
+    feature_cache.put(key, data)
+
+def load_model_features(model, frame_shape, detector_name=SIFT):
+    """Load the features of a model for a frame shape, from the local cache, the database, or compute them."""
+    key = features_key(model, frame_shape, detector_name)
+    
+    if data := feature_cache.get(key):
+        return features_from_bytes(data)
+    
+    if stored := model_feature_collection.find_one({"key": key}):
+        feature_cache.put(key, stored['artifact'])
+        return features_from_bytes(stored['artifact'])
+    
+    # uncommon frame shape or the precomputation is not done yet
+    image = load_model_image(model['model_path'])
+    features = compute_model_features(image, model['bullseye_point'], frame_shape, create_detector(detector_name))
+    save_model_features(model, frame_shape, detector_name, features)
+    return features
+
+@shared_task()
+def precompute_model_features(model_id):
+    model = model_collection.find_one({"_id": ObjectId(model_id)})
+    if not model:
+        return
+    
+    # other detectors are computed on their first use
+    image = load_model_image(model['model_path'])
+    detector = create_detector(SIFT)
+    
+    for frame_shape in COMMON_FRAME_SHAPES:
+        features = compute_model_features(image, model['bullseye_point'], frame_shape, detector)
+        save_model_features(model, frame_shape, SIFT, features)
+
 def get_models(user_id):
     try:            
         models = list(model_collection.find({}))
@@ -80,9 +142,13 @@ def create_model(user_id):
             "model": "_".join(model_name.lower().split(" ")),
             "created_at": created_date,
             "model_size": [int(image_width), int(image_height)],
-            "created_by": ObjectId(user_id)
+            "created_by": ObjectId(user_id),
+            "version": 1
         }
         result = model_collection.insert_one(model_data)
+        
+        # compute the model's features once, instead of in every processing task
+        precompute_model_features.delay(str(result.inserted_id))
 
         return jsonify({
                 "_id": str(result.inserted_id),
@@ -115,7 +181,11 @@ def update_model_by_id(user_id, model_id):
                 "model": "_".join(model_name.lower().split(" ")),
                 "updated_by": ObjectId(user_id)
             }
-            result = model_collection.update_one({'_id': model["_id"]}, {'$set': updated_model_data})
+            result = model_collection.update_one({'_id': model["_id"]}, {'$set': updated_model_data, '$inc': {'version': 1}})
+            
+            # features of the previous version are stale
+            model_feature_collection.delete_many({"model_id": model["_id"]})
+            precompute_model_features.delay(model_id)
 
             return jsonify({
                     "_id": model_id,
@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+from project.constants.constants import OVERLAY_TRACK_COLLECTION
+from project.core.OverlayTrack import TARGET_TRACK, POSE_TRACK
+from bson.objectid import ObjectId
+from flask import jsonify, request
+from pymongo import ASCENDING, DESCENDING
+from ..db import db
+
+overlay_track_collection = db[OVERLAY_TRACK_COLLECTION]
+
+def save_overlay_track(round_id, kind, chunks):
+    """Replace the overlay track of a round with the given chunks, one document per chunk."""
+    overlay_track_collection.create_index([("round_id", ASCENDING), ("kind", ASCENDING), ("start_frame", ASCENDING)])
+    overlay_track_collection.delete_many({"round_id": ObjectId(round_id), "kind": kind})
+    
+    if not chunks:
+        return
+    
+    created_at = datetime.now(timezone.utc)
+    overlay_track_collection.insert_many([
+        {**chunk, "round_id": ObjectId(round_id), "kind": kind, "created_at": created_at}
+        for chunk in chunks
+    ])
+
+def get_overlay_track(round_id, kind):
+    """Get the chunks of a round's overlay track that cover the frames [start, end)."""
+    try:
+        if kind not in (TARGET_TRACK, POSE_TRACK):
+            return jsonify({"error": "Unknown overlay track"}), 404
+        
+        start = request.args.get('start', 0, type=int)
+        end = request.args.get('end', type=int)
+        query = {"round_id": ObjectId(round_id), "kind": kind}
+        
+        # the chunk that holds the state at the start frame, which may begin before it
+        anchor = overlay_track_collection.find_one({**query, "start_frame": {"$lte": start}},
+                                                   sort=[("start_frame", DESCENDING)])
+        start_frame = {"$gte": anchor['start_frame'] if anchor else start}
+        if end is not None:
+            start_frame["$lt"] = end
+        
+        chunks = list(overlay_track_collection.find({**query, "start_frame": start_frame},
+                                                    {"_id": 0, "round_id": 0, "kind": 0, "created_at": 0})
+                                              .sort("start_frame", ASCENDING))
+        
+        return jsonify({"round_id": round_id, "kind": kind, "chunks": chunks}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -4,9 +4,18 @@ from celery import shared_task
 from flask import jsonify, request
 from project.core.pose_estimation.PoseEstimator import PoseEstimator
 from project.constants.constants import ROUND_COLLECTION, SESSION_COLLECTION, VIDEO_COLLECTION, MODEL_COLLECTION
-from project.controllers.video_uploader import check_and_trim_video, format_video_before_upload, get_short_playback_url, get_upload_token, upload_video, delete_video
+from project.controllers.video_uploader import check_and_trim_video, get_trim_range, get_short_playback_url, get_upload_token, upload_video, delete_video
 from project.core.pose_estimation.Driver import process_pose_video_data
 from project.core.target_scoring.Driver import process_target_video_data
+from project.core.target_scoring.AnalysisConfig import AnalysisConfig
+from project.core.VideoEncoder import EncoderConfig
+from project.core.Profiler import NULL_PROFILER, Profiler, profile_report
+from project.core.target_scoring.MotionGate import GateStats
+from project.core.OverlayTrack import POSE_TRACK, TARGET_TRACK, PoseTrackWriter, target_track_chunks, uses_overlay_track
+from project.controllers.overlay_track_controller import save_overlay_track
+from project.controllers.model_controller import load_model_features
+from project.controllers.chunked_upload_controller import is_video_upload_in_progress, open_video_upload, wait_for_video_upload
+from functools import partial
 import cv2
 import io
 import cloudinary.uploader
@@ -25,7 +34,7 @@ class ModelNotExistError(Exception):
     pass
 
 @shared_task(bind=True)
-def process_target(self, round_id, video_timestamps):
+def process_target(self, round_id, video_timestamps, analysis_options=None):
     task_id = self.request.id
     
     input_filename = f"target_video_raw_{round_id}"
@@ -34,8 +43,6 @@ def process_target(self, round_id, video_timestamps):
     trimmed_filepath = f"/app/project/core/res/output/{trimmed_filename}.webm"
     output_filename = f"target_video_processed_{round_id}"
     output_filepath = f"/app/project/core/res/output/{output_filename}.mp4"
-    compressed_trimmed_filepath = f"/app/project/core/res/output/compressed_{trimmed_filename}.mp4"
-    compressed_output_filepath = f"/app/project/core/res/output/compressed_{output_filename}.mp4"
     
     round_collection.update_one(
         {"target_task_id": task_id},
@@ -55,47 +62,60 @@ def process_target(self, round_id, video_timestamps):
         if not existing_model:
             raise ModelNotExistError('This model is not exist in the data base')
         
-        # Trim the video based on the timestamps
-        check_and_trim_video("target", video_timestamps, input_filepath, trimmed_filepath)
+        # Time the stages of the round, when it's requested in the analysis options
+        profiler = Profiler() if (analysis_options or {}).get('profiling', False) else NULL_PROFILER
+        
+        # In overlay track mode the hits are drawn by the clients over the raw video
+        overlay_track = uses_overlay_track(analysis_options)
+        if overlay_track:
+            output_filepath = None
+        
+        # While the video is still uploaded in chunks its received prefix is analyzed, trimmed as it's decoded,
+        # unless the analysis has to read the video file (in segments, or again to draw the output)
+        config = AnalysisConfig(analysis_options)
+        stream_upload = is_video_upload_in_progress("target", round_id) and config.segment_processes == 1 and \
+                        (overlay_track or config.single_decode)
+        
+        capture, reopen_capture = None, None
+        if stream_upload:
+            trim_range = get_trim_range("target", video_timestamps)
+            capture = open_video_upload("target", round_id, trim_range)
+            # When the received frames don't fit in the spool they're decoded again, once the upload is finalized
+            reopen_capture = partial(open_video_upload, "target", round_id, trim_range)
+        else:
+            # Trim the video based on the timestamps
+            wait_for_video_upload("target", round_id)
+            with profiler.stage('trim'):
+                check_and_trim_video("target", video_timestamps, input_filepath, trimmed_filepath)
         
         # Process the trimmed video data
-        scoring_detail = process_target_video_data(trimmed_filepath, output_filepath, existing_model)
+        gate_stats = GateStats()
+        scoring_detail = process_target_video_data(trimmed_filepath, output_filepath, existing_model, analysis_options,
+                                                   partial(load_model_features, existing_model), profiler, gate_stats,
+                                                   capture, reopen_capture)
         
-        # Update the round status before token request
-        round_collection.update_one(
-            {"target_task_id": task_id},
-            {"$set": {"target_status": "GETTING_TOKEN", "score": scoring_detail}}
-        )
+        # The upload was finalized by the end of the streamed video, the trimmed video is uploaded too
+        if stream_upload:
+            with profiler.stage('trim'):
+                check_and_trim_video("target", video_timestamps, input_filepath, trimmed_filepath)
         
-        # Compress the videos
-        format_video_before_upload(trimmed_filepath, compressed_trimmed_filepath)
-        format_video_before_upload(output_filepath, compressed_output_filepath)
+        if overlay_track:
+            save_overlay_track(round_id, TARGET_TRACK, target_track_chunks(scoring_detail))
         
-        # Request tokens for uploading
-        tokens_for_raw_video = get_upload_token(input_filename)
-        tokens_for_processed_video = get_upload_token(output_filename)
-
-        # Update the round with video URLs and status before uploading
+        # Update the round status before token request
         round_collection.update_one(
             {"target_task_id": task_id},
             {"$set": {
-                "target_status": "UPLOADING",
-                "target_video": get_short_playback_url(tokens_for_processed_video),
-                "target_video_raw": get_short_playback_url(tokens_for_raw_video)
+                "target_status": "GETTING_TOKEN",
+                "score": scoring_detail,
+                "target_overlay_track": overlay_track,
+                "target_profile": profiler.to_dict() if profiler.enabled else None,
+                "target_motion_gate": gate_stats.to_dict()
             }}
         )
         
-        # Upload the compressed videos
-        upload_video(compressed_trimmed_filepath, tokens_for_raw_video[0])
-        upload_video(compressed_output_filepath, tokens_for_processed_video[0])
-        
-        # Final status update
-        round_collection.update_one(
-            {"target_task_id": task_id},
-            {"$set": {"target_status": "SUCCESS"}}
-        )
-        
-        return scoring_detail, input_filepath, output_filepath, trimmed_filepath, compressed_trimmed_filepath, compressed_output_filepath
+        # The videos are uploaded by upload_target_videos, on the I/O queue
+        return scoring_detail, input_filepath, output_filepath, trimmed_filepath
         
     except Exception as e:
         # If there is an error, update the status to failure
@@ -105,7 +125,7 @@ def process_target(self, round_id, video_timestamps):
         )
 
 @shared_task(bind=True)
-def process_pose(self, round_id, video_timestamps):
+def process_pose(self, round_id, video_timestamps, analysis_options=None):
     task_id = self.request.id
     
     input_filename = f"pose_video_raw_{round_id}"
@@ -114,8 +134,6 @@ def process_pose(self, round_id, video_timestamps):
     trimmed_filepath = f"/app/project/core/res/output/{trimmed_filename}.webm"
     output_filename = f"pose_video_processed_{round_id}"
     output_filepath = f"/app/project/core/res/output/{output_filename}.mp4"
-    compressed_trimmed_filepath = f"/app/project/core/res/output/compressed_{trimmed_filename}.mp4"
-    compressed_output_filepath = f"/app/project/core/res/output/compressed_{output_filename}.mp4"
     
     round_collection.update_one(
         {"pose_task_id": task_id},
@@ -123,52 +141,115 @@ def process_pose(self, round_id, video_timestamps):
     )
     
     try:
-        # Trim the video based on the timestamps
+        # Trim the video based on the timestamps, once it was uploaded completely
+        wait_for_video_upload("pose", round_id)
         check_and_trim_video("pose", video_timestamps, input_filepath, trimmed_filepath)
         
+        # In overlay track mode the skeletons are drawn by the clients over the raw video
+        overlay_track = uses_overlay_track(analysis_options)
+        track_writer = PoseTrackWriter() if overlay_track else None
+        if overlay_track:
+            output_filepath = None
+        
         # Process the pose video data
-        aiming_frames = process_pose_video_data(trimmed_filepath, output_filepath)
+        pipelined = (analysis_options or {}).get('pipelined', True)
+        aiming_frames = process_pose_video_data(trimmed_filepath, output_filepath, pipelined,
+                                                EncoderConfig(analysis_options), track_writer)
+        
+        if overlay_track:
+            save_overlay_track(round_id, POSE_TRACK, track_writer.finish())
         
         # Update the round status before token request
         round_collection.update_one(
             {"pose_task_id": task_id},
-            {"$set": {"pose_status": "GETTING_TOKEN"}}
+            {"$set": {"pose_status": "GETTING_TOKEN", "pose_overlay_track": overlay_track}}
         )
                 
-        # Compress the videos
-        format_video_before_upload(trimmed_filepath, compressed_trimmed_filepath)
-        format_video_before_upload(output_filepath, compressed_output_filepath)
+        # The videos are uploaded by upload_pose_videos, on the I/O queue
+        return input_filepath, output_filepath, trimmed_filepath, aiming_frames
         
-        # Request tokens for uploading
-        tokens_for_raw_video = get_upload_token(input_filename)
-        tokens_for_processed_video = get_upload_token(output_filename)
-
-        # Update the round with video URLs and status before uploading
+    except Exception as e:
+        # If there is an error, update the status to failure
         round_collection.update_one(
             {"pose_task_id": task_id},
-            {"$set": {
-                "pose_status": "UPLOADING",
-                "pose_video": get_short_playback_url(tokens_for_processed_video),
-                "pose_video_raw": get_short_playback_url(tokens_for_raw_video)
-            }}
+            {"$set": {"pose_status": "FAILURE", "pose_error_message": str(e)}}
         )
+
+def upload_round_videos(video_type, round_id, upload_task_id, trimmed_filepath, output_filepath):
+    """Upload the trimmed and processed videos of a round, the processed video is None in overlay track mode."""
+    input_filename = f"{video_type}_video_raw_{round_id}"
+    output_filename = f"{video_type}_video_processed_{round_id}"
+    overlay_track = output_filepath is None
+    
+    # Request tokens for uploading
+    tokens_for_raw_video = get_upload_token(input_filename)
+    tokens_for_processed_video = get_upload_token(output_filename) if not overlay_track else None
+
+    # Update the round with video URLs and status before uploading
+    round_collection.update_one(
+        {f"{video_type}_upload_task_id": upload_task_id},
+        {"$set": {
+            f"{video_type}_status": "UPLOADING",
+            f"{video_type}_video": get_short_playback_url(tokens_for_processed_video) if not overlay_track else None,
+            f"{video_type}_video_raw": get_short_playback_url(tokens_for_raw_video)
+        }}
+    )
+    
+    # Upload the videos, the processed video is encoded for upload as it's written
+    upload_video(trimmed_filepath, tokens_for_raw_video[0])
+    if not overlay_track:
+        upload_video(output_filepath, tokens_for_processed_video[0])
+    else:
+        # the frames of the shots are captured from the raw video
+        output_filepath = trimmed_filepath
+    
+    # Final status update
+    round_collection.update_one(
+        {f"{video_type}_upload_task_id": upload_task_id},
+        {"$set": {f"{video_type}_status": "SUCCESS"}}
+    )
+    
+    return output_filepath
+
+@shared_task(bind=True)
+def upload_target_videos(self, analysis, round_id):
+    # the analysis failed, and already updated the status
+    if analysis is None:
+        return None
+    
+    task_id = self.request.id
+    scoring_detail, input_filepath, output_filepath, trimmed_filepath = analysis
+    
+    try:
+        output_filepath = upload_round_videos("target", round_id, task_id, trimmed_filepath, output_filepath)
         
-        # Upload the compressed videos
-        upload_video(compressed_trimmed_filepath, tokens_for_raw_video[0])
-        upload_video(compressed_output_filepath, tokens_for_processed_video[0])
-        
-        # Final status update
+        return scoring_detail, input_filepath, output_filepath, trimmed_filepath
+    
+    except Exception as e:
+        # If there is an error, update the status to failure
         round_collection.update_one(
-            {"pose_task_id": task_id},
-            {"$set": {"pose_status": "SUCCESS"}}
+            {"target_upload_task_id": task_id},
+            {"$set": {"target_status": "FAILURE", "target_error_message": str(e)}}
         )
+
+@shared_task(bind=True)
+def upload_pose_videos(self, analysis, round_id):
+    # the analysis failed, and already updated the status
+    if analysis is None:
+        return None
+    
+    task_id = self.request.id
+    input_filepath, output_filepath, trimmed_filepath, aiming_frames = analysis
+    
+    try:
+        output_filepath = upload_round_videos("pose", round_id, task_id, trimmed_filepath, output_filepath)
         
-        return input_filepath, output_filepath, trimmed_filepath, aiming_frames, compressed_trimmed_filepath, compressed_output_filepath
-        
+        return input_filepath, output_filepath, trimmed_filepath, aiming_frames
+    
     except Exception as e:
         # If there is an error, update the status to failure
         round_collection.update_one(
-            {"pose_task_id": task_id},
+            {"pose_upload_task_id": task_id},
             {"$set": {"pose_status": "FAILURE", "pose_error_message": str(e)}}
         )
 
@@ -178,15 +259,11 @@ def capture_pose_on_shot_detected(self, results, round_id):
     raw_target_video_path = results[0][1]
     target_video_path = results[0][2]
     trimmed_target_video_path = results[0][3]
-    compressed_trimmed_target_video_path = results[0][4]
-    compressed_output_target_video_path = results[0][5]
     
     raw_pose_video_path = results[1][0]
     pose_video_path = results[1][1]
     trimmed_pose_video_path = results[1][2]
     aiming_frames = results[1][3]
-    compressed_trimmed_pose_video_path = results[1][4]
-    compressed_output_pose_video_path = results[1][5]
     
     try:
         # Upload hit frames
@@ -214,10 +291,6 @@ def capture_pose_on_shot_detected(self, results, round_id):
         delete_video(raw_target_video_path)
         delete_video(trimmed_target_video_path)
         delete_video(trimmed_pose_video_path)
-        delete_video(compressed_trimmed_target_video_path)
-        delete_video(compressed_output_target_video_path)
-        delete_video(compressed_trimmed_pose_video_path)
-        delete_video(compressed_output_pose_video_path)
         
     except Exception as e:
         round_collection.update_one(
@@ -344,14 +417,34 @@ def get_recording_timestamp(round_id):
     except Exception:
         return {'pose': 0, 'target': 0}
     
+def get_profiling_report(round_id):
+    try:
+        existing_round = round_collection.find_one({"_id": ObjectId(round_id)}, {"target_profile": 1})
+        
+        if not existing_round:
+            return jsonify({"error": "Round not found"}), 404
+        
+        profile = existing_round.get('target_profile')
+        if not profile:
+            return jsonify({"error": "The round was not profiled, process it with the 'profiling' analysis option"}), 404
+        
+        return jsonify({"_id": round_id, "target": profile_report(profile), "target_profile": profile}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def get_playback_url(existing_round, video_type):
+    # rounds with overlay tracks have no processed video, the shots are captured from the raw one
+    video = existing_round.get(f'{video_type}_video') or existing_round[f'{video_type}_video_raw']
+    return video[0]['playbackUrls'][0]['hls'][0]['url']
+    
 def add_manual_shot_by_id(round_id):
     try:
         data = request.json
 
         existing_round = round_collection.find_one({'_id': ObjectId(round_id)})
         round_score = existing_round.get('score')
-        target_video_path = existing_round['target_video'][0]['playbackUrls'][0]['hls'][0]['url']
-        pose_video_path = existing_round['pose_video'][0]['playbackUrls'][0]['hls'][0]['url']
+        target_video_path = get_playback_url(existing_round, 'target')
+        pose_video_path = get_playback_url(existing_round, 'pose')
         round_start_time = existing_round['created_at']
 
         if existing_round and round_score:
@@ -408,8 +501,8 @@ def edit_manual_shot_by_id(round_id, hit_id):
         data = request.json
 
         existing_round = round_collection.find_one({'_id': ObjectId(round_id)})
-        target_video_path = existing_round['target_video'][0]['playbackUrls'][0]['hls'][0]['url']
-        pose_video_path = existing_round['pose_video'][0]['playbackUrls'][0]['hls'][0]['url']
+        target_video_path = get_playback_url(existing_round, 'target')
+        pose_video_path = get_playback_url(existing_round, 'pose')
         round_score = existing_round.get('score')
 
         if existing_round and round_score and int(hit_id) in [hit['id'] for hit in round_score]:  
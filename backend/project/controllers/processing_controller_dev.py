@@ -1,7 +1,7 @@
 from celery import shared_task
 from project.controllers.processing_controller import find_aiming_frame_from_shot, upload_frames
 from project.constants.constants import ROUND_COLLECTION, SESSION_COLLECTION, MODEL_COLLECTION
-from project.controllers.video_uploader import format_video_before_upload, get_short_playback_url, get_upload_token, upload_video, delete_video
+from project.controllers.video_uploader import get_short_playback_url, get_upload_token, upload_video, delete_video
 from project.core.pose_estimation.Driver import process_pose_video_data
 from project.core.target_scoring.Driver import process_target_video_data
 from bson.objectid import ObjectId
@@ -79,7 +79,6 @@ def process_target_test(self, round_id, video):
     dummy_input_filepath = f"/app/project/core/res/output/{input_filename}.webm"
     output_filename = f"target_video_processed_{round_id}"
     output_filepath = f"/app/project/core/res/output/{output_filename}.mp4"
-    compressed_output_filepath = f"/app/project/core/res/output/compressed_{output_filename}.mp4"
 
     
     round_collection.update_one(
@@ -107,9 +106,6 @@ def process_target_test(self, round_id, video):
             {"$set": {"target_status": "GETTING_TOKEN", "score": scoring_detail}}
         )
         
-        # Compress the videos
-        format_video_before_upload(output_filepath, compressed_output_filepath)
-        
         # request token for uploading to ByteArk
         tokens_for_raw_video = get_upload_token(input_filename)
         tokens_for_processed_video = get_upload_token(output_filename)
@@ -124,7 +120,7 @@ def process_target_test(self, round_id, video):
         )
         
         # upload_video(input_filepath, tokens_for_raw_video[0])
-        upload_video(compressed_output_filepath, tokens_for_processed_video[0])
+        upload_video(output_filepath, tokens_for_processed_video[0])
         
         
         round_collection.update_one(
@@ -132,7 +128,7 @@ def process_target_test(self, round_id, video):
             {"$set": {"target_status": "SUCCESS"}}
         )
         
-        return scoring_detail, input_filepath, output_filepath, dummy_input_filepath, compressed_output_filepath
+        return scoring_detail, input_filepath, output_filepath, dummy_input_filepath
         
     except Exception as e:
         round_collection.update_one(
@@ -149,7 +145,6 @@ def process_pose_test(self, round_id, video):
     dummy_input_filepath = f"/app/project/core/res/output/{input_filename}.webm"
     output_filename = f"pose_video_processed_{round_id}"
     output_filepath = f"/app/project/core/res/output/{output_filename}.mp4"
-    compressed_output_filepath = f"/app/project/core/res/output/compressed_{output_filename}.mp4"
 
     
     round_collection.update_one(
@@ -165,9 +160,6 @@ def process_pose_test(self, round_id, video):
             {"$set": {"pose_status": "GETTING_TOKEN"}}
         )
         
-        # Compress the videos
-        format_video_before_upload(output_filepath, compressed_output_filepath)
-        
         # request token for uploading to ByteArk
         tokens_for_raw_video = get_upload_token(input_filename)
         tokens_for_processed_video = get_upload_token(output_filename)
@@ -182,14 +174,14 @@ def process_pose_test(self, round_id, video):
         )
         
         # upload_video(input_filepath, tokens_for_raw_video[0])
-        upload_video(compressed_output_filepath, tokens_for_processed_video[0])
+        upload_video(output_filepath, tokens_for_processed_video[0])
         
         round_collection.update_one(
             {"pose_task_id": task_id},
             {"$set": {"pose_status": "SUCCESS"}}
         )
         
-        return input_filepath, output_filepath, dummy_input_filepath, aiming_frames, compressed_output_filepath
+        return input_filepath, output_filepath, dummy_input_filepath, aiming_frames
         
     except Exception as e:
         round_collection.update_one(
@@ -202,12 +194,10 @@ def capture_pose_on_shot_detected_test(self, results, round_id):
     scoring_detail = results[0][0]
     target_video_path = results[0][2]
     dummy_raw_target_video_path = results[0][3]
-    compressed_target_video_path = results[0][4]
     
     pose_video_path = results[1][1]
     dummy_raw_pose_video_path = results[1][2]
     aiming_frames = results[1][3]
-    compressed_pose_video_path = results[1][4]
     
     try:
         # Upload hit frames
@@ -233,8 +223,6 @@ def capture_pose_on_shot_detected_test(self, results, round_id):
         delete_video(pose_video_path)
         delete_video(dummy_raw_pose_video_path)
         delete_video(dummy_raw_target_video_path)
-        delete_video(compressed_target_video_path)
-        delete_video(compressed_pose_video_path)
         
     except Exception as e:
         round_collection.update_one(
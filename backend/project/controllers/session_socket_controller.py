@@ -3,6 +3,8 @@ from flask_socketio import emit, join_room, leave_room
 from bson.objectid import ObjectId
 from datetime import datetime, timezone
 from project.constants.constants import ROUND_COLLECTION
+from project.core.target_scoring.AnalysisConfig import InvalidAnalysisOptionsError, validate_analysis_options
+from project.utils.token import generate_upload_token
 
 class SessionSocketController:
     def __init__(self):
@@ -31,6 +33,9 @@ class SessionSocketController:
         if 'round_data' in self.active_sessions[session_id]:
             current_round = self.active_sessions[session_id]['round_data']
             collection.delete_one({'_id': ObjectId(current_round['_id'])})
+            if current_round.get('live'):
+                from project.controllers.live_scoring_controller import end_live_stream
+                end_live_stream(current_round['_id'])
             emit('discard_current_round', {'message': 'Round Discarded'}, to=session_id)
             self.active_sessions[session_id].pop('round_data', None)
           
@@ -115,6 +120,8 @@ class SessionSocketController:
             "created_at": str(created_date),
             "target_status": "LIVE",
             "pose_status": "LIVE",
+            # the devices of the session upload the videos of the round with it
+            "upload_token": generate_upload_token(result.inserted_id),
         }
 
         self.active_sessions[session_id]['round_data'] = response_data
@@ -124,7 +131,12 @@ class SessionSocketController:
         if not self.is_session_exist(session_id):
             return
         
-        self.active_sessions[session_id].pop('round_data', None)
+        round_data = self.active_sessions[session_id].pop('round_data', None)
+        
+        # the live scoring worker finishes the chunks that were already sent
+        if round_data and round_data.get('live'):
+            from project.controllers.live_scoring_controller import end_live_stream
+            end_live_stream(round_data['_id'])
         
         emit('recordingStopped', {'message': 'Recording stoped!'}, to=session_id)
     
@@ -133,4 +145,34 @@ class SessionSocketController:
         
     def target_upload_completed(self, session_id, round_id):
         emit('targetVideoUploadDone', {'round_id': round_id}, to=session_id)
-            
\ No newline at end of file
+        
+    def start_live_scoring(self, session_id, round_id, frame_size, analysis_options=None):
+        # the controller is imported once the database is initialized
+        from project.controllers.live_scoring_controller import score_target_live
+        
+        if not self.is_session_exist(session_id):
+            return
+        
+        round_data = self.active_sessions[session_id].get('round_data')
+        if not round_data or round_data['_id'] != round_id or round_data.get('live'):
+            return
+        
+        try:
+            analysis_options = validate_analysis_options(analysis_options)
+        except InvalidAnalysisOptionsError as e:
+            emit('liveScoreFailed', {'round_id': round_id, 'error': str(e)}, to=session_id)
+            return
+        
+        round_data['live'] = True
+        score_target_live.delay(round_id, session_id, frame_size, analysis_options)
+        emit('liveScoringStarted', {'round_id': round_id}, to=session_id)
+        
+    def push_target_chunk(self, session_id, round_id, chunk):
+        from project.controllers.live_scoring_controller import push_live_chunk
+        
+        if not self.is_session_exist(session_id):
+            return
+        
+        round_data = self.active_sessions[session_id].get('round_data')
+        if round_data and round_data['_id'] == round_id and round_data.get('live'):
+            push_live_chunk(round_id, chunk)
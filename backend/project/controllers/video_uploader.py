@@ -2,7 +2,7 @@ import requests
 from celery import current_app
 import os
 import subprocess
-import shutil
+import mimetypes
 
 def get_upload_token(video_name):
     response = requests.post(
@@ -29,7 +29,7 @@ def get_short_playback_url(tokens):
 def upload_video(file_path, token):
     with open(file_path, 'rb') as video_file:
         files = {
-            'file': (file_path.split('/')[-1], video_file, 'video/mp4')
+            'file': (file_path.split('/')[-1], video_file, mimetypes.guess_type(file_path)[0] or 'video/mp4')
         }
         
         headers = {
@@ -48,25 +48,16 @@ def delete_video(file_path):
     if os.path.exists(file_path):
         os.remove(file_path)
         
-def format_video_before_upload(input_file: str, output_file: str):
-    # command = [
-    #     "ffmpeg", "-i", input_file,
-    #     "-c:v", "libx264", "-preset", "medium", "-crf", "23",
-    #     "-c:a", "aac", "-b:a", "128k",
-    #     output_file
-    # ]
-    # subprocess.run(command, check=True)
-    shutil.copy(input_file, output_file)
-    
-def check_and_trim_video(type, video_timestamp, input_path, trimmed_path):
+def get_trim_range(type, video_timestamp):
     """
-    Check video timestamps and trim the video using FFmpeg.
+    Find the part of a video that overlaps the other video of the round.
 
     Args:
         type (str): The type of video ('pose' or 'target').
         video_timestamp (dict): A dictionary containing 'pose' and 'target' timestamps.
-        input_path (str): The path to the input video.
-        trimmed_path (str): The path to save the trimmed video.
+
+    Returns:
+        tuple: (start, duration) in seconds, or None when the video is kept whole.
     """
     pose_timestamp = int(video_timestamp['pose'])
     target_timestamp = int(video_timestamp['target'])
@@ -77,27 +68,39 @@ def check_and_trim_video(type, video_timestamp, input_path, trimmed_path):
     print(target_timestamp)
     print("&&&&&&&&&&&&&&&&&&")
 
-    video_to_trim_type = ""
-
     if pose_timestamp == 0 or target_timestamp == 0:
-        # No trimming needed, just rename the file
-        os.rename(input_path, trimmed_path)
-        return
+        return None
+
+    # only the video that started first is trimmed
+    video_started_first = (type == 'pose' and pose_timestamp < target_timestamp) or \
+                          (type == 'target' and target_timestamp < pose_timestamp)
+    if not video_started_first:
+        return None
+
+    # Calculate time difference and set trimming points
+    time_diff = abs(pose_timestamp - target_timestamp) / 1000  # Convert ms to seconds
+    start_time = min(pose_timestamp, target_timestamp) / 1000  # Convert ms to seconds
 
-    if type == 'pose' and pose_timestamp < target_timestamp:
-        video_to_trim_type = "pose"
+    return start_time, time_diff
+        
+def check_and_trim_video(type, video_timestamp, input_path, trimmed_path):
+    """
+    Check video timestamps and trim the video using FFmpeg.
 
-    if type == 'target' and target_timestamp < pose_timestamp:
-        video_to_trim_type = "target"
+    Args:
+        type (str): The type of video ('pose' or 'target').
+        video_timestamp (dict): A dictionary containing 'pose' and 'target' timestamps.
+        input_path (str): The path to the input video.
+        trimmed_path (str): The path to save the trimmed video.
+    """
+    trim_range = get_trim_range(type, video_timestamp)
 
-    if not video_to_trim_type:
-        # If both timestamps are fine, just rename the file
+    if trim_range is None:
+        # No trimming needed, just rename the file
         os.rename(input_path, trimmed_path)
         return
 
-    # Calculate time difference and set trimming points
-    time_diff = abs(pose_timestamp - target_timestamp) / 1000  # Convert ms to seconds
-    start_time = min(pose_timestamp, target_timestamp) / 1000  # Convert ms to seconds
+    start_time, time_diff = trim_range
 
     # FFmpeg command to trim the video
     command = [
@@ -114,6 +117,6 @@ def check_and_trim_video(type, video_timestamp, input_path, trimmed_path):
 
     try:
         subprocess.run(command, check=True)
-        print(f"{video_to_trim_type} video trimmed 🤩")
+        print(f"{type} video trimmed 🤩")
     except subprocess.CalledProcessError as e:
         print(f"Error during trimming: {e}")
\ No newline at end of file
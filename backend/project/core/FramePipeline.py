@@ -0,0 +1,201 @@
+from collections import deque
+from queue import Queue
+import threading
+
+QUEUE_SIZE = 16
+
+# marks the end of a queue
+_END = object()
+# the operations the decoder thread of a FrameReader performs on a frame
+_READ = object()
+_GRAB = object()
+_STOP = object()
+
+class FrameReader:
+    def __init__(self, cap, queueSize=QUEUE_SIZE):
+        '''
+        Decode the frames of a video capture on a background thread, ahead of the analysis.
+        Reads and grabs are forwarded to the thread in order, so skipped frames are never retrieved.
+        While frames are read one after the other, the next ones are read ahead (up to queueSize of them).
+        Otherwise only the next frame is grabbed ahead, it's retrieved if it's read: the caller may need
+        the frames it would skip once it analyzed the previous one.
+        Can be used in place of the video capture it wraps.
+
+        {cv2.VideoCapture} cap - The video capture to decode
+        {Number} queueSize - The maximum amount of frames read ahead
+        '''
+
+        self.cap = cap
+        self.queue_size = queueSize
+        self.results = Queue()
+        self.requests = deque()
+        self.condition = threading.Condition()
+        self.read_ahead = False
+        self.last_request = None
+        self.ahead = 0
+        self.stopped = False
+        self.finished = False
+        self.error = None
+        self.thread = threading.Thread(target=self._decode, daemon=True)
+        self.thread.start()
+
+    def _next_operation(self, wait):
+        # what to do with the next frame: as requested, read it ahead of the request,
+        # or None when nothing was requested yet and the caller should not wait
+        with self.condition:
+            while not self.stopped:
+                if self.requests and self.ahead > 0:
+                    # the requested frame was already read ahead
+                    self.requests.popleft()
+                    self.ahead -= 1
+                elif self.requests:
+                    return self.requests.popleft()
+                elif self.read_ahead and self.ahead < self.queue_size:
+                    self.ahead += 1
+                    return _READ
+                elif not wait:
+                    return None
+                else:
+                    self.condition.wait()
+
+            return _STOP
+
+    def _decode(self):
+        try:
+            grabbed = False
+            while True:
+                operation = self._next_operation(wait=grabbed)
+                if operation is _STOP:
+                    break
+
+                if operation is None:
+                    # decode the next frame while its request is awaited
+                    if not self.cap.grab():
+                        break
+
+                    grabbed = True
+                    continue
+
+                if operation is _READ:
+                    ret, frame = self.cap.retrieve() if grabbed else self.cap.read()
+                else:
+                    ret, frame = grabbed or self.cap.grab(), None
+
+                grabbed = False
+                if not ret:
+                    break
+
+                self.results.put(frame)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.results.put(_END)
+
+    def _request(self, operation):
+        if self.finished:
+            return _END
+
+        with self.condition:
+            self.requests.append(operation)
+            # read ahead while the frames are read one after the other
+            self.read_ahead = operation is _READ and self.last_request is _READ
+            self.last_request = operation
+            self.condition.notify()
+
+        result = self.results.get()
+        if result is _END:
+            self.finished = True
+            if self.error is not None:
+                raise self.error
+
+        return result
+
+    def read(self):
+        '''
+        Returns:
+            {Boolean} True if a frame was read.
+            {Numpy.array} The next frame of the video, in order, or None at the end of the video.
+        '''
+
+        frame = self._request(_READ)
+        if frame is _END:
+            return False, None
+
+        return True, frame
+
+    def grab(self):
+        '''
+        Skip a frame, without retrieving it unless it was already read ahead.
+
+        Returns:
+            {Boolean} True if a frame was skipped.
+        '''
+
+        return self._request(_GRAB) is not _END
+
+    def release(self):
+        '''
+        Stop decoding and release the wrapped video capture.
+        '''
+
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+        self.thread.join()
+        self.cap.release()
+
+class FrameWriter:
+    def __init__(self, out, queueSize=QUEUE_SIZE):
+        '''
+        Encode frames on a background thread, in the order they were written.
+        Writing blocks when queueSize frames are waiting to be encoded.
+        Can be used in place of the video writer it wraps.
+
+        {cv2.VideoWriter} out - The video writer to encode with
+        {Number} queueSize - The maximum amount of frames waiting to be encoded
+        '''
+
+        self.out = out
+        self.queue = Queue(maxsize=queueSize)
+        self.error = None
+        self.thread = threading.Thread(target=self._encode, daemon=True)
+        self.thread.start()
+
+    def _encode(self):
+        while True:
+            frame = self.queue.get()
+            if frame is _END:
+                break
+
+            # keep draining after a failure, so the writing side never blocks
+            if self.error is None:
+                try:
+                    self.out.write(frame)
+                except Exception as e:
+                    self.error = e
+
+    def write(self, frame):
+        '''
+        Queue a frame for encoding. The frame must not be modified afterwards.
+
+        Parameters:
+            {Numpy.array} frame - The frame to encode
+        '''
+
+        if self.error is not None:
+            raise self.error
+
+        self.queue.put(frame)
+
+    def release(self):
+        '''
+        Wait for all of the queued frames to be encoded and release the wrapped video writer.
+        '''
+
+        self.queue.put(_END)
+        self.thread.join()
+        self.out.release()
+
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,81 @@
+import numpy as np
+import cv2
+
+class Overlay:
+    def __init__(self):
+        '''
+        Layers drawn over the frames of a video, composited onto each frame in a single pass.
+        Each layer is rendered once and kept until its key changes (static layers keep a constant key),
+        all layers are rendered again when the resolution of the frames changes.
+        Drawing must be opaque (no anti-aliasing or blending), so a layer is fully described
+        by the pixels it covers and their colors.
+        '''
+
+        self.shape = None
+        self.layers = {}
+        self.composite_keys = None
+        self.canvas = None
+        self.mask = None
+
+    def _render(self, render):
+        # the pixels a layer covers are the pixels that differ from the background on either canvas
+        dark = np.zeros(self.shape, np.uint8)
+        bright = np.full(self.shape, 0xff, np.uint8)
+        render(dark)
+        render(bright)
+
+        covered = (dark != 0).any(axis=2) | (bright != 0xff).any(axis=2)
+        indices = np.flatnonzero(covered)
+        return indices, dark.reshape(-1, self.shape[2])[indices]
+
+    def _compose(self, names):
+        canvas = np.zeros(self.shape, np.uint8)
+        mask = np.zeros(self.shape[:2], np.uint8)
+        flat_canvas = canvas.reshape(-1, self.shape[2])
+        flat_mask = mask.reshape(-1)
+
+        # later layers are drawn over earlier ones
+        for name in names:
+            _, indices, values = self.layers[name]
+            flat_canvas[indices] = values
+            flat_mask[indices] = 1
+
+        self.canvas = canvas
+        self.mask = mask
+
+    def draw(self, img, layers):
+        '''
+        Draw the layers over an image.
+
+        Parameters:
+            {Numpy.array} img - The image on which to draw
+            {List} layers - [
+                               {Tuple} (
+                                          {String} The name of the layer,
+                                          {Object} A hashable key of the layer's content, the layer is
+                                                   rendered again only when it changes,
+                                          {Function} Draws the layer onto a given image
+                                       )
+                               ...
+                            ] in drawing order
+        '''
+
+        if img.shape != self.shape:
+            self.shape = img.shape
+            self.layers = {}
+            self.composite_keys = None
+
+        for name, key, render in layers:
+            layer = self.layers.get(name)
+            if layer is None or layer[0] != key:
+                self.layers[name] = (key,) + self._render(render)
+
+        composite_keys = [(name, self.layers[name][0]) for name, _, _ in layers]
+        if composite_keys != self.composite_keys:
+            self.composite_keys = composite_keys
+            self._compose([name for name, _, _ in layers])
+
+        # a masked copy over the whole frame is cheaper than indexing the covered pixels
+        composited = cv2.copyTo(self.canvas, self.mask, img)
+        if composited is not img:
+            img[...] = composited
@@ -0,0 +1,153 @@
+from project.core.pose_estimation.Sketcher import SKELETON_FEATURES
+
+VIDEO_OUTPUT = 'video'
+OVERLAY_TRACK_OUTPUT = 'overlay_track'
+TARGET_TRACK = 'target'
+POSE_TRACK = 'pose'
+CHUNK_FRAMES = 300
+LANDMARK_SCALE = 10000
+VISIBILITY_SCALE = 100
+FEATURE_SCALE = 10
+
+def uses_overlay_track(options):
+    '''
+    Parameters:
+        {Dict} options - The analysis options of the round
+
+    Returns:
+        {Boolean} True if the round's overlays are emitted as tracks instead of processed videos.
+    '''
+
+    return (options or {}).get('output', VIDEO_OUTPUT) == OVERLAY_TRACK_OUTPUT
+
+def _chunk_start(frame, chunkFrames):
+    return frame - frame % chunkFrames
+
+def target_track_chunks(sortedHits, chunkFrames=CHUNK_FRAMES):
+    '''
+    Encode the hits of a round as a chunked overlay track.
+    Each chunk covers the frames [start_frame, end_frame) and is self contained:
+    {
+        "start_frame": {Number},
+        "end_frame": {Number},
+        "hits": The hits that are visible at start_frame [[id, x, y, score], ...],
+        "events": The hits that appear within the chunk [[frame, [id, x, y, score]], ...]
+    }
+    A hit is visible from its frame onwards and the most recent hit is the current one.
+    Chunks without events are omitted, frames that are not covered by any chunk
+    keep the state at the end of the closest preceding chunk.
+
+    Parameters:
+        {List} sortedHits - The processed hit information of the round's score, sorted by frame
+        {Number} chunkFrames - Amount of frames in each chunk
+
+    Returns:
+        {List} The chunks of the track, in order.
+    '''
+
+    chunks = [{"start_frame": 0, "end_frame": chunkFrames, "hits": [], "events": []}]
+    visible_hits = []
+
+    for hit in sortedHits:
+        frame = int(hit['frame'])
+        start_frame = _chunk_start(frame, chunkFrames)
+
+        if start_frame != chunks[-1]['start_frame']:
+            chunks.append({
+                "start_frame": start_frame,
+                "end_frame": start_frame + chunkFrames,
+                "hits": list(visible_hits),
+                "events": []
+            })
+
+        encoded_hit = [int(hit['id']), int(hit['point'][0]), int(hit['point'][1]), int(hit['score'])]
+        chunks[-1]['events'].append([frame, encoded_hit])
+        visible_hits.append(encoded_hit)
+
+    return chunks
+
+class PoseTrackWriter:
+    def __init__(self, chunkFrames=CHUNK_FRAMES):
+        '''
+        Encode the skeletons of a round as a chunked overlay track, frame by frame.
+        Each chunk covers the frames [start_frame, end_frame) and is self contained:
+        {
+            "start_frame": {Number},
+            "end_frame": {Number},
+            "landmarks": Per frame [x, y, visibility, ...] of every landmark, quantized
+                         (x and y by LANDMARK_SCALE of the frame size, visibility by VISIBILITY_SCALE),
+            "features": Per frame values of SKELETON_FEATURES, quantized by FEATURE_SCALE,
+            "phases": The phase at start_frame and every change of phase [[frame, phase], ...]
+        }
+        The i-th entry of a chunk belongs to the frame start_frame + i, a frame without a detected pose is null.
+        The first frame of a chunk, and a frame after a null one, hold absolute values,
+        any other frame holds the differences from the values of the previous frame.
+
+        {Number} chunkFrames - Amount of frames in each chunk
+        '''
+
+        self.chunk_frames = chunkFrames
+        self.chunks = []
+        self.previous = None
+
+    def _start_chunk(self, frame):
+        self.chunks.append({
+            "start_frame": frame,
+            "end_frame": frame,
+            "landmarks": [],
+            "features": [],
+            "phases": []
+        })
+        self.previous = None
+
+    def _encode(self, values, previous, index):
+        if values is None:
+            return None
+
+        if previous is None or previous[index] is None:
+            return values
+
+        return [value - previous_value for value, previous_value in zip(values, previous[index])]
+
+    def add(self, frame, skeleton_data, features, phase):
+        '''
+        Add the pose of a frame. Must be called for every frame, in order.
+
+        Parameters:
+            {Number} frame - The number of the frame
+            {Dict} skeleton_data - Dictionary of joint ID to (x, y, z, visibility) coordinates
+            {Dict} features - Dictionary of skeleton feature name to its value
+            {String} phase - The phase of the frame
+        '''
+
+        if not self.chunks or frame >= self.chunks[-1]['start_frame'] + self.chunk_frames:
+            self._start_chunk(frame)
+
+        landmarks = None
+        if skeleton_data:
+            landmarks = []
+            for joint_id in sorted(skeleton_data):
+                joint = skeleton_data[joint_id]
+                landmarks += [int(round(joint['x'] * LANDMARK_SCALE)), int(round(joint['y'] * LANDMARK_SCALE)),
+                              int(round(joint['visibility'] * VISIBILITY_SCALE))]
+
+        feature_values = None
+        if features:
+            feature_values = [int(round(features.get(name, 0) * FEATURE_SCALE)) for name in SKELETON_FEATURES]
+
+        chunk = self.chunks[-1]
+        chunk['landmarks'].append(self._encode(landmarks, self.previous, 0))
+        chunk['features'].append(self._encode(feature_values, self.previous, 1))
+        if not chunk['phases'] or chunk['phases'][-1][1] != phase:
+            chunk['phases'].append([frame, phase])
+
+        chunk['end_frame'] = frame + 1
+        self.previous = (landmarks, feature_values)
+
+    def finish(self):
+        '''
+        Returns:
+            {List} The chunks of the track, in order.
+        '''
+
+        return self.chunks
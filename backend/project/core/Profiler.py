@@ -0,0 +1,184 @@
+from bisect import bisect_left
+import time
+
+# the upper bounds of the duration histogram's buckets, the last bucket is unbounded
+HISTOGRAM_BOUNDS_MS = [0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+class _StageTimer:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+class Profiler:
+    def __init__(self):
+        '''
+        Aggregates the durations of the named stages of a round: their count, total, maximum
+        and a histogram of the durations (see HISTOGRAM_BOUNDS_MS).
+        Stages are timed with "with profiler.stage(name):", a stage must not be nested within itself.
+        Stages that hand their work over to a background thread measure the time spent waiting for it.
+        '''
+
+        self.enabled = True
+        self.stages = {}
+        self._timers = {}
+
+    def stage(self, name):
+        '''
+        Parameters:
+            {String} name - The name of the stage
+
+        Returns:
+            {Object} A context manager that times the stage.
+        '''
+
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _StageTimer(self, name)
+
+        return timer
+
+    def record(self, name, seconds):
+        '''
+        Parameters:
+            {String} name - The name of the stage
+            {Number} seconds - The duration of a single run of the stage [s]
+        '''
+
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"count": 0, "total_s": 0.0, "max_ms": 0.0,
+                                         "histogram": [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)}
+
+        duration_ms = seconds * 1000
+        stage['count'] += 1
+        stage['total_s'] += seconds
+        stage['max_ms'] = max(stage['max_ms'], duration_ms)
+        stage['histogram'][bisect_left(HISTOGRAM_BOUNDS_MS, duration_ms)] += 1
+
+    def merge(self, profile):
+        '''
+        Add the stages of another profile, e.g. of a segment analyzed in another process.
+
+        Parameters:
+            {Dict} profile - A profile (see to_dict)
+        '''
+
+        for name, other in profile['stages'].items():
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = {**other, "histogram": list(other['histogram'])}
+                continue
+
+            stage['count'] += other['count']
+            stage['total_s'] += other['total_s']
+            stage['max_ms'] = max(stage['max_ms'], other['max_ms'])
+            stage['histogram'] = [count + other_count for count, other_count in zip(stage['histogram'], other['histogram'])]
+
+    def to_dict(self):
+        '''
+        Returns:
+            {Dict} The profile, as stored in the round document {
+                       "histogram_bounds_ms": HISTOGRAM_BOUNDS_MS,
+                       "stages": {
+                                     {String} The name of the stage: {
+                                         "count": Amount of runs,
+                                         "total_s": Total duration [s],
+                                         "max_ms": Longest run [ms],
+                                         "histogram": Amount of runs in each duration bucket
+                                     }
+                                     ...
+                                 }
+                   }
+        '''
+
+        return {"histogram_bounds_ms": HISTOGRAM_BOUNDS_MS, "stages": self.stages}
+
+class NullProfiler:
+    def __init__(self):
+        '''
+        A profiler that measures nothing, for rounds that are not profiled.
+        '''
+
+        self.enabled = False
+        self._timer = _NullTimer()
+
+    def stage(self, name):
+        return self._timer
+
+    def record(self, name, seconds):
+        pass
+
+    def merge(self, profile):
+        pass
+
+NULL_PROFILER = NullProfiler()
+
+def _histogram_percentile(histogram, bounds, fraction):
+    # the upper bound of the bucket the percentile falls in (the last bound for the unbounded bucket)
+    target = fraction * sum(histogram)
+    cumulative = 0
+    for index, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= target and count:
+            return bounds[min(index, len(bounds) - 1)]
+
+    return 0
+
+def profile_report(profile):
+    '''
+    Summarize a stored profile.
+
+    Parameters:
+        {Dict} profile - A profile (see Profiler.to_dict)
+
+    Returns:
+        {List} The stages, from the longest to the shortest in total [
+                   {Dict} {
+                              "stage": The name of the stage,
+                              "count": Amount of runs,
+                              "total_s": Total duration [s],
+                              "share": The stage's part of the total duration of all stages,
+                              "mean_ms": Mean duration [ms],
+                              "p50_ms": Median duration, as the upper bound of its histogram bucket [ms],
+                              "p95_ms": 95th percentile duration, as the upper bound of its histogram bucket [ms],
+                              "max_ms": Longest run [ms]
+                          }
+                   ...
+               ]
+    '''
+
+    bounds = profile['histogram_bounds_ms']
+    total = sum(stage['total_s'] for stage in profile['stages'].values()) or 1
+    report = [
+        {
+            "stage": name,
+            "count": stage['count'],
+            "total_s": round(stage['total_s'], 3),
+            "share": round(stage['total_s'] / total, 4),
+            "mean_ms": round(stage['total_s'] * 1000 / max(stage['count'], 1), 3),
+            "p50_ms": _histogram_percentile(stage['histogram'], bounds, .5),
+            "p95_ms": _histogram_percentile(stage['histogram'], bounds, .95),
+            "max_ms": round(stage['max_ms'], 3)
+        }
+        for name, stage in profile['stages'].items()
+    ]
+
+    return sorted(report, key=lambda x: x['total_s'], reverse=True)
@@ -0,0 +1,148 @@
+import subprocess
+import tempfile
+import threading
+import cv2
+import numpy as np
+
+STREAM_FPS = 30
+
+class StreamDecoder:
+    def __init__(self, chunks, frameSize, fps=STREAM_FPS, trimRange=None):
+        '''
+        Decode a video that is still being received, e.g. the MediaRecorder chunks of a live recording,
+        with a single long-lived ffmpeg process. The chunks are fed to ffmpeg on a background thread
+        and the frames are read back as they are decoded.
+        Can be used in place of a cv2.VideoCapture.
+
+        {Iterable} chunks - The bytes of the video in order, the iteration ends with the video
+        {Tuple} frameSize - The size of the decoded frames (width, height), the video is scaled to it
+        {Number} fps - The frame rate of the decoded frames (recorders produce variable frame rates),
+                       None to keep every frame of the video, as a cv2.VideoCapture of the file would
+        {Tuple} trimRange - (start, duration) in seconds, the part of the video to decode (None for all of it)
+        '''
+
+        width, height = frameSize
+        command = ["ffmpeg", "-loglevel", "error", "-i", "-", "-an"]
+        if trimRange is not None:
+            start, duration = trimRange
+            command += ["-ss", str(start), "-t", str(duration)]
+
+        if fps is not None:
+            command += ["-vf", f"fps={fps},scale={width}:{height}"]
+        else:
+            command += ["-vf", f"scale={width}:{height}", "-vsync", "passthrough"]
+
+        command += ["-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
+
+        self.frame_shape = (height, width, 3)
+        self.frame_bytes = width * height * 3
+        self.received_bytes = 0
+        self.grabbed = None
+        self.error = None
+
+        # a file can't fill up and block ffmpeg the way an unread pipe can
+        self.errors = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self.errors)
+        self.feeder = threading.Thread(target=self._feed, args=(chunks,), daemon=True)
+        self.feeder.start()
+
+    def _feed(self, chunks):
+        try:
+            for chunk in chunks:
+                self.received_bytes += len(chunk)
+                self.process.stdin.write(chunk)
+        except (BrokenPipeError, ValueError):
+            # ffmpeg stopped, or the decoder was released before the end of the video
+            pass
+        except Exception as e:
+            # the video can't be completed, it must not be mistaken for a shorter one
+            self.error = e
+        finally:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def _failure(self):
+        self.errors.seek(0)
+        message = self.errors.read().decode(errors='replace').strip()
+        return RuntimeError(f"ffmpeg failed with exit code {self.process.returncode}: {message}")
+
+    def grab(self):
+        '''
+        Receive the next frame, without converting it until it's retrieved.
+
+        Returns:
+            {Boolean} True if a frame was received.
+        '''
+
+        data = self.process.stdout.read(self.frame_bytes)
+        if len(data) < self.frame_bytes:
+            self.grabbed = None
+            if self.process.wait() != 0:
+                raise self._failure()
+
+            self.feeder.join()
+            if self.error is not None:
+                raise self.error
+
+            return False
+
+        self.grabbed = data
+        return True
+
+    def retrieve(self):
+        '''
+        Returns:
+            {Boolean} True if a frame was grabbed.
+            {Numpy.array} The last grabbed frame, or None if no frame was grabbed.
+        '''
+
+        if self.grabbed is None:
+            return False, None
+
+        return True, np.frombuffer(self.grabbed, np.uint8).reshape(self.frame_shape).copy()
+
+    def read(self):
+        '''
+        Returns:
+            {Boolean} True if a frame was read.
+            {Numpy.array} The next frame of the video, or None once the video ended.
+        '''
+
+        if not self.grab():
+            return False, None
+
+        return self.retrieve()
+
+    def release(self):
+        '''
+        Stop decoding, and wait for the ffmpeg process to exit.
+        The feeding thread stops with the next chunk it receives.
+        '''
+
+        self.process.stdout.close()
+        if self.process.poll() is None:
+            self.process.kill()
+
+        self.process.wait()
+        self.errors.close()
+
+def probe_frame_size(videoPath):
+    '''
+    Parameters:
+        {String} videoPath - The path of a video, which can still be incomplete
+
+    Returns:
+        {Tuple} The size of the frames of the video (width, height), or None if no frame can be decoded yet.
+    '''
+
+    cap = cv2.VideoCapture(videoPath)
+    ret, frame = cap.read()
+    cap.release()
+
+    if not ret:
+        return None
+
+    height, width = frame.shape[:2]
+    return width, height
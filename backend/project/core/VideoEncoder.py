@@ -0,0 +1,115 @@
+import subprocess
+import tempfile
+import shutil
+import cv2
+
+ENCODER = 'ffmpeg'
+ENCODER_PRESET = 'veryfast'
+ENCODER_CRF = 23
+
+class EncoderConfig:
+    def __init__(self, options=None):
+        '''
+        {Dict} options - Per round overrides of the encoding options (missing keys use the defaults)
+                         {String} encoder - 'ffmpeg' to encode H.264 with an ffmpeg process,
+                                            'opencv' to encode mp4v with cv2.VideoWriter
+                         {String} encoder_preset - The libx264 preset (speed / compression trade-off)
+                         {Number} encoder_crf - The libx264 constant rate factor (lower is better quality)
+        '''
+
+        options = options or {}
+
+        self.encoder = options.get('encoder', ENCODER)
+        self.preset = options.get('encoder_preset', ENCODER_PRESET)
+        self.crf = int(options.get('encoder_crf', ENCODER_CRF))
+
+class FFmpegWriter:
+    def __init__(self, outputName, fps, frameSize, preset=ENCODER_PRESET, crf=ENCODER_CRF):
+        '''
+        Encode frames with a single long-lived ffmpeg process, fed with raw frames through a pipe.
+        The output is an H.264 mp4 that can be uploaded as is.
+        Can be used in place of a cv2.VideoWriter.
+
+        {String} outputName - The path of the output file
+        {Number} fps - The frame rate of the output video
+        {Tuple} frameSize - The size of the frames (width, height)
+        {String} preset - The libx264 preset
+        {Number} crf - The libx264 constant rate factor
+        '''
+
+        width, height = frameSize
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "-",
+            "-an",
+            "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+            # yuv420p (required by most players) only supports even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+            outputName
+        ]
+
+        # a file can't fill up and block ffmpeg the way an unread pipe can
+        self.errors = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=self.errors)
+
+    def _failure(self):
+        self.errors.seek(0)
+        message = self.errors.read().decode(errors='replace').strip()
+        return RuntimeError(f"ffmpeg failed with exit code {self.process.returncode}: {message}")
+
+    def write(self, frame):
+        '''
+        Parameters:
+            {Numpy.array} frame - The frame to encode [BGR]
+        '''
+
+        try:
+            self.process.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            self.process.wait()
+            raise self._failure()
+
+    def release(self):
+        '''
+        Wait for all of the written frames to be encoded and the output file to be finalized.
+        '''
+
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        self.process.wait()
+        try:
+            if self.process.returncode != 0:
+                raise self._failure()
+        finally:
+            self.errors.close()
+
+def create_video_writer(outputName, fps, frameSize, config=None):
+    '''
+    Create the writer of an output video.
+
+    Parameters:
+        {String} outputName - The path of the output file
+        {Number} fps - The frame rate of the output video
+        {Tuple} frameSize - The size of the frames (width, height)
+        {EncoderConfig} config - The encoding options (the defaults if None)
+
+    Returns:
+        {FFmpegWriter} The writer of the video (a cv2.VideoWriter if ffmpeg is not used or not installed).
+    '''
+
+    config = config or EncoderConfig()
+
+    if config.encoder == 'ffmpeg':
+        if shutil.which("ffmpeg"):
+            return FFmpegWriter(outputName, fps, frameSize, config.preset, config.crf)
+
+        print("ffmpeg is not installed, encoding with OpenCV")
+
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter(outputName, fourcc, fps, frameSize)
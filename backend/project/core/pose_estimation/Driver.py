@@ -1,7 +1,7 @@
 from project.core.pose_estimation.VideoAnalyzer import VideoAnalyzer
 from project.core.pose_estimation.Sketcher import Sketcher
 
-def process_pose_video_data(input_filepath, output_filepath):
+def process_pose_video_data(input_filepath, output_filepath, pipelined=True, encoding=None, overlay_track=None):
   # input
   video_name = input_filepath
   
@@ -54,6 +54,6 @@ def process_pose_video_data(input_filepath, output_filepath):
   # analyze
   sketcher = Sketcher(connections, joint_color, bone_color, thickness)
   video_analyzer = VideoAnalyzer(video_name)
-  aiming_frames = video_analyzer.analyze(output_filepath, sketcher)
+  aiming_frames = video_analyzer.analyze(output_filepath, sketcher, pipelined, encoding, overlay_track)
   print("😇 Pose Process Done 😇")
   return aiming_frames
\ No newline at end of file
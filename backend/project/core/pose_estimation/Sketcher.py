@@ -1,11 +1,20 @@
+from project.core.Overlay import Overlay
 import cv2
 
+SKELETON_FEATURES = [
+    "bow_shoulder_angle",
+    "drawing_shoulder_angle",
+    "bow_arm_elbow_angle",
+    "drawing_arm_elbow_angle",    
+]
+
 class Sketcher:
     def __init__(self, connections=None, joint_color=(0, 255, 0), bone_color=(255, 0, 0), thickness=2):
         self.connections = connections
         self.joint_color = joint_color
         self.bone_color = bone_color
         self.thickness = thickness
+        self.overlay = Overlay()
 
     def draw_skeleton(self, img, skeleton_data):
         """
@@ -41,32 +50,38 @@ class Sketcher:
             - "phase": The current phase.
             dataColor (tuple, optional): The color of the phase text. Defaults to (0, 0, 255).
         """
+        self.type_phase_label(img)
+        self.type_phase_value(img, phase_info["phase"], dataColor)
+
+    def type_phase_label(self, img):
         img_h, img_w, _ = img.shape
         cv2.putText(img, 'Phase: ', (int(img_w * .52), int(img_h * .905)),
                     cv2.FONT_HERSHEY_SIMPLEX, 1.4, (0x0,0x0,0x0), 4)
-        
-        cv2.putText(img, phase_info["phase"], (int(img_w * .675), int(img_h * .905)),
+
+    def type_feature_labels(self, img):
+        img_h, img_w, _ = img.shape
+
+        for i in range(len(SKELETON_FEATURES)):
+            cv2.putText(img, SKELETON_FEATURES[i] + ': ', (int(img_w * .6), int(img_h * (.1 + (.05 * i)))),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0x0,0x0,0x0), 2)
+
+    def type_phase_value(self, img, phase, dataColor = (0x0,0x0,0xff)):
+        img_h, img_w, _ = img.shape
+        cv2.putText(img, phase, (int(img_w * .675), int(img_h * .905)),
                     cv2.FONT_HERSHEY_SIMPLEX, 1.4, dataColor, 4)
-    
 
     def type_skeleton_feature(self, img, features, dataColor = (0x0,0x0,0xff)):
+        self.type_feature_labels(img)
+        self.type_feature_values(img, features, dataColor)
+
+    def type_feature_values(self, img, features, dataColor = (0x0,0x0,0xff)):
         img_h, img_w, _ = img.shape
         
         font_size = 0.8
         font_weight = 2
-        
-        features_list = [
-            "bow_shoulder_angle",
-            "drawing_shoulder_angle",
-            "bow_arm_elbow_angle",
-            "drawing_arm_elbow_angle",    
-        ]
                 
-        for i in range(len(features_list)):
-            feature = features_list[i]
-            cv2.putText(img, feature + ': ', (int(img_w * .6), int(img_h * (.1 + (.05 * i)))),
-                        cv2.FONT_HERSHEY_SIMPLEX, font_size, (0x0,0x0,0x0), font_weight)
-            
+        for i in range(len(SKELETON_FEATURES)):
+            feature = SKELETON_FEATURES[i]
             value = features[feature] if feature in features else 0
             cv2.putText(img, "{:.1f}".format(value), (int(img_w * .9), int(img_h * (.1 + (.05 * i)))),
                         cv2.FONT_HERSHEY_SIMPLEX, font_size, dataColor, font_weight)
@@ -79,4 +94,32 @@ class Sketcher:
             
         cv2.putText(img, str(frame), (int(img_w * .9), int(img_h * 0.8)),
                     cv2.FONT_HERSHEY_SIMPLEX, font_size, dataColor, font_weight)
+
+    def draw_frame_overlay(self, img, skeleton_data, phase_info, features, frame):
+        """
+        Draws the skeleton and all of the frame's data on the image.
+        The labels are rendered once per resolution and the phase only when it changes,
+        the skeleton, the feature values and the frame number change every frame and are drawn directly.
+
+        Args:
+            img (numpy.ndarray): The image on which to draw.
+            skeleton_data (dict): Dictionary of joint ID to (x, y, z, visibility) coordinates.
+            phase_info (dict): Dictionary containing phase data (see type_pose_phase).
+            features (dict): Dictionary of skeleton feature name to its value.
+            frame (int): The number of the frame.
+        """
+        self.draw_skeleton(img, skeleton_data)
+
+        def type_labels(canvas):
+            self.type_phase_label(canvas)
+            self.type_feature_labels(canvas)
+
+        phase = phase_info["phase"]
+        self.overlay.draw(img, [
+            ('labels', None, type_labels),
+            ('phase', phase, lambda canvas: self.type_phase_value(canvas, phase)),
+        ])
+
+        self.type_feature_values(img, features)
+        self.type_frame(img, frame)
         
\ No newline at end of file
@@ -1,5 +1,7 @@
 from project.core.pose_estimation.PoseEstimator import PoseEstimator
 from project.core.pose_estimation.Sketcher import Sketcher
+from project.core.FramePipeline import FrameReader, FrameWriter
+from project.core.VideoEncoder import create_video_writer
 import cv2
 
 
@@ -17,12 +19,21 @@ class VideoAnalyzer:
     def _analyze_frame(self, frame):
         return self.pose_estimator.process_pose_frame(frame)
 
-    def analyze(self, outputName, sketcher: Sketcher):
+    def analyze(self, outputName, sketcher: Sketcher, pipelined=False, encoding=None, overlayTrack=None):
+        # outputName - None to skip drawing and writing the processed video
+        # overlayTrack - A PoseTrackWriter to record the pose of every frame into, if given
 
         # set output configurations
-        frame_size = (self.frame_w, self.frame_h)
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(outputName, fourcc, 30, frame_size)
+        out = None
+        if outputName is not None:
+            frame_size = (self.frame_w, self.frame_h)
+            out = create_video_writer(outputName, 30, frame_size, encoding)
+
+        # decode and encode on background threads, alongside the pose estimation
+        if pipelined:
+            self.cap = FrameReader(self.cap)
+            if out is not None:
+                out = FrameWriter(out)
 
         first_drawing_frame = 0
         drawing_frames_count = 0
@@ -45,10 +56,11 @@ class VideoAnalyzer:
                     "not_drawing_frames_count":not_drawing_frames_count,
                     'phase': phase
                 }
-                sketcher.draw_skeleton(frame, skeleton_data)
-                sketcher.type_pose_phase(frame, phase_info)
-                sketcher.type_skeleton_feature(frame, features)
-                sketcher.type_frame(frame, current_frame)
+                if overlayTrack is not None:
+                    overlayTrack.add(current_frame, skeleton_data, features, phase)
+
+                if out is not None:
+                    sketcher.draw_frame_overlay(frame, skeleton_data, phase_info, features, current_frame)
 
                 if phase == "Drawing" and drawing_frames_count == DRAWING_FRAME_THRESHOLD:
                     # drawing phase confirmed
@@ -74,11 +86,13 @@ class VideoAnalyzer:
                     first_drawing_frame = 0
                     drawing_frames_count = 0
 
-                out.write(frame)
+                if out is not None:
+                    out.write(frame)
 
             else:
                 break
 
         self.cap.release()
-        out.release()
+        if out is not None:
+            out.release()
         return aiming_frames
\ No newline at end of file
@@ -0,0 +1,219 @@
+from project.core.VideoEncoder import EncoderConfig
+from project.core.target_scoring.FeatureDetector import SIFT, ORB, AKAZE
+from project.core.target_scoring.HomographicMatcher import BRUTE_FORCE, FLANN
+
+SPARSE_STRIDE = 1
+DENSE_HOLD_TIME = 1.0
+HIT_TOLERANCE_PX = 30
+VERIFY_TIME = 2.0
+MATCHER = 'bf'
+DETECTOR = 'sift'
+COARSE_SCALE = 1
+TRACKER = False
+PIPELINED = True
+SEGMENT_PROCESSES = 1
+SEGMENT_OVERLAP_TIME = 4.0
+RECONSTRUCTION = 'raster'
+PROFILING = False
+MOTION_GATE = False
+MOTION_THRESHOLD = .001
+MOTION_PIXEL_THRESHOLD = 12
+MOTION_SCALE = .125
+MOTION_MAX_SKIP_TIME = 1.0
+SHOT_EVENTS = False
+EVENT_THRESHOLD = .002
+EVENT_SETTLE_TIME = .2
+EVENT_MAX_BURST_TIME = 1.0
+
+X264_PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium', 'slow', 'slower', 'veryslow')
+
+# the type and the allowed values (a range or the choices) of each analysis option a request may set
+OPTIONS_SCHEMA = {
+    'single_decode': (bool, None),
+    'sparse_stride': (int, (1, 30)),
+    'dense_hold_time': (float, (0, 60)),
+    'hit_tolerance_px': (float, (1, 200)),
+    'verify_time': (float, (0, 30)),
+    'matcher': (str, (FLANN, BRUTE_FORCE)),
+    'detector': (str, (SIFT, ORB, AKAZE)),
+    'coarse_scale': (float, (.05, 1)),
+    'tracker': (bool, None),
+    'pipelined': (bool, None),
+    'segment_processes': (int, (0, 64)),
+    'segment_overlap_time': (float, (0, 60)),
+    'reconstruction': (str, ('analytic', 'raster')),
+    'profiling': (bool, None),
+    'motion_gate': (bool, None),
+    'motion_threshold': (float, (0, 1)),
+    'motion_pixel_threshold': (int, (0, 255)),
+    'motion_scale': (float, (.01, 1)),
+    'motion_max_skip_time': (float, (0, 60)),
+    'shot_events': (bool, None),
+    'event_threshold': (float, (0, 1)),
+    'event_settle_time': (float, (0, 10)),
+    'event_max_burst_time': (float, (0, 60)),
+    'encoder': (str, ('ffmpeg', 'opencv')),
+    'encoder_preset': (str, X264_PRESETS),
+    'encoder_crf': (int, (0, 51)),
+    'output': (str, ('video', 'overlay_track'))
+}
+
+class InvalidAnalysisOptionsError(ValueError):
+    pass
+
+def parse_bool(value):
+    '''
+    Parameters:
+        {Object} value - A boolean, 0 or 1, or one of the strings 'true', 'false', '1', '0'
+
+    Returns:
+        {Boolean} The value as a boolean (bool('false') would be True).
+    '''
+
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ('true', '1', 'false', '0'):
+        return value.strip().lower() in ('true', '1')
+
+    raise ValueError(f"{value!r} is not a boolean")
+
+def validate_analysis_options(options):
+    '''
+    Check the analysis options of a request before they are stored and sent to the tasks.
+
+    Parameters:
+        {Object} options - The analysis options of the request (None for the defaults)
+
+    Returns:
+        {Dict} The options, with their booleans parsed.
+
+    Raises:
+        {InvalidAnalysisOptionsError} If the options are not a dict, or a key is unknown, or a value
+                                      has the wrong type or is out of range.
+    '''
+
+    if options is None:
+        return {}
+    if not isinstance(options, dict):
+        raise InvalidAnalysisOptionsError("analysis_options must be an object")
+
+    validated = {}
+    for key, value in options.items():
+        if key not in OPTIONS_SCHEMA:
+            raise InvalidAnalysisOptionsError(f"Unknown analysis option '{key}'")
+
+        value_type, allowed = OPTIONS_SCHEMA[key]
+        if value_type is bool:
+            try:
+                validated[key] = parse_bool(value)
+            except ValueError:
+                raise InvalidAnalysisOptionsError(f"'{key}' must be a boolean")
+            continue
+
+        # JSON has no integer type of its own, but a boolean is not a number
+        if value_type is str:
+            valid_type = isinstance(value, str)
+        elif value_type is int:
+            valid_type = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            valid_type = isinstance(value, (int, float)) and not isinstance(value, bool)
+
+        if not valid_type:
+            type_name = {str: 'a string', int: 'an integer', float: 'a number'}[value_type]
+            raise InvalidAnalysisOptionsError(f"'{key}' must be {type_name}")
+
+        if value_type is str:
+            if value not in allowed:
+                raise InvalidAnalysisOptionsError(f"'{key}' must be one of {', '.join(allowed)}")
+        elif not allowed[0] <= value <= allowed[1]:
+            raise InvalidAnalysisOptionsError(f"'{key}' must be between {allowed[0]} and {allowed[1]}")
+
+        validated[key] = value
+
+    return validated
+
+class AnalysisConfig:
+    def __init__(self, options=None):
+        '''
+        {Dict} options - Per round overrides of the analysis options (missing keys use the defaults)
+                         {Boolean} single_decode - Spool the decoded frames instead of decoding the video twice
+                         {Number} sparse_stride - Analyze every n-th frame while the target is stable
+                                                  (1 by default, larger strides may find a hit a few frames later)
+                         {Number} dense_hold_time - Seconds of dense analysis after the hits last changed
+                         {Number} hit_tolerance_px - Amount of pixels around a hit in which another
+                                                     detection is considered the same hit
+                         {Number} verify_time - Seconds a candidate has to be seen before it's verified
+                         {String} matcher - The feature matching backend ('flann' or 'bf').
+                                            'bf' by default, FLANN's approximate neighbours can change the homography
+                         {String} detector - The feature detector ('sift', 'orb' or 'akaze')
+                         {Number} coarse_scale - The scale of the coarse matching pass (1 to match at full resolution only).
+                                                 1 by default, the coarse pass can settle on another homography
+                         {Boolean} tracker - Refresh the homography from its inliers followed by optical flow,
+                                             between full feature detections (each refresh detects the features if False).
+                                             Off by default, the tracked bull'seye drifts up to ~1.5px from the detected one
+                         {Boolean} pipelined - Decode and encode on background threads, alongside the analysis
+                         {Number} segment_processes - Analyze the video in segments on this many processes
+                                                      (1 to analyze it in a single process, 0 for all cores)
+                         {Number} segment_overlap_time - Seconds each segment overlaps the next one by
+                         {String} reconstruction - How the projectiles are reconstructed from their straight segments
+                                                   ('raster' to draw, extend and refind their contours,
+                                                    'analytic' to merge the segments geometrically, which is not
+                                                    equivalent yet, see tests/test_reconstruction_equivalence.py)
+                         {Boolean} profiling - Time the stages of the analysis and store them on the round
+                         {Boolean} motion_gate - Reuse the hits of the last analyzed frame while the target's region is static.
+                                                 Off by default, changes below the thresholds may delay a hit
+                         {Number} motion_threshold - The fraction of the target's region that has to change
+                                                     for a frame to be analyzed again
+                         {Number} motion_pixel_threshold - The gray level difference from which a downscaled pixel is changed
+                         {Number} motion_scale - The downscaling factor of the target's region before it's compared
+                         {Number} motion_max_skip_time - Seconds after which a frame is analyzed regardless of its motion
+                         {Boolean} shot_events - Only search for hits in dense windows after projectiles arrive,
+                                                 which are detected by differencing consecutive frames
+                                                 (the downscaling uses motion_scale and motion_pixel_threshold)
+                         {Number} event_threshold - The fraction of the target's ring that has to change between two frames
+                                                    to count as the motion of an arrival
+                         {Number} event_settle_time - Seconds of stillness that end the motion of an arrival
+                         {Number} event_max_burst_time - Seconds after which motion that does not settle is an arrival anyway
+                         The encoding options of the output video are described in VideoEncoder.EncoderConfig.
+        '''
+
+        options = options or {}
+
+        self.single_decode = parse_bool(options.get('single_decode', True))
+        self.sparse_stride = max(1, int(options.get('sparse_stride', SPARSE_STRIDE)))
+        self.dense_hold_time = float(options.get('dense_hold_time', DENSE_HOLD_TIME))
+        self.hit_tolerance_px = float(options.get('hit_tolerance_px', HIT_TOLERANCE_PX))
+        self.verify_time = float(options.get('verify_time', VERIFY_TIME))
+        self.matcher = options.get('matcher', MATCHER)
+        self.detector = options.get('detector', DETECTOR)
+        self.coarse_scale = min(1.0, float(options.get('coarse_scale', COARSE_SCALE)))
+        self.tracker = parse_bool(options.get('tracker', TRACKER))
+        self.pipelined = parse_bool(options.get('pipelined', PIPELINED))
+        self.segment_processes = max(0, int(options.get('segment_processes', SEGMENT_PROCESSES)))
+        self.segment_overlap_time = float(options.get('segment_overlap_time', SEGMENT_OVERLAP_TIME))
+        self.reconstruction = options.get('reconstruction', RECONSTRUCTION)
+        self.profiling = parse_bool(options.get('profiling', PROFILING))
+        self.motion_gate = parse_bool(options.get('motion_gate', MOTION_GATE))
+        self.motion_threshold = float(options.get('motion_threshold', MOTION_THRESHOLD))
+        self.motion_pixel_threshold = int(options.get('motion_pixel_threshold', MOTION_PIXEL_THRESHOLD))
+        self.motion_scale = min(1.0, float(options.get('motion_scale', MOTION_SCALE)))
+        self.motion_max_skip_time = float(options.get('motion_max_skip_time', MOTION_MAX_SKIP_TIME))
+        self.shot_events = parse_bool(options.get('shot_events', SHOT_EVENTS))
+        self.event_threshold = float(options.get('event_threshold', EVENT_THRESHOLD))
+        self.event_settle_time = float(options.get('event_settle_time', EVENT_SETTLE_TIME))
+        self.event_max_burst_time = float(options.get('event_max_burst_time', EVENT_MAX_BURST_TIME))
+        self.encoding = EncoderConfig(options)
+
+    def to_frames(self, seconds, video_fps):
+        '''
+        Parameters:
+            {Number} seconds - A duration in seconds
+            {Number} video_fps - The frame rate of the analyzed video
+
+        Returns:
+            {Number} The duration in frames (at least 1).
+        '''
+
+        return max(1, int(round(seconds * video_fps)))
@@ -3,6 +3,9 @@ import cv2
 
 from project.core.target_scoring import Geometry2D as geo2D
 
+# the thickness of the lines that extend the projectiles' contours [px]
+EXTENSION_THICKNESS = 4
+
 def contour_distances_from(contour, point):
     '''
     Find the distance of each pixel in a contour from a specified point.
@@ -28,16 +31,13 @@ def contour_distances_from(contour, point):
                ]
     '''
 
-    pts = [[p[0], p[1], 0] for p in contour]
-
-    for pt in pts:
-        p = pt
-        xy = (p[0],p[1])
-        p[2] = geo2D.euclidean_dist(xy, point)
+    pts = geo2D.as_points(contour)
+    dists = geo2D.distances_to_point(pts, point)
+    order = np.argsort(dists, kind='stable')
 
-    return sorted(pts, key=lambda x: x[2])
+    return np.column_stack((pts[order], dists[order])).tolist()
 
-def extend_contour_line(img, contour, bullseye, length):
+def extend_contour_line(img, contour, bullseye, length, origin=(0, 0)):
     '''
     Extend the straight contour line owtwards the target, to try and reproduce the shape and length of the actual projectile.
     This helps joining multiple contours, that refer to the same projectile, in a row.
@@ -51,6 +51,8 @@ def extend_contour_line(img, contour, bullseye, length):
                               {Number} y coordinate of the bull'seye point
                            )
         {Number} length - The extension's length (outwards the target)
+        {Tuple} origin - The position of the image's top left corner in the contour's coordinates (x, y),
+                         the extension is calculated in the contour's coordinates and drawn shifted by it
     '''
 
     def normalize(vector):
@@ -98,7 +100,9 @@ def extend_contour_line(img, contour, bullseye, length):
     end_point = tuple([int(x) for x in end_point])
 
     # extend the line
-    cv2.line(img, front_point, end_point, (0xff,0x0,0xff), 4)
+    front_point = (front_point[0] - origin[0], front_point[1] - origin[1])
+    end_point = (end_point[0] - origin[0], end_point[1] - origin[1])
+    cv2.line(img, front_point, end_point, (0xff,0x0,0xff), EXTENSION_THICKNESS)
 
 def is_contour_rect(contour, A, B, samples):
     '''
@@ -160,12 +164,8 @@ def filter_convex_contours(contours):
     filtered = []
 
     for cont in contours:
-        contPts = [(cont[m][0][0],cont[m][0][1]) for m in range(len(cont))]
-        point_A = contPts[0] # some random point on the contour
-
         # find the two furthest points on the contour
-        point_B = contour_distances_from(contPts, point_A)[::-1][0]
-        point_A = contour_distances_from(contPts, point_B)[::-1][0]
+        point_A, point_B, _ = geo2D.farthest_pair(cont)
 
         # calculate the point between the two
         point_C = ((point_A[0] + point_B[0]) / 2, (point_A[1] + point_B[1]) / 2)
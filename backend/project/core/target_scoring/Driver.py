@@ -1,22 +1,27 @@
 from project.core.target_scoring.TargetModel import get_target_model_path
 from project.core.target_scoring.VideoAnalyzer import VideoAnalyzer
 from project.core.target_scoring.Sketcher import Sketcher
-import cv2
-import numpy as np
+from project.core.target_scoring.AnalysisConfig import AnalysisConfig
+from project.core.target_scoring.ModelFeatures import load_model_image
+from project.core.target_scoring.SegmentAnalysis import analyze_in_segments
 from datetime import datetime, timezone
-import requests
 
-def process_target_video_data(input_filepath, output_filepath, model_data):
+def process_target_video_data(input_filepath, output_filepath, model_data, analysis_options=None, model_features=None,
+                              profiler=None, gate_stats=None, capture=None, reopen_capture=None):
+  # output_filepath - None to only score the video, without writing the processed video
+  # profiler - A Profiler to time the stages of the analysis with, if given
+  # gate_stats - A GateStats to gather the decisions of the motion gate with, if given
+  # capture - An opened capture to read the video from instead of input_filepath, e.g. a StreamDecoder
+  #           of a video that is still uploaded (it's analyzed in a single pass and a single process)
+  # reopen_capture - Returns a new capture of the same frames as capture, in case they're decoded again for the output
   # video input
   video_name = input_filepath
   video_fps = 30
   display_in_cm = True
+  config = AnalysisConfig(analysis_options)
   
-  # model input
-  image_url = model_data['model_path']
-  response = requests.get(image_url)
-  image_array = np.frombuffer(response.content, np.uint8)
-  model = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+  # model input - the image is only needed when there are no precomputed features
+  model = load_model_image(model_data['model_path']) if model_features is None else None
   bullseye_point = model_data['bullseye_point']
   inner_diameter_px = model_data['inner_diameter_px']
   inner_diameter_inch = model_data['inner_diameter_inch']
@@ -31,7 +36,14 @@ def process_target_video_data(input_filepath, output_filepath, model_data):
   # analyze
   start_time = datetime.now(timezone.utc)
   sketcher = Sketcher(measure_unit, measure_unit_name)
-  video_analyzer = VideoAnalyzer(video_name, model, bullseye_point, rings_amount, inner_diameter_px)
-  scoring_detail = video_analyzer.analyze(output_filepath, sketcher, start_time, video_fps)
+  if config.segment_processes != 1 and capture is None:
+    scoring_detail = analyze_in_segments(video_name, model, bullseye_point, rings_amount, inner_diameter_px, config,
+                                         model_features, output_filepath, sketcher, start_time, video_fps, profiler,
+                                         gate_stats)
+  else:
+    video_analyzer = VideoAnalyzer(video_name, model, bullseye_point, rings_amount, inner_diameter_px, config, model_features,
+                                   profiler=profiler, gateStats=gate_stats, capture=capture,
+                                   reopenCapture=reopen_capture)
+    scoring_detail = video_analyzer.analyze(output_filepath, sketcher, start_time, video_fps)
   print("😇 Score Result Processing Completed 😇")
   return scoring_detail
\ No newline at end of file
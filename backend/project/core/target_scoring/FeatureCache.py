@@ -0,0 +1,85 @@
+import tempfile
+import os
+
+class FeatureCache:
+    def __init__(self, directory, maxBytes):
+        '''
+        {String} directory - The directory in which the cached entries are stored
+        {Number} maxBytes - The maximum total size of the cache, least recently used entries are evicted above it
+        '''
+
+        self.directory = directory
+        self.max_bytes = maxBytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        '''
+        Parameters:
+            {String} key - The content address of the entry
+
+        Returns:
+            {Bytes} The cached entry, or None if it's not cached.
+        '''
+
+        path = self._path(key)
+
+        try:
+            with open(path, 'rb') as entry:
+                data = entry.read()
+        except OSError:
+            return None
+
+        # mark the entry as recently used
+        os.utime(path)
+        return data
+
+    def put(self, key, data):
+        '''
+        Store an entry and evict the least recently used entries if the cache is full.
+
+        Parameters:
+            {String} key - The content address of the entry
+            {Bytes} data - The entry
+        '''
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        # write atomically, other worker processes might read the same entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as entry:
+            entry.write(data)
+        os.replace(tmp_path, self._path(key))
+
+        self.evict()
+
+    def evict(self):
+        '''
+        Delete least recently used entries until the cache fits its size limit.
+        '''
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'):
+                continue
+
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+            total -= size
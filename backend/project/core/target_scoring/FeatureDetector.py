@@ -0,0 +1,27 @@
+import cv2
+
+SIFT = 'sift'
+ORB = 'orb'
+AKAZE = 'akaze'
+
+ORB_FEATURES_AMOUNT = 5000
+
+def create_detector(name):
+    '''
+    Create a feature detector.
+
+    Parameters:
+        {String} name - The name of the detector [FeatureDetector constant (SIFT, ORB, AKAZE)]
+
+    Returns:
+        {Object} An OpenCV feature detector, that can detect keypoints and compute their descriptors.
+    '''
+
+    if name == SIFT:
+        return cv2.SIFT_create()
+    elif name == ORB:
+        return cv2.ORB_create(nfeatures=ORB_FEATURES_AMOUNT)
+    elif name == AKAZE:
+        return cv2.AKAZE_create()
+
+    raise ValueError(f"Unknown feature detector '{name}'")
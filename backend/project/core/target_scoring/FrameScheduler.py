@@ -0,0 +1,85 @@
+class FrameScheduler:
+    def __init__(self, sparseStride, denseHoldFrames):
+        '''
+        {Number} sparseStride - Analyze every n-th frame while the target is stable
+        {Number} denseHoldFrames - Amount of frames to keep analyzing densely after the hits last changed
+        '''
+
+        self.sparse_stride = sparseStride
+        self.dense_hold_frames = denseHoldFrames
+        self.last_analyzed_frame = 0
+        self.last_change_frame = None
+        self.candidates_amount = 0
+        self.verified_amount = 0
+
+    def is_dense(self, frame_count):
+        '''
+        Parameters:
+            {Number} frame_count - The current frame number
+
+        Returns:
+            {Boolean} True if every frame should be analyzed at the moment.
+        '''
+
+        if self.candidates_amount > 0:
+            return True
+
+        if self.last_change_frame is not None:
+            return frame_count - self.last_change_frame <= self.dense_hold_frames
+
+        return False
+
+    def should_analyze(self, frame_count):
+        '''
+        Parameters:
+            {Number} frame_count - The current frame number
+
+        Returns:
+            {Boolean} True if the frame should be analyzed, False if it can be skipped.
+        '''
+
+        if self.sparse_stride <= 1 or self.is_dense(frame_count):
+            return True
+
+        return frame_count - self.last_analyzed_frame >= self.sparse_stride
+
+    def mark_analyzed(self, frame_count):
+        '''
+        Register a frame as analyzed.
+
+        Parameters:
+            {Number} frame_count - The analyzed frame number
+
+        Returns:
+            {Number} Amount of frames that passed since the previous analyzed frame.
+        '''
+
+        step = frame_count - self.last_analyzed_frame if self.last_analyzed_frame > 0 else 1
+        self.last_analyzed_frame = frame_count
+        return step
+
+    def open_window(self, frame_count):
+        '''
+        Analyze every frame for a while, e.g. after a projectile arrived.
+
+        Parameters:
+            {Number} frame_count - The frame at which the window opens
+        '''
+
+        self.last_change_frame = frame_count
+
+    def update_hits(self, frame_count, candidatesAmount, verifiedAmount):
+        '''
+        Switch to dense analysis when candidate hits appear or the verified hits change.
+
+        Parameters:
+            {Number} frame_count - The analyzed frame number
+            {Number} candidatesAmount - The amount of candidate hits after the frame was analyzed
+            {Number} verifiedAmount - The amount of verified hits after the frame was analyzed
+        '''
+
+        if candidatesAmount != self.candidates_amount or verifiedAmount != self.verified_amount:
+            self.last_change_frame = frame_count
+
+        self.candidates_amount = candidatesAmount
+        self.verified_amount = verifiedAmount
@@ -0,0 +1,101 @@
+import tempfile
+import numpy as np
+import cv2
+
+# spilled frames are compressed losslessly, the output is the same as when decoding the video again
+SPILL_FORMAT = '.png'
+SPILL_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1, cv2.IMWRITE_PNG_STRATEGY, cv2.IMWRITE_PNG_STRATEGY_RLE]
+
+class FrameSpool:
+    def __init__(self, memoryBudget, diskBudget, spoolDir=None):
+        '''
+        {Number} memoryBudget - Maximum amount of bytes to keep in memory before spilling frames to disk
+        {Number} diskBudget - Maximum amount of compressed bytes to spill to disk, the spool overflows above it
+        {String} spoolDir - The directory in which the spill file is created (system temp dir if None)
+        '''
+
+        self.memory_budget = memoryBudget
+        self.disk_budget = diskBudget
+        self.spool_dir = spoolDir
+        self.memory_frames = []
+        self.memory_used = 0
+        self.spill_file = None
+        self.spilled_sizes = []
+        self.disk_used = 0
+        self.overflowed = False
+
+    def __len__(self):
+        return len(self.memory_frames) + len(self.spilled_sizes)
+
+    def push(self, frame):
+        '''
+        Store a copy of a frame at the end of the spool.
+        Frames are kept in memory until the budget is exhausted, the rest are compressed to a spill file.
+        Once the spill file would exceed its budget, the spool overflows:
+        all of its frames are released and the following ones are not stored.
+
+        Parameters:
+            {Numpy.array} frame - The frame to store
+
+        Returns:
+            {Boolean} False if the spool overflowed.
+        '''
+
+        if self.overflowed:
+            return False
+
+        # keep the frames in order, once spilling started every following frame is spilled as well
+        if self.spill_file is None and self.memory_used + frame.nbytes <= self.memory_budget:
+            self.memory_frames.append(frame.copy())
+            self.memory_used += frame.nbytes
+            return True
+
+        _, encoded = cv2.imencode(SPILL_FORMAT, frame, SPILL_PARAMS)
+        if self.disk_used + encoded.nbytes > self.disk_budget:
+            self.close()
+            self.overflowed = True
+            return False
+
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(dir=self.spool_dir)
+
+        self.spill_file.write(encoded.data)
+        self.spilled_sizes.append(encoded.nbytes)
+        self.disk_used += encoded.nbytes
+        return True
+
+    def frames(self):
+        '''
+        Iterate over all of the stored frames, in the order they were pushed.
+        Each yielded frame is writable and owned by the caller.
+
+        Returns:
+            {Generator} The stored frames.
+        '''
+
+        for frame in self.memory_frames:
+            yield frame
+
+        if self.spill_file is None:
+            return
+
+        self.spill_file.flush()
+        self.spill_file.seek(0)
+
+        for size in self.spilled_sizes:
+            encoded = np.frombuffer(self.spill_file.read(size), dtype=np.uint8)
+            yield cv2.imdecode(encoded, cv2.IMREAD_UNCHANGED)
+
+    def close(self):
+        '''
+        Release all of the stored frames and delete the spill file.
+        '''
+
+        self.memory_frames = []
+        self.memory_used = 0
+        self.spilled_sizes = []
+        self.disk_used = 0
+
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
@@ -19,6 +19,130 @@ def euclidean_dist(p1, p2):
 
     return ((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2) ** .5
 
+def as_points(points):
+    '''
+    Parameters:
+        {Numpy.array} points - (N,1,2) contour or (N,2) points
+
+    Returns:
+        {Numpy.array} (N,2) float64 points.
+    '''
+
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+def distances_to_point(points, point):
+    '''
+    Parameters:
+        {Numpy.array} points - (N,1,2) contour or (N,2) points
+        {Tuple} point - (
+                           {Number} x coordinate of the point,
+                           {Number} y coordinate of the point
+                        )
+
+    Returns:
+        {Numpy.array} (N,) the euclidean distance of each point from the given point.
+    '''
+
+    diff = as_points(points) - np.asarray(point, dtype=np.float64)[:2]
+    return np.hypot(diff[:, 0], diff[:, 1])
+
+def pairwise_distances(points, otherPoints=None):
+    '''
+    Parameters:
+        {Numpy.array} points - (N,1,2) contour or (N,2) points
+        {Numpy.array} otherPoints - (M,1,2) contour or (M,2) points (defaults to the first points)
+
+    Returns:
+        {Numpy.array} (N,M) the euclidean distance between each pair of points.
+    '''
+
+    points = as_points(points)
+    other_points = points if otherPoints is None else as_points(otherPoints)
+    diff = points[:, None, :] - other_points[None, :, :]
+    return np.hypot(diff[..., 0], diff[..., 1])
+
+def farthest_pair(points):
+    '''
+    Find the two points that are the furthest from each other (the diameter of the points),
+    with rotating calipers over the points' convex hull.
+
+    Parameters:
+        {Numpy.array} points - (N,1,2) int32 contour or (N,2) points
+
+    Returns:
+        {Tuple} (
+                   {Tuple} The first point of the pair (x, y),
+                   {Tuple} The second point of the pair (x, y),
+                   {Number} The distance between the two points
+                )
+    '''
+
+    hull = cv2.convexHull(np.asarray(points).reshape(-1, 1, 2)).reshape(-1, 2)
+    hull_pts = hull.astype(np.float64)
+    size = len(hull_pts)
+
+    if size == 1:
+        best = (0, 0)
+    elif size <= 3:
+        dists = pairwise_distances(hull_pts)
+        best = np.unravel_index(np.argmax(dists), dists.shape)
+    else:
+        # the doubled area of the triangle (a, b, c), the height of c over the edge (a, b)
+        def area(a, b, c):
+            return abs((hull_pts[b][0] - hull_pts[a][0]) * (hull_pts[c][1] - hull_pts[a][1]) -
+                       (hull_pts[b][1] - hull_pts[a][1]) * (hull_pts[c][0] - hull_pts[a][0]))
+
+        best = (0, 0)
+        best_dist = -1.0
+        antipode = 1
+
+        for i in range(size):
+            j = (i + 1) % size
+
+            # advance the opposite caliper while it moves away from the edge (i, j)
+            while area(i, j, (antipode + 1) % size) > area(i, j, antipode):
+                antipode = (antipode + 1) % size
+
+            for k in (i, j):
+                dist = euclidean_dist(hull_pts[k], hull_pts[antipode])
+                if dist > best_dist:
+                    best, best_dist = (k, antipode), dist
+
+    point_A = (int(hull[best[0]][0]), int(hull[best[0]][1]))
+    point_B = (int(hull[best[1]][0]), int(hull[best[1]][1]))
+    return point_A, point_B, euclidean_dist(point_A, point_B)
+
+def two_sweep_pair(points):
+    '''
+    Approximate the two points that are the furthest from each other:
+    the furthest point from the first point, then the furthest point from that one
+    (the last of the furthest points, in the points' order, when some are as far).
+    The projectiles' tips are measured with it, the exact diameter (see farthest_pair) can end
+    a few pixels away on their contours and move the hits.
+
+    Parameters:
+        {Numpy.array} points - (N,1,2) int32 contour or (N,2) points
+
+    Returns:
+        {Tuple} (
+                   {Tuple} The second furthest point found (x, y),
+                   {Tuple} The first furthest point found (x, y)
+                )
+    '''
+
+    points = np.asarray(points).reshape(-1, 2)
+    pts = points.astype(np.float64)
+
+    def furthest_from(index):
+        # squared distances keep the order of the integer points exactly
+        diff = pts - pts[index]
+        square_dists = diff[:, 0] ** 2 + diff[:, 1] ** 2
+        return len(pts) - 1 - int(np.argmax(square_dists[::-1]))
+
+    index_B = furthest_from(0)
+    index_A = furthest_from(index_B)
+    return (int(points[index_A][0]), int(points[index_A][1])), (int(points[index_B][0]), int(points[index_B][1]))
+
 def zero_pad_as(img, paddingShape):
     '''
     Apply an image with zero padding, up to a given size.
@@ -146,7 +270,40 @@ def calc_vertices_and_edges(transform):
 
     return vertices, (ab, bc, cd, da)
 
-def calc_distances_from(matSize, point):
+def calc_roi(vertices, radius, frameShape, padding):
+    '''
+    Calculate a region of interest that bounds the target's quad and its outer ring.
+
+    Parameters:
+        {Tuple} vertices - A, B, C, D, E vertices and the bull'seye point of the target
+        {Number} radius - The largest expected radius of the target's outer ring [px]
+        {Tuple} frameShape - The shape of the frame
+        {Number} padding - Amount of pixels to add around the region
+
+    Returns:
+        {Tuple} (
+                   {Number} x coordinate of the region's top left corner,
+                   {Number} y coordinate of the region's top left corner,
+                   {Number} x coordinate of the region's bottom right corner (exclusive),
+                   {Number} y coordinate of the region's bottom right corner (exclusive)
+                )
+    '''
+
+    quad = np.float32(vertices[:4]).reshape(-1, 2)
+    bullseye = vertices[5]
+    min_x = min(quad[:, 0].min(), bullseye[0] - radius) - padding
+    min_y = min(quad[:, 1].min(), bullseye[1] - radius) - padding
+    max_x = max(quad[:, 0].max(), bullseye[0] + radius) + padding
+    max_y = max(quad[:, 1].max(), bullseye[1] + radius) + padding
+
+    x0 = int(np.clip(np.floor(min_x), 0, frameShape[1]))
+    y0 = int(np.clip(np.floor(min_y), 0, frameShape[0]))
+    x1 = int(np.clip(np.ceil(max_x), x0, frameShape[1]))
+    y1 = int(np.clip(np.ceil(max_y), y0, frameShape[0]))
+
+    return x0, y0, x1, y1
+
+def calc_distances_from(matSize, point, dtype=None):
     '''
     Create a matrix of distances, where each value is the distance from a given point.
 
@@ -159,14 +316,15 @@ def calc_distances_from(matSize, point):
                            {Number} x coordinate of the parameter point,
                            {Number} y coordinate of the parameter point,
                         )
+        {Numpy.dtype} dtype - The type of the coordinates (float32 keeps the distances compact)
     
     Returns:
         {Numpy.array} A matrix of distances.
     '''
 
-    dx = np.arange(matSize[1])
-    dy = np.arange(matSize[0])
+    dx = np.arange(matSize[1], dtype=dtype)
+    dy = np.arange(matSize[0], dtype=dtype)
     x, y = point[0], point[1]
-    mat_X, mat_Y = np.meshgrid(dx, dy)
+    mat_X, mat_Y = np.meshgrid(dx, dy, sparse=True)
     distances = ((mat_X, mat_Y), euclidean_dist((mat_X,mat_Y), (x,y)))
     return distances
\ No newline at end of file
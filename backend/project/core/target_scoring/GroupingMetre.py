@@ -1,8 +1,51 @@
-from project.core.target_scoring import ContourClassifier as cntr
 from project.core.target_scoring import Geometry2D as geo2D
+from project.core.target_scoring import HitsManager as hitsMngr
 import numpy as np
 import cv2
 
+class Grouping:
+    def __init__(self):
+        '''
+        The convex hull and the spread of the verified hits, kept across frames.
+        They're only recalculated when the verified hits change,
+        in between the hull is read from the current (shifted) points of its hits.
+        '''
+
+        self.version = None
+        self.hull_indices = None
+        self.diameter = 0
+
+    def update(self, hits):
+        '''
+        Parameters:
+            {HitsManager.HitTable} hits - The known hits
+
+        Returns:
+            {Numpy.array} A strict contour around the group of verified hits,
+                          or None if the quantity of the hits is too low to form a group.
+            {Number} The diameter of the group.
+        '''
+
+        # the verified rows keep their order as long as the verified hits don't change
+        rows = hits.rows(hitsMngr.VERIFIED)
+
+        if hits.verified_version != self.version:
+            self.version = hits.verified_version
+            self.hull_indices = None
+            self.diameter = 0
+
+            if len(rows) > 1:
+                points = np.stack((hits.x[rows], hits.y[rows]), axis=1).astype(np.int32).reshape(-1, 1, 2)
+                self.hull_indices = cv2.convexHull(points, returnPoints=False).ravel()
+                self.diameter = measure_grouping_diameter(points[self.hull_indices])
+
+        if self.hull_indices is None:
+            return None, 0
+
+        hull_rows = rows[self.hull_indices]
+        hull = np.stack((hits.x[hull_rows], hits.y[hull_rows]), axis=1).astype(np.int32)
+        return hull.reshape(-1, 1, 2), self.diameter
+
 def create_group_polygon(img, hits):
     '''
     Calculate the polygon that contours a group of hits.
@@ -19,24 +62,13 @@ def create_group_polygon(img, hits):
                       or None if the quantity of the hits is too low to form a group.
     '''
 
-    blank_img = np.zeros(img.shape, dtype=img.dtype)
-    blank_img = cv2.cvtColor(blank_img, cv2.COLOR_RGB2GRAY)
-    
-    # draw lines between all hits
-    for h1 in hits:
-        for h2 in hits:
-            if h1 != h2:
-                cv2.line(blank_img, h1.point, h2.point, (0xff,0xff,0xff), 3)
-    
-    # find external contour
-    contours = cv2.findContours(blank_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)[-2:]
-    blank_img = cv2.cvtColor(blank_img, cv2.COLOR_GRAY2RGB)
-    
-    if len(contours[0]) > 0:
-        return contours[0][0]
-    else:
+    if len(hits) < 2:
         return None
 
+    # the convex hull of the hits is the outline of the lines between all of them
+    points = np.array([hit.point for hit in hits], np.int32).reshape(-1, 1, 2)
+    return cv2.convexHull(points)
+
 def measure_grouping_diameter(contour):
     '''
     Calculate the diameter of a grouping contour.
@@ -48,13 +80,5 @@ def measure_grouping_diameter(contour):
         {Number} The diameter of the grouping contour.
     '''
 
-    # find two furthest points in the polygon
-    contPts = [(contour[m][0][0],contour[m][0][1]) for m in range(len(contour))]
-    point_A = contPts[0] # random point
-    point_B = cntr.contour_distances_from(contPts, point_A)[::-1][0]
-    point_A = cntr.contour_distances_from(contPts, point_B)[::-1][0]
-    
-    # find their distance for each other
-    point_A = (point_A[0], point_A[1])
-    point_B = (point_B[0], point_B[1])
-    return geo2D.euclidean_dist(point_A, point_B)
\ No newline at end of file
+    # the distance between the two furthest points in the polygon
+    return geo2D.farthest_pair(contour)[2]
\ No newline at end of file
@@ -1,8 +1,10 @@
 from project.core.target_scoring import Geometry2D as geo2D
 import numpy as np
+import math
 
 CANDIDATE = 0
 VERIFIED = 1
+DELETED = -1
 
 class Hit:
     def __init__(self, x, y, score, bullseyeRelation, frame_count, current_hit_id):
@@ -26,19 +28,25 @@ class Hit:
         # has this hit been checked during current iteration
         self.iter_mark = False
     
-    def increase_rep(self):
+    def increase_rep(self, amount=1):
         '''
         Increase the hit's reputation.
+
+        Parameters:
+            {Number} amount - Amount of frames the hit has been present for
         '''
 
-        self.reputation += 1
+        self.reputation += amount
         
-    def decrease_rep(self):
+    def decrease_rep(self, amount=1):
         '''
         Decrease the hit's reputation.
+
+        Parameters:
+            {Number} amount - Amount of frames the hit has been absent for
         '''
 
-        self.reputation -= 1
+        self.reputation -= amount
         
     def isVerified(self, repScore):
         '''
@@ -51,6 +59,314 @@ class Hit:
 
         return self.reputation >= repScore
 
+class HitView:
+    def __init__(self, table, row):
+        '''
+        A hit stored in a HitTable, with the same attributes as HitsManager.Hit.
+        Views are only valid until the table is compacted.
+
+        {HitsManager.HitTable} table - The table the hit is stored in
+        {Number} row - The row of the hit in the table
+        '''
+
+        self.table = table
+        self.row = row
+
+    @property
+    def point(self):
+        return (int(self.table.x[self.row]), int(self.table.y[self.row]))
+
+    @property
+    def score(self):
+        return int(self.table.score[self.row])
+
+    @property
+    def reputation(self):
+        return int(self.table.reputation[self.row])
+
+    @property
+    def bullseye_relation(self):
+        return self.table.relation[self.row].copy()
+
+    @property
+    def id(self):
+        return int(self.table.id[self.row])
+
+    @id.setter
+    def id(self, value):
+        self.table.id[self.row] = value
+
+    @property
+    def frame_count(self):
+        return int(self.table.frame_count[self.row])
+
+    @frame_count.setter
+    def frame_count(self, value):
+        self.table.frame_count[self.row] = value
+
+class HitTable:
+    COLUMNS = ('x', 'y', 'score', 'reputation', 'relation', 'frame_count', 'id', 'iter_mark', 'group')
+
+    def __init__(self, cellSize, capacity=64):
+        '''
+        Candidate and verified hits, stored as a struct of arrays so reputation updates,
+        disqualification, verification and shifting run over all of the hits at once.
+        The hits are also indexed by a uniform grid over their points,
+        so finding the hits around a point only visits the few cells near it.
+        Rows keep the order in which the hits were added.
+
+        {Number} cellSize - The size of the grid's cells [px] (preferably the distance tolerance of the queries)
+        {Number} capacity - Amount of rows to allocate up front
+        '''
+
+        self.cell_size = max(1, cellSize)
+        self.size = 0
+        self.x = np.zeros(capacity, np.int64)
+        self.y = np.zeros(capacity, np.int64)
+        self.score = np.zeros(capacity, np.int64)
+        self.reputation = np.zeros(capacity, np.int64)
+        self.relation = np.zeros((capacity, 2), np.float64)
+        self.frame_count = np.zeros(capacity, np.int64)
+        self.id = np.zeros(capacity, np.int64)
+        self.iter_mark = np.zeros(capacity, bool)
+        self.group = np.full(capacity, DELETED, np.int8)
+
+        # (cell x, cell y) -> rows in the cell
+        self.cells = {}
+
+        # incremented whenever verified hits are added, replaced or removed (not when they're shifted)
+        self.verified_version = 0
+
+    def _cell(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def _grow(self):
+        capacity = len(self.x) * 2
+
+        for name in HitTable.COLUMNS:
+            column = getattr(self, name)
+            grown = np.full((capacity,) + column.shape[1:], DELETED if name == 'group' else 0, column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def _reindex(self):
+        self.cells = {}
+        rows = self.rows()
+        cells_x = self.x[rows] // self.cell_size
+        cells_y = self.y[rows] // self.cell_size
+
+        for row, cell_x, cell_y in zip(rows.tolist(), cells_x.tolist(), cells_y.tolist()):
+            self.cells.setdefault((cell_x, cell_y), []).append(row)
+
+    def rows(self, group=None):
+        '''
+        Parameters:
+            {Number} group - The group of the rows [HitsManager constant (VERIFIED, CANDIDATE)], None for both
+
+        Returns:
+            {Numpy.array} The rows of the hits, in the order they were added.
+        '''
+
+        groups = self.group[:self.size]
+        mask = groups != DELETED if group is None else groups == group
+        return np.flatnonzero(mask)
+
+    def count(self, group):
+        '''
+        Parameters:
+            {Number} group - The group of the hits [HitsManager constant (VERIFIED, CANDIDATE)]
+
+        Returns:
+            {Number} Amount of hits in the group.
+        '''
+
+        return int(np.count_nonzero(self.group[:self.size] == group))
+
+    def append(self, hit, group=CANDIDATE):
+        '''
+        Add a hit after all of the other hits. It's marked as present in the current iteration.
+
+        Parameters:
+            {HitsManager.Hit} hit - The hit to add
+            {Number} group - The group of the hit [HitsManager constant (VERIFIED, CANDIDATE)]
+
+        Returns:
+            {Number} The row of the hit.
+        '''
+
+        if self.size == len(self.x):
+            self._grow()
+
+        row = self.size
+        self.x[row], self.y[row] = hit.point
+        self.score[row] = hit.score
+        self.reputation[row] = hit.reputation
+        self.relation[row] = hit.bullseye_relation
+        self.frame_count[row] = hit.frame_count
+        self.id[row] = hit.id
+        self.iter_mark[row] = True
+        self.group[row] = group
+        self.size += 1
+
+        if group == VERIFIED:
+            self.verified_version += 1
+
+        self.cells.setdefault(self._cell(self.x[row], self.y[row]), []).append(row)
+        return row
+
+    def delete(self, rows):
+        '''
+        Parameters:
+            {Iterable} rows - The rows of the hits to delete
+        '''
+
+        for row in rows:
+            cell = self._cell(self.x[row], self.y[row])
+            self.cells[cell].remove(row)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+            if self.group[row] == VERIFIED:
+                self.verified_version += 1
+
+            self.group[row] = DELETED
+
+    def verify(self, rows):
+        '''
+        Parameters:
+            {Numpy.array} rows - The rows of the candidates to verify
+        '''
+
+        if len(rows) == 0:
+            return
+
+        self.group[rows] = VERIFIED
+        self.verified_version += 1
+
+    def compact(self):
+        '''
+        Reclaim the rows of deleted hits, once they take up most of the table.
+        Invalidates the rows and views of the hits.
+        '''
+
+        rows = self.rows()
+        if self.size - len(rows) <= len(rows):
+            return
+
+        for name in HitTable.COLUMNS:
+            column = getattr(self, name)
+            column[:len(rows)] = column[rows]
+
+        self.group[len(rows):self.size] = DELETED
+        self.size = len(rows)
+        self._reindex()
+
+    def point(self, row):
+        '''
+        Returns:
+            {Tuple} The point of the hit in a row (x, y).
+        '''
+
+        return (int(self.x[row]), int(self.y[row]))
+
+    def find(self, group, point, distanceTolerance, strict=False, exclude=None):
+        '''
+        Parameters:
+            {Number} group - The group of the hit [HitsManager constant (VERIFIED, CANDIDATE)]
+            {Tuple} point - (
+                               {Number} x coordinate of the point,
+                               {Number} y coordinate of the point
+                            )
+            {Number} distanceTolerance - Amount of pixels around the point that can be ignored
+                                         in order to consider another point as the same one
+            {Boolean} strict - Only consider hits that are closer than the tolerance distance
+            {Number} exclude - The row of a hit to ignore
+
+        Returns:
+            {Number} The row of the first hit in the group within the tolerance distance of the point,
+                     or None if there is no such hit.
+        '''
+
+        reach = int(math.ceil(distanceTolerance / self.cell_size))
+        center_x, center_y = self._cell(point[0], point[1])
+        rows = []
+
+        for cell_x in range(center_x - reach, center_x + reach + 1):
+            for cell_y in range(center_y - reach, center_y + reach + 1):
+                rows.extend(self.cells.get((cell_x, cell_y), ()))
+
+        if not rows:
+            return None
+
+        rows = np.array(rows, np.int64)
+        dists = geo2D.distances_to_point(np.column_stack((self.x[rows], self.y[rows])), point)
+        within = dists < distanceTolerance if strict else dists <= distanceTolerance
+        matches = rows[within & (self.group[rows] == group) & (rows != exclude)]
+
+        return int(matches.min()) if len(matches) > 0 else None
+
+    def view(self, row):
+        '''
+        Returns:
+            {HitsManager.HitView} A view of the hit in a row.
+        '''
+
+        return HitView(self, row)
+
+    def export(self, group):
+        '''
+        Parameters:
+            {Number} group - The group of the hits [HitsManager constant (VERIFIED, CANDIDATE)]
+
+        Returns:
+            {List} Standalone copies of the group's hits, in the order they were added [HitsManager.Hit].
+        '''
+
+        hits = []
+        for row in self.rows(group).tolist():
+            hit = Hit(int(self.x[row]), int(self.y[row]), int(self.score[row]), self.relation[row].copy(),
+                      int(self.frame_count[row]), int(self.id[row]))
+            hit.reputation = int(self.reputation[row])
+            hits.append(hit)
+
+        return hits
+
+    def increase_rep(self, rows, amount=1):
+        '''
+        Increase the reputation of hits and mark them as present in the current iteration.
+
+        Parameters:
+            {List} rows - The rows of the hits, a row may appear several times
+            {Number} amount - Amount of frames the hits have been present for
+        '''
+
+        rows = np.asarray(rows, np.int64)
+        np.add.at(self.reputation, rows, amount)
+        self.iter_mark[rows] = True
+
+    def translate(self, bullseye):
+        '''
+        Shift all hits according to the new position of the bull'seye point in the target.
+
+        Parameters:
+            {Tuple} bullseye - (
+                                  {Number} current x coordinate of the bull'seye point in the target,
+                                  {Number} current y coordinate of the bull'seye point in the target
+                               )
+        '''
+
+        rows = self.rows()
+        if len(rows) == 0:
+            return
+
+        # find the correct translation amount
+        shift = np.asarray(bullseye[:2], np.float64) - self.relation[rows]
+
+        # translate and update relation attribute
+        self.x[rows] = np.round(self.x[rows] + shift[:, 0])
+        self.y[rows] = np.round(self.y[rows] + shift[:, 1])
+        self.relation[rows] = bullseye[:2]
+        self._reindex()
 
 def create_scoreboard(hits, scale, ringsAmount, innerDiam, frame_count, current_hit_id):
     '''
@@ -105,7 +421,7 @@ def create_scoreboard(hits, scale, ringsAmount, innerDiam, frame_count, current_
 
     return scoreboard
 
-def is_verified_hit(point, distanceTolerance, verified_hits, candidate_hits):
+def is_verified_hit(point, distanceTolerance, hits):
     '''
     Parameters:
         {Tuple} point - (
@@ -114,14 +430,15 @@ def is_verified_hit(point, distanceTolerance, verified_hits, candidate_hits):
                         )
         {Number} distanceTolerance - Amount of pixels around the point that can be ignored
                                      in order to consider another point as the same one
+        {HitsManager.HitTable} hits - The known hits
 
     Returns:
         {Boolean} True if the point is of a verified hit.
     '''
 
-    return type(get_hit(VERIFIED, point, distanceTolerance, verified_hits, candidate_hits)) != type(None)
+    return hits.find(VERIFIED, point, distanceTolerance) is not None
 
-def is_candidate_hit(point, distanceTolerance, verified_hits, candidate_hits):
+def is_candidate_hit(point, distanceTolerance, hits):
     '''
     Parameters:
         {Tuple} point - (
@@ -130,14 +447,15 @@ def is_candidate_hit(point, distanceTolerance, verified_hits, candidate_hits):
                         )
         {Number} distanceTolerance - Amount of pixels around the point that can be ignored
                                      in order to consider another point as the same one
+        {HitsManager.HitTable} hits - The known hits
 
     Returns:
         {Boolean} True if the point is of a known hit that's yet to be verified.
     '''
     
-    return type(get_hit(CANDIDATE, point, distanceTolerance, verified_hits, candidate_hits)) != type(None)
+    return hits.find(CANDIDATE, point, distanceTolerance) is not None
 
-def get_hit(group, point, distanceTolerance, verified_hits, candidate_hits):
+def get_hit(group, point, distanceTolerance, hits):
     '''
     Parameters:
         {Number} group - The group to which the hit belongs
@@ -148,137 +466,113 @@ def get_hit(group, point, distanceTolerance, verified_hits, candidate_hits):
                         )
         {Number} distanceTolerance - Amount of pixels around the point that can be ignored
                                      in order to consider another point as the same one
+        {HitsManager.HitTable} hits - The known hits
 
     Returns:
-        {HitsManager.Hit} The hit that's closest to the given point,
-                            considering the tolarance distance around it.
-                            If no hit is found, this function returns None.
+        {HitsManager.HitView} The first hit of the group within the tolarance distance around the point.
+                              If no hit is found, this function returns None.
     '''
 
-    hits_list = get_hits(group, verified_hits, candidate_hits)
-    compatible_hits = []
+    row = hits.find(group, point, distanceTolerance)
+    return hits.view(row) if row is not None else None
 
-    for hit in hits_list:
-        if geo2D.euclidean_dist(point, hit.point) <= distanceTolerance:
-            compatible_hits.append(hit)
-            
-    if len(compatible_hits) > 0:
-        return compatible_hits[0]
-    else:
-        return None
-
-def eliminate_verified_redundancy(distanceTolerance, verified_hits):
+def eliminate_verified_redundancy(distanceTolerance, hits, row):
     '''
-    Find duplicate verified hits and eliminate them.
+    Eliminate a newly verified hit, or the verified hit it duplicates.
+    The one closer to the bull'seye point is kept.
 
     Parameters:
         {Number} distanceTolerance - Amount of pixels around a point that can be ignored
                                      in order to consider another point as the same one
+        {HitsManager.HitTable} hits - The known hits
+        {Number} row - The row of the newly verified hit
     '''
 
-    if len(verified_hits) <= 1:
+    duplicate = hits.find(VERIFIED, hits.point(row), distanceTolerance, strict=True, exclude=row)
+    if duplicate is None:
         return
-    
-    # create a table of the distances between all hits
-    table = np.ndarray((len(verified_hits),len(verified_hits)), np.float32)
-    j_leap = 0
-    for i in range(len(table)):
-        for j in range(len(table[i])):
-            col = j + j_leap
-            if col >= len(table[i]):
-                continue
-            
-            hit_i = verified_hits[i].point
-            hit_j = verified_hits[col].point
-            dist = geo2D.euclidean_dist(hit_i, hit_j)
-            table[i][col] = dist
-            
-        j_leap += 1
-    
-    # find distances that are smaller than the threshold and eliminate the redundant hits
-    j_leap = 0
-    for i in range(len(table)):
-        for j in range(len(table[i])):
-            col = j + j_leap
-            if col >= len(verified_hits):
-                continue
-            
-            if i == col or i >= len(verified_hits):
-                continue
-            
-            if table[i][col] < distanceTolerance:
-                hit_i = verified_hits[i].point
-                hit_j = verified_hits[col].point
-                
-                # check the distance from the bull'seye point
-                bullseye_i = verified_hits[i].bullseye_relation
-                bullseye_j = verified_hits[col].bullseye_relation
-                bullseye_dist_i = geo2D.euclidean_dist(hit_i, bullseye_i)
-                bullseye_dist_j = geo2D.euclidean_dist(hit_j, bullseye_j)
-
-                if bullseye_dist_i < bullseye_dist_j:
-                    verified_hits.remove(verified_hits[col])
-                else:
-                    # assign previous id and frame count to the replacing hit
-                    verified_hits[col].id = verified_hits[i].id
-                    verified_hits[col].frame_count = verified_hits[i].frame_count
-                    verified_hits.remove(verified_hits[i])
-        
-        j_leap += 1
 
-def sort_hit(hit, distanceTolerance, minVerifiedReputation, verified_hits, candidate_hits):
+    # check the distance from the bull'seye point
+    duplicate_dist = geo2D.euclidean_dist(hits.point(duplicate), hits.relation[duplicate])
+    hit_dist = geo2D.euclidean_dist(hits.point(row), hits.relation[row])
+
+    if duplicate_dist < hit_dist:
+        hits.delete([row])
+    else:
+        # assign previous id and frame count to the replacing hit
+        hits.id[row] = hits.id[duplicate]
+        hits.frame_count[row] = hits.frame_count[duplicate]
+        hits.delete([duplicate])
+
+def sort_hits(scoreboard, distanceTolerance, minVerifiedReputation, hits, frameStep=1):
     '''
-    Sort a hit and place it in either of the lists.
-    Increase the reputation of a hit that's already a candidate,
-    or add a hit as a candidate if it's not already known.
+    Sort the hits detected in a frame.
+    Increase the reputation of hits that are already candidates,
+    add hits as candidates if they're not already known,
+    and verify the candidates that are now eligible for verification.
 
     Parameters:
-        {HitsManager.Hit} hit - The hit to sort
+        {List} scoreboard - The hits detected in the frame [HitsManager.Hit]
         {Number} distanceTolerance - Amount of pixels around a point that can be ignored
                                      in order to consider another point as the same one
-        {Number} minVerifiedReputation - The minimum reputation needed to verify a hit
+        {Number} minVerifiedReputation - The minimum reputation needed to verify a hit [frames]
+        {HitsManager.HitTable} hits - The known hits
+        {Number} frameStep - Amount of frames that passed since the previous analyzed frame
     '''
 
-    candidate = get_hit(CANDIDATE, hit.point, distanceTolerance, verified_hits, candidate_hits)
+    known_rows = []
 
-    # the hit is a known candidate
-    if type(candidate) != type(None):
-        candidate.increase_rep()
-        candidate.iter_mark = True
+    for hit in scoreboard:
+        row = hits.find(CANDIDATE, hit.point, distanceTolerance)
 
-        # candidate is now eligable for verification
-        if candidate.isVerified(minVerifiedReputation):
-            verified_hits.append(candidate)
-            candidate_hits.remove(candidate)
-            
-            # find duplicate verified hits and eliminate them
-            eliminate_verified_redundancy(distanceTolerance, verified_hits)
+        # new candidate
+        if row is None:
+            hits.append(hit, CANDIDATE)
 
-    # new candidate
-    else:
-        candidate_hits.append(hit)
-        hit.iter_mark = True
+        # the hit is a known candidate
+        else:
+            known_rows.append(row)
 
-def discharge_hits(candidate_hits):
+    if not known_rows:
+        return
+
+    hits.increase_rep(known_rows, frameStep)
+
+    # candidates that are now eligable for verification
+    known_rows = np.unique(known_rows)
+    verified_rows = known_rows[hits.reputation[known_rows] >= minVerifiedReputation]
+    hits.verify(verified_rows)
+
+    # find duplicate verified hits and eliminate them
+    for row in verified_rows.tolist():
+        if hits.group[row] == VERIFIED:
+            eliminate_verified_redundancy(distanceTolerance, hits, row)
+
+def discharge_hits(hits, frameStep=1):
     '''
-    Lower the reputation of hits that were not detected during the last iteration.
-    Hits with reputation under 1 are disqualified and removed.
+    Lower the reputation of candidates that were not detected during the last iteration.
+    Candidates with reputation under 1 are disqualified and removed.
+
+    Parameters:
+        {HitsManager.HitTable} hits - The known hits
+        {Number} frameStep - Amount of frames that passed since the previous analyzed frame
     '''
 
-    for candidate in candidate_hits:
-        # candidate is not present during the current iteration
-        if not candidate.iter_mark:
-            candidate.decrease_rep()
-            
-            # candidate disqualified
-            if candidate.reputation <= 0:
-                candidate_hits.remove(candidate)
-                continue
-        
-        # get ready for the next iteration
-        candidate.iter_mark = False
+    size = hits.size
+    candidates = hits.group[:size] == CANDIDATE
 
-def shift_hits(bullseye, verified_hits, candidate_hits):
+    # candidates that are not present during the current iteration
+    absent = candidates & ~hits.iter_mark[:size]
+    hits.reputation[:size][absent] -= frameStep
+    
+    # disqualified candidates
+    hits.delete(np.flatnonzero(absent & (hits.reputation[:size] <= 0)).tolist())
+
+    # get ready for the next iteration
+    hits.iter_mark[:size] = False
+    hits.compact()
+
+def shift_hits(bullseye, hits):
     '''
     Shift all hits according to the new position of the bull'seye point in the target.
 
@@ -287,34 +581,20 @@ def shift_hits(bullseye, verified_hits, candidate_hits):
                               {Number} current x coordinate of the bull'seye point in the target,
                               {Number} current y coordinate of the bull'seye point in the target
                            )
+        {HitsManager.HitTable} hits - The known hits
     '''
 
-    all_hits = candidate_hits + verified_hits
-    
-    for h in all_hits:
-        # find the correct translation amount
-        x_dist = bullseye[0] - h.bullseye_relation[0]
-        y_dist = bullseye[1] - h.bullseye_relation[1]
-        new_x = int(round(h.point[0] + x_dist))
-        new_y = int(round(h.point[1] + y_dist))
-        
-        # translate and update relation attribute
-        h.bullseye_relation = bullseye
-        h.point = (new_x,new_y)
+    hits.translate(bullseye)
 
-def get_hits(group, verified_hits, candidate_hits):
+def get_hits(group, hits):
     '''
     Parameters:
         {Number} group - The group to which the hit belongs
                          [HitsManager constant (VERIFIED, CANDIDATE)]
+        {HitsManager.HitTable} hits - The known hits
 
     Returns:
-        {List} The requested group of hits.
+        {List} The requested group of hits [HitsManager.HitView].
     '''
 
-    switcher = {
-        0: candidate_hits,
-        1: verified_hits
-    }
-
-    return switcher.get(group, [])
\ No newline at end of file
+    return [hits.view(row) for row in hits.rows(group).tolist()]
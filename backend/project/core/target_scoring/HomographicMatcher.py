@@ -1,7 +1,89 @@
+from collections import OrderedDict
 import numpy as np
+import hashlib
 import cv2
 
-def ratio_match(matcher, queryDesc, train, ratio):
+BRUTE_FORCE = 'bf'
+FLANN = 'flann'
+MAX_CACHED_INDEXES = 8
+REFINE_MARGIN = .1
+REFINE_GATE_PX = 15
+
+FLANN_INDEX_KDTREE = 1
+FLANN_INDEX_LSH = 6
+
+# descriptor indexes stay alive across frames and across tasks of the same worker process
+_index_cache = OrderedDict()
+
+class DescriptorIndex:
+    def __init__(self, descriptors, backend):
+        '''
+        {Numpy.array} descriptors - The descriptors to index (usually the model's)
+        {String} backend - The matching backend [HomographicMatcher constant (BRUTE_FORCE, FLANN)]
+        '''
+
+        self.descriptors = descriptors
+        self.backend = backend
+        self.matcher = None
+
+        if backend == FLANN:
+            # binary descriptors can't be indexed by a KD-tree
+            if descriptors.dtype == np.uint8:
+                index_params = dict(algorithm=FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1)
+            else:
+                index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
+
+            self.matcher = cv2.FlannBasedMatcher(index_params, dict(checks=50))
+            self.matcher.add([descriptors])
+            self.matcher.train()
+
+    def knn_match(self, trainDesc):
+        '''
+        Find the two nearest indexed descriptors of every train descriptor.
+
+        Parameters:
+            {Numpy.array} trainDesc - The descriptors of the train image
+
+        Returns:
+            {list} Pairs of matches, where queryIdx refers to the indexed descriptors
+                   and trainIdx to the train descriptors.
+        '''
+
+        if self.backend != FLANN:
+            bf = cv2.BFMatcher(cv2.NORM_HAMMING if self.descriptors.dtype == np.uint8 else cv2.NORM_L2, crossCheck=False)
+            return bf.knnMatch(self.descriptors, trainDesc, k=2)
+
+        # the index is queried with the train descriptors, flip the matches back
+        matches = self.matcher.knnMatch(trainDesc, k=2)
+        return [[cv2.DMatch(m.trainIdx, m.queryIdx, m.distance) for m in pair] for pair in matches]
+
+def get_descriptor_index(descriptors, backend):
+    '''
+    Get an index of the descriptors, building it only if it's not already cached in this process.
+
+    Parameters:
+        {Numpy.array} descriptors - The descriptors to index
+        {String} backend - The matching backend [HomographicMatcher constant (BRUTE_FORCE, FLANN)]
+
+    Returns:
+        {DescriptorIndex} The index of the descriptors.
+    '''
+
+    key = (backend, hashlib.sha1(np.ascontiguousarray(descriptors).data).hexdigest())
+
+    if key in _index_cache:
+        _index_cache.move_to_end(key)
+        return _index_cache[key]
+
+    index = DescriptorIndex(descriptors, backend)
+    _index_cache[key] = index
+
+    if len(_index_cache) > MAX_CACHED_INDEXES:
+        _index_cache.popitem(last=False)
+
+    return index
+
+def ratio_match(matcher, queryDesc, train, ratio, index=None):
     '''
     Find feature matches between two images.
 
@@ -10,6 +92,7 @@ def ratio_match(matcher, queryDesc, train, ratio):
         {list} queryDesc - The computed description of the query image
         {Numpy.array} train - Train image
         {Number} ratio - The percentage above which all matches are ignored [0-1]
+        {DescriptorIndex} index - A prebuilt index of the query description (brute-force matching if None)
 
     Returns:
         {tuple} (
@@ -22,22 +105,109 @@ def ratio_match(matcher, queryDesc, train, ratio):
     '''
 
     train_keys, train_desc = matcher.detectAndCompute(train, None)
-    bf = cv2.BFMatcher(crossCheck=False)
+    if index is None:
+        index = DescriptorIndex(queryDesc, BRUTE_FORCE)
     best_match = []
     
     if type(train_desc) != type(None):
-        # apply ratio test
-        matches = bf.knnMatch(queryDesc, train_desc, k=2)
-
-        try:
-            for m1, m2 in matches:
-                if m1.distance < ratio * m2.distance:
-                    best_match.append(m1)
-        except ValueError:
-            return [], ([], [])
+        best_match = ratio_test(index.knn_match(train_desc), ratio)
 
     return best_match, (train_keys, train_desc)
 
+def ratio_test(matches, ratio):
+    '''
+    Keep only the matches that are distinctively better than their second best alternative.
+
+    Parameters:
+        {list} matches - Pairs of the two nearest matches
+        {Number} ratio - The percentage above which all matches are ignored [0-1]
+
+    Returns:
+        {list} The best matches.
+    '''
+
+    best_match = []
+
+    for pair in matches:
+        # approximate indexes might find less than two neighbours
+        if len(pair) < 2:
+            continue
+
+        m1, m2 = pair
+        if m1.distance < ratio * m2.distance:
+            best_match.append(m1)
+
+    return best_match
+
+def coarse_to_fine_match(detector, index, queryKeys, anchorPoints, train, ratio, coarseScale):
+    '''
+    Find feature matches between the model and a frame, by matching a downscaled frame first
+    and then refining with full resolution features around the predicted location of the model.
+
+    Parameters:
+        {Object} detector - The detector to use in order to detect keypoints and compute the train image's description
+        {DescriptorIndex} index - A prebuilt index of the query description
+        {list} queryKeys - The keypoints of the query image
+        {Numpy.array} anchorPoints - (N,1,2) anchor points of the model in the query image
+        {Numpy.array} train - Train image
+        {Number} ratio - The percentage above which all matches are ignored [0-1]
+        {Number} coarseScale - The scale of the downscaled train image [0-1]
+
+    Returns:
+        {tuple} (
+                   {list} A list of the best found matches (under the ratio condition),
+                   {tuple} (
+                              {list} The keypoints of the train image (full resolution coordinates),
+                              {list} The description of the train image
+                           )
+                )
+    '''
+
+    # coarse - detect and match on a downscaled frame
+    small = cv2.resize(train, None, fx=coarseScale, fy=coarseScale, interpolation=cv2.INTER_AREA)
+    small_keys, small_desc = detector.detectAndCompute(small, None)
+    if type(small_desc) == type(None):
+        return [], ([], [])
+
+    coarse_keys = [cv2.KeyPoint(k.pt[0] / coarseScale, k.pt[1] / coarseScale, k.size / coarseScale,
+                                k.angle, k.response, k.octave, k.class_id) for k in small_keys]
+    coarse_match = ratio_test(index.knn_match(small_desc), ratio)
+    if len(coarse_match) < 4:
+        return coarse_match, (coarse_keys, small_desc)
+
+    coarse_H, _, _ = calc_homography_inliers(queryKeys, coarse_keys, coarse_match)
+    if type(coarse_H) == type(None):
+        return coarse_match, (coarse_keys, small_desc)
+
+    # fine - detect full resolution features only in a padded crop around the predicted model's quad
+    quad = cv2.perspectiveTransform(anchorPoints[:4], coarse_H).reshape(-1, 2)
+    train_h, train_w = train.shape[:2]
+    x, y, w, h = cv2.boundingRect(np.int32(quad))
+    margin_x, margin_y = int(w * REFINE_MARGIN), int(h * REFINE_MARGIN)
+    x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+    x1, y1 = min(train_w, x + w + margin_x), min(train_h, y + h + margin_y)
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return coarse_match, (coarse_keys, small_desc)
+
+    crop_keys, crop_desc = detector.detectAndCompute(train[y0:y1, x0:x1], None)
+    if type(crop_desc) == type(None):
+        return coarse_match, (coarse_keys, small_desc)
+
+    fine_keys = [cv2.KeyPoint(k.pt[0] + x0, k.pt[1] + y0, k.size, k.angle, k.response, k.octave, k.class_id)
+                 for k in crop_keys]
+    fine_match = ratio_test(index.knn_match(crop_desc), ratio)
+
+    # keep only the correspondences that agree with the coarse homography
+    predicted = cv2.perspectiveTransform(np.float32([queryKeys[m.queryIdx].pt for m in fine_match]).reshape(-1, 1, 2),
+                                         coarse_H) if len(fine_match) else np.empty((0, 1, 2), np.float32)
+    gated_match = [m for m, p in zip(fine_match, predicted.reshape(-1, 2))
+                   if np.hypot(*(np.float32(fine_keys[m.trainIdx].pt) - p)) <= REFINE_GATE_PX / coarseScale]
+
+    if len(gated_match) < 4:
+        return coarse_match, (coarse_keys, small_desc)
+
+    return gated_match, (fine_keys, crop_desc)
+
 def calc_homography(queryKeys, trainKeys, matches):
     '''
     Calculate the homography of a query image over a train image.
@@ -51,15 +221,39 @@ def calc_homography(queryKeys, trainKeys, matches):
         {Numpy.array} A 3x3 array representing the query image's homography, or None if no matches exist.
     '''
 
+    H, _, _ = calc_homography_inliers(queryKeys, trainKeys, matches)
+    return H
+
+def calc_homography_inliers(queryKeys, trainKeys, matches):
+    '''
+    Calculate the homography of a query image over a train image, along with the matches that support it.
+
+    Parameters:
+        {list} queryKeys - The keypoints of the query image
+        {list} trainKeys - The keypoints of the train image
+        {list} matches - The detected matches between the query and the train images
+
+    Returns:
+        {tuple} (
+                   {Numpy.array} A 3x3 array representing the query image's homography, or None if no matches exist,
+                   {Numpy.array} (N,1,2) inlier points in the query image,
+                   {Numpy.array} (N,1,2) the matching inlier points in the train image
+                )
+    '''
+
     if not len(matches):
-        return None
+        return None, None, None
 
     # reshape keypoints
     src_pts = np.float32([queryKeys[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
     dst_pts = np.float32([trainKeys[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
     
-    H, _ = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5)
-    return H
+    H, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5)
+    if H is None:
+        return None, None, None
+
+    inliers = mask.ravel() == 1
+    return H, src_pts[inliers], dst_pts[inliers]
 
 def is_true_homography(vertices, edges, imgSize, stretchThreshold):
     '''
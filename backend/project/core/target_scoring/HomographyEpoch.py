@@ -0,0 +1,64 @@
+from project.core.target_scoring import VisualAnalyzer as visuals
+from project.core.target_scoring import Geometry2D as geo2D
+import numpy as np
+import cv2
+
+class HomographyEpoch:
+    def __init__(self, padModel, homography, vertices, roi, estimatedRadius):
+        '''
+        Everything the per-frame analysis needs that only changes when the homography changes.
+        A new epoch is created for every accepted homography, which invalidates the previous one.
+
+        {Numpy.array} padModel - The model image, zero padded to the size of the frame
+        {Numpy.array} homography - A 3x3 homography of the padded model over the frame
+        {Tuple} vertices - A, B, C, D, E vertices and the bull'seye point of the target in the frame
+        {Tuple} roi - (x0, y0, x1, y1) the region of the frame the analysis runs on
+        {Number} estimatedRadius - A rough estimation of the target's radius [px]
+        '''
+
+        x0, y0, x1, y1 = roi
+        roi_size = (x1 - x0, y1 - y0)
+
+        # warp the model straight into the region, instead of over the whole frame
+        to_roi = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64)
+        warped_roi = cv2.warpPerspective(padModel, to_roi @ homography, roi_size)
+
+        self.roi = roi
+        self.bullseye = (vertices[5][0] - x0, vertices[5][1] - y0)
+        self.estimated_radius = estimatedRadius
+        self.background = visuals.prepare_background(warped_roi)
+        self.distances = geo2D.calc_distances_from((roi_size[1], roi_size[0]), self.bullseye, np.float32)[1]
+        self.ring_radius = None
+        self._outside_masks = {}
+
+    def find_ring_radius(self, img):
+        '''
+        Search for the target's outer ring once per epoch.
+
+        Parameters:
+            {Numpy.array} img - The background subtracted region of the frame
+
+        Returns:
+            {Number} The radius of the target's outer ring [px].
+        '''
+
+        if self.ring_radius is None:
+            self.ring_radius = visuals.find_outer_ring(img, self.estimated_radius)
+
+        return self.ring_radius
+
+    def outside_mask(self, radius):
+        '''
+        Parameters:
+            {Number} radius - The radius of the target's outer ring [px]
+
+        Returns:
+            {Numpy.array} A boolean mask of the region's pixels that are outside of the ring.
+        '''
+
+        mask = self._outside_masks.get(radius)
+        if mask is None:
+            mask = self.distances > radius
+            self._outside_masks[radius] = mask
+
+        return mask
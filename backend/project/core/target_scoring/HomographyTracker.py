@@ -0,0 +1,116 @@
+import numpy as np
+import cv2
+
+MAX_TRACKED_POINTS = 150
+MIN_TRACKED_INLIERS = 20
+MAX_REPROJECTION_ERROR = 2.0
+MAX_FORWARD_BACKWARD_ERROR = 1.0
+LK_PARAMS = dict(winSize=(21, 21), maxLevel=3,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01))
+
+class HomographyTracker:
+    def __init__(self):
+        '''
+        Follow a few homography inliers from frame to frame with pyramidal Lucas-Kanade optical flow,
+        so the homography can be re-estimated without detecting and matching features again.
+        '''
+
+        self.prev_gray = None
+        self.model_pts = None
+        self.frame_pts = None
+        self.reprojection_error = None
+        self.inliers_amount = 0
+
+    def is_active(self):
+        '''
+        Returns:
+            {Boolean} True if there are points being tracked.
+        '''
+
+        return self.prev_gray is not None
+
+    def clear(self):
+        '''
+        Stop tracking, a full feature detection is needed to start again.
+        '''
+
+        self.prev_gray = None
+        self.model_pts = None
+        self.frame_pts = None
+
+    def reset(self, gray, modelPts, framePts):
+        '''
+        Start tracking a new set of correspondences.
+
+        Parameters:
+            {Numpy.array} gray - The grayscale frame in which the points were detected
+            {Numpy.array} modelPts - (N,1,2) inlier points in the model image
+            {Numpy.array} framePts - (N,1,2) the matching inlier points in the frame
+        '''
+
+        if len(modelPts) < MIN_TRACKED_INLIERS:
+            self.clear()
+            return
+
+        # keep an even spread of the inliers
+        step = max(1, len(modelPts) // MAX_TRACKED_POINTS)
+        self.model_pts = np.float32(modelPts[::step][:MAX_TRACKED_POINTS]).reshape(-1, 1, 2)
+        self.frame_pts = np.float32(framePts[::step][:MAX_TRACKED_POINTS]).reshape(-1, 1, 2)
+        self.prev_gray = gray
+
+    def track(self, gray):
+        '''
+        Move the tracked points to their position in a new frame.
+        Points that are lost, or don't track back to where they came from, are dropped.
+
+        Parameters:
+            {Numpy.array} gray - The new grayscale frame
+        '''
+
+        if not self.is_active():
+            return
+
+        next_pts, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.frame_pts, None, **LK_PARAMS)
+        back_pts, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, next_pts, None, **LK_PARAMS)
+
+        fb_error = np.linalg.norm((self.frame_pts - back_pts).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < MAX_FORWARD_BACKWARD_ERROR)
+
+        if np.count_nonzero(good) < MIN_TRACKED_INLIERS:
+            self.clear()
+            return
+
+        self.model_pts = self.model_pts[good]
+        self.frame_pts = next_pts[good]
+        self.prev_gray = gray
+
+    def estimate(self):
+        '''
+        Re-estimate the homography from the tracked points.
+
+        Returns:
+            {Numpy.array} A 3x3 homography of the model over the current frame,
+                          or None if the tracked points drifted (too few inliers or a high reprojection error).
+        '''
+
+        if not self.is_active():
+            return None
+
+        H, mask = cv2.findHomography(self.model_pts, self.frame_pts, cv2.RANSAC, 3)
+        if H is None:
+            return None
+
+        inliers = mask.ravel() == 1
+        self.inliers_amount = int(np.count_nonzero(inliers))
+        if self.inliers_amount < MIN_TRACKED_INLIERS:
+            return None
+
+        projected = cv2.perspectiveTransform(self.model_pts[inliers], H)
+        self.reprojection_error = float(np.mean(np.linalg.norm((projected - self.frame_pts[inliers]).reshape(-1, 2), axis=1)))
+        if self.reprojection_error > MAX_REPROJECTION_ERROR:
+            return None
+
+        # outliers are not worth tracking anymore
+        self.model_pts = self.model_pts[inliers]
+        self.frame_pts = self.frame_pts[inliers]
+        return H
@@ -0,0 +1,125 @@
+from project.core.target_scoring import Geometry2D as geo2D
+import numpy as np
+import requests
+import hashlib
+import json
+import io
+import cv2
+
+FEATURES_FORMAT_VERSION = 1
+
+class ModelFeatures:
+    def __init__(self, modelShape, padModel, anchorPoints, keypoints, descriptors):
+        '''
+        {Tuple} modelShape - The shape of the target model image
+        {Numpy.array} padModel - The model image, zero padded to the size of the frame
+        {Numpy.array} anchorPoints - (6,1,2) A, B, C, D, E anchor points and the bull'seye point in the padded model
+        {List} keypoints - The keypoints of the padded model
+        {Numpy.array} descriptors - The descriptors of the padded model's keypoints
+        '''
+
+        self.model_shape = tuple(modelShape)
+        self.pad_model = padModel
+        self.anchor_points = anchorPoints
+        self.keypoints = keypoints
+        self.descriptors = descriptors
+
+def load_model_image(imageUrl):
+    '''
+    Download and decode a target model image.
+
+    Parameters:
+        {String} imageUrl - The URL of the model image
+
+    Returns:
+        {Numpy.array} The model image [BGR].
+    '''
+
+    response = requests.get(imageUrl)
+    image_array = np.frombuffer(response.content, np.uint8)
+    return cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+
+def compute_model_features(model, bullseye, frameShape, detector):
+    '''
+    Pad the model to the size of the frame and detect its features.
+
+    Parameters:
+        {Numpy.array} model - An image of the target
+        {Tuple} bullseye - The bull'seye location in the model image (x, y)
+        {Tuple} frameShape - The shape of the frames the model is matched against
+        {Object} detector - The feature detector to use
+
+    Returns:
+        {ModelFeatures} The model's features.
+    '''
+
+    anchor_points, pad_model = geo2D.zero_pad_as(model, frameShape)
+    anchor_a = anchor_points[0]
+    bullseye_anchor = (anchor_a[0] + bullseye[0],anchor_a[1] + bullseye[1])
+    anchor_points.append(bullseye_anchor)
+    anchor_points = np.float32(anchor_points).reshape(-1, 1, 2)
+    keypoints, descriptors = detector.detectAndCompute(pad_model, None)
+
+    return ModelFeatures(model.shape, pad_model, anchor_points, keypoints, descriptors)
+
+def features_key(modelData, frameShape, detectorName):
+    '''
+    Calculate the content address of a model's features.
+    Any change to the model document fields the features depend on results in a new key.
+
+    Parameters:
+        {Dict} modelData - The model document
+        {Tuple} frameShape - The shape of the frames the model is matched against
+        {String} detectorName - The name of the detector the features were computed with
+
+    Returns:
+        {String} The key of the features.
+    '''
+
+    content = {
+        "format": FEATURES_FORMAT_VERSION,
+        "detector": detectorName,
+        "model_path": modelData['model_path'],
+        "bullseye_point": [int(v) for v in modelData['bullseye_point']],
+        "version": modelData.get('version', 0),
+        "frame_shape": [int(v) for v in frameShape],
+    }
+
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+def features_to_bytes(features):
+    '''
+    Parameters:
+        {ModelFeatures} features - The features to serialize
+
+    Returns:
+        {Bytes} The features, as a compressed npz archive.
+    '''
+
+    keypoints = np.array([[k.pt[0], k.pt[1], k.size, k.angle, k.response, k.octave, k.class_id]
+                          for k in features.keypoints], dtype=np.float64).reshape(-1, 7)
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer,
+                        model_shape=np.array(features.model_shape),
+                        pad_model=features.pad_model,
+                        anchor_points=features.anchor_points,
+                        keypoints=keypoints,
+                        descriptors=features.descriptors)
+    return buffer.getvalue()
+
+def features_from_bytes(data):
+    '''
+    Parameters:
+        {Bytes} data - Features serialized with features_to_bytes
+
+    Returns:
+        {ModelFeatures} The deserialized features.
+    '''
+
+    with np.load(io.BytesIO(data)) as archive:
+        keypoints = [cv2.KeyPoint(x, y, size, angle, response, int(octave), int(class_id))
+                     for x, y, size, angle, response, octave, class_id in archive['keypoints']]
+
+        return ModelFeatures(archive['model_shape'].tolist(), archive['pad_model'], archive['anchor_points'],
+                             keypoints, archive['descriptors'])
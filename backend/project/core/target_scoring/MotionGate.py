@@ -0,0 +1,182 @@
+from bisect import bisect_left
+import cv2
+
+# the upper bounds of the motion histogram's buckets [fraction of the region], the last bucket is unbounded
+MOTION_HISTOGRAM_BOUNDS = [0.0001, 0.0003, 0.001, 0.003, 0.01, 0.03, 0.1, 0.3]
+
+class MotionGate:
+    def __init__(self, threshold, pixelThreshold, scale, maxSkipFrames):
+        '''
+        A cheap change detector in front of the frame analysis.
+        The target's region is downscaled and compared to the same region of the last fully analyzed frame,
+        frames in which too little of the region changed are static and don't need to be analyzed again.
+
+        {Number} threshold - The fraction of the region that has to change for a frame to be analyzed
+        {Number} pixelThreshold - The gray level difference from which a downscaled pixel is considered changed
+        {Number} scale - The downscaling factor of the region (e.g. .125 to compare blocks of 8x8 pixels)
+        {Number} maxSkipFrames - Amount of frames after which a frame is analyzed regardless of its motion
+        '''
+
+        self.threshold = threshold
+        self.pixel_threshold = pixelThreshold
+        self.scale = scale
+        self.max_skip_frames = maxSkipFrames
+
+        self.reference = None
+        self.reference_roi = None
+        self.reference_frame = 0
+        self.signature = None
+        self.signature_roi = None
+        self.signature_frame = None
+
+        self.checked = 0
+        self.skipped = 0
+        self.forced = 0
+        self.histogram = [0] * (len(MOTION_HISTOGRAM_BOUNDS) + 1)
+
+    def _signature(self, frame, roi):
+        x0, y0, x1, y1 = roi
+        size = (max(1, int((x1 - x0) * self.scale)), max(1, int((y1 - y0) * self.scale)))
+
+        # downscaling averages the sensor noise out, before the (cheaper) conversion of the smaller image
+        small = cv2.resize(frame[y0:y1, x0:x1], size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def is_static(self, frame, roi, frame_count):
+        '''
+        Check whether a frame changed since the last fully analyzed frame.
+
+        Parameters:
+            {Numpy.array} frame - The frame to check
+            {Tuple} roi - (x0, y0, x1, y1) the target's region in the frame (None if the target is not located)
+            {Number} frame_count - The number of the frame
+
+        Returns:
+            {Boolean} True if the frame can reuse the analysis of the last fully analyzed frame.
+        '''
+
+        self.signature = self.signature_frame = None
+
+        # a reference of the same region is needed, and it must not get too old
+        if self.reference is None or roi is None or roi != self.reference_roi:
+            return False
+
+        if frame_count - self.reference_frame >= self.max_skip_frames:
+            self.forced += 1
+            return False
+
+        self.signature = self._signature(frame, roi)
+        self.signature_roi = roi
+        self.signature_frame = frame_count
+
+        changed = cv2.countNonZero(cv2.compare(cv2.absdiff(self.signature, self.reference),
+                                               self.pixel_threshold, cv2.CMP_GT))
+        motion = changed / self.signature.size
+
+        self.checked += 1
+        self.histogram[bisect_left(MOTION_HISTOGRAM_BOUNDS, motion)] += 1
+
+        if motion < self.threshold:
+            self.skipped += 1
+            return True
+
+        return False
+
+    def measure(self, frame, roi, frame_count):
+        '''
+        Downscale the target's region of a frame before it's analyzed, since the analysis thresholds it in place.
+
+        Parameters:
+            {Numpy.array} frame - The frame that is about to be analyzed
+            {Tuple} roi - (x0, y0, x1, y1) the target's region in the frame (None if the target is not located)
+            {Number} frame_count - The number of the frame
+        '''
+
+        # the frame was already downscaled when it was checked
+        if roi is None or (self.signature_frame == frame_count and self.signature_roi == roi):
+            return
+
+        self.signature = self._signature(frame, roi)
+        self.signature_roi = roi
+        self.signature_frame = frame_count
+
+    def mark_analyzed(self, roi, frame_count):
+        '''
+        Register a frame as fully analyzed, the following frames are compared to it.
+        The frame must have been measured before its analysis.
+
+        Parameters:
+            {Tuple} roi - (x0, y0, x1, y1) the target's region after the analysis (None if the target was lost)
+            {Number} frame_count - The number of the frame
+        '''
+
+        self.reference_frame = frame_count
+        self.reference_roi = roi
+
+        # once the analysis moved the region the frame is thresholded already,
+        # the next frame is analyzed and becomes the reference instead
+        if roi is not None and self.signature_frame == frame_count and self.signature_roi == roi:
+            self.reference = self.signature
+        else:
+            self.reference = None
+
+        self.signature = self.signature_frame = None
+
+    def to_dict(self):
+        '''
+        Returns:
+            {Dict} The gating decisions {
+                       "threshold": The motion threshold,
+                       "checked": Amount of frames whose motion was measured,
+                       "skipped": Amount of frames that reused the previous analysis,
+                       "forced": Amount of frames analyzed because their reference got too old,
+                       "histogram_bounds": MOTION_HISTOGRAM_BOUNDS,
+                       "histogram": Amount of checked frames in each motion bucket
+                   }
+        '''
+
+        return {
+            "threshold": self.threshold,
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "forced": self.forced,
+            "histogram_bounds": MOTION_HISTOGRAM_BOUNDS,
+            "histogram": list(self.histogram)
+        }
+
+class GateStats:
+    def __init__(self):
+        '''
+        Adds up the gating decisions of the analyses of a round, e.g. of the segments of its video.
+        '''
+
+        self.stats = None
+
+    def merge(self, stats):
+        '''
+        Parameters:
+            {Dict} stats - The gating decisions of an analysis (see MotionGate.to_dict)
+        '''
+
+        if self.stats is None:
+            self.stats = {**stats, "histogram": list(stats['histogram'])}
+            return
+
+        for key in ('checked', 'skipped', 'forced'):
+            self.stats[key] += stats[key]
+
+        self.stats['histogram'] = [count + other_count for count, other_count
+                                   in zip(self.stats['histogram'], stats['histogram'])]
+
+    def to_dict(self):
+        '''
+        Returns:
+            {Dict} The gating decisions of all of the analyses, with the fraction of the checked frames
+                   that reused a previous analysis as "skip_ratio" (None if no frame was gated).
+        '''
+
+        if self.stats is None:
+            return None
+
+        checked = self.stats['checked']
+        return {**self.stats, "skip_ratio": round(self.stats['skipped'] / checked, 4) if checked else 0}
@@ -0,0 +1,254 @@
+from project.core.target_scoring import HitsManager as hitsMngr
+from project.core.target_scoring.VideoAnalyzer import VideoAnalyzer, hits_to_results
+from project.core.target_scoring.ModelFeatures import compute_model_features, features_to_bytes, features_from_bytes
+from project.core.target_scoring.FeatureDetector import create_detector
+from project.core.Profiler import Profiler
+from project.core.target_scoring.MotionGate import GateStats
+from bisect import bisect_right
+import subprocess
+import billiard
+import cv2
+
+MIN_SEGMENT_TIME = 10.0
+
+def probe_keyframes(videoPath):
+    '''
+    List the keyframes of a video with ffprobe.
+
+    Parameters:
+        {String} videoPath - The path of the video
+
+    Returns:
+        {List} The indices of the keyframes, in presentation order (None if the video could not be probed).
+        {Number} Amount of frames in the video (None if the video could not be probed).
+    '''
+
+    command = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        videoPath
+    ]
+
+    try:
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Could not probe keyframes: {e}")
+        return None, None
+
+    packets = []
+    for line in output.splitlines():
+        fields = line.split(',')
+        if len(fields) < 2 or fields[0] in ('', 'N/A'):
+            continue
+
+        packets.append((float(fields[0]), 'K' in fields[1]))
+
+    # packets are listed in decoding order
+    packets.sort()
+    keyframes = [index for index, (_, is_key) in enumerate(packets) if is_key]
+    return keyframes, len(packets)
+
+def split_segments(framesAmount, keyframes, segmentsAmount, overlapFrames):
+    '''
+    Split a video into segments that start at keyframes.
+    Each segment but the last runs overlapFrames into the next one,
+    so hits that land right before a boundary are verified within their own segment.
+
+    Parameters:
+        {Number} framesAmount - Amount of frames in the video
+        {List} keyframes - The indices of the keyframes (segments start anywhere if empty)
+        {Number} segmentsAmount - The requested amount of segments
+        {Number} overlapFrames - Amount of frames each segment overlaps the next one by
+
+    Returns:
+        {List} [
+                  {Tuple} (
+                             {Number} The first frame of the segment,
+                             {Number} The frame at which the segment ends (exclusive, None for the end of the video)
+                          )
+                  ...
+               ]
+    '''
+
+    starts = [0]
+
+    for index in range(1, segmentsAmount):
+        start = int(round(framesAmount * index / segmentsAmount))
+
+        # move the start back to the closest keyframe
+        if keyframes:
+            keyframe_index = bisect_right(keyframes, start) - 1
+            start = keyframes[keyframe_index] if keyframe_index >= 0 else 0
+
+        if start > starts[-1]:
+            starts.append(start)
+
+    segments = []
+    for index, start in enumerate(starts):
+        end = starts[index + 1] + overlapFrames if index + 1 < len(starts) else None
+        if end is not None and end >= framesAmount:
+            end = None
+
+        segments.append((start, end))
+
+    return segments
+
+def _init_segment_worker():
+    # the segments already occupy the cores, more threads per process only contend with each other
+    cv2.setNumThreads(1)
+
+def _analyze_segment(task):
+    '''
+    Analyze a single segment, in a worker process.
+
+    Parameters:
+        {Tuple} task - (video path, rings amount, inner diameter, config, serialized features, frame range, fps)
+
+    Returns:
+        {List} The verified hits of the segment.
+        {Numpy.array} The last bull'seye point of the segment (None if the target was never found).
+        {Dict} The profile of the segment's analysis (None if it's not profiled).
+        {Dict} The decisions of the segment's motion gate (None if it's not gated).
+    '''
+
+    videoPath, ringsAmount, diamPx, config, featuresData, frameRange, video_fps = task
+    features = features_from_bytes(featuresData)
+    profiler = Profiler() if config.profiling else None
+    gate_stats = GateStats()
+
+    analyzer = VideoAnalyzer(videoPath, None, None, ringsAmount, diamPx, config,
+                             lambda frameShape, detectorName: features, frameRange, profiler, gate_stats)
+    hits = analyzer.collect_hits(video_fps)
+    return hits, analyzer.bullseye_point, profiler.to_dict() if profiler is not None else None, gate_stats.stats
+
+def merge_segment_hits(segments_hits, bullseye, distanceTolerance):
+    '''
+    Reconcile the verified hits of consecutive segments.
+    Hits of different segments within the tolerance distance are the same arrow,
+    which keeps the earliest frame it was detected in.
+
+    Parameters:
+        {List} segments_hits - [
+                                  {List} The verified hits of a segment
+                                  ...
+                               ] in the order of the segments
+        {Tuple} bullseye - The bull'seye point all of the hits are shifted to
+        {Number} distanceTolerance - Amount of pixels around a point that can be ignored
+                                     in order to consider another point as the same one
+
+    Returns:
+        {List} The merged hits.
+    '''
+
+    merged_hits = hitsMngr.HitTable(distanceTolerance)
+
+    for hits in segments_hits:
+        segment_hits = hitsMngr.HitTable(distanceTolerance)
+        for hit in hits:
+            segment_hits.append(hit, hitsMngr.VERIFIED)
+
+        # bring the hits of all segments to the same frame of reference
+        hitsMngr.shift_hits(bullseye, segment_hits)
+
+        for hit in segment_hits.export(hitsMngr.VERIFIED):
+            known_hit = hitsMngr.get_hit(hitsMngr.VERIFIED, hit.point, distanceTolerance, merged_hits)
+
+            if type(known_hit) == type(None):
+                merged_hits.append(hit, hitsMngr.VERIFIED)
+            elif hit.frame_count < known_hit.frame_count:
+                known_hit.frame_count = hit.frame_count
+
+    return merged_hits.export(hitsMngr.VERIFIED)
+
+def analyze_in_segments(videoPath, model, bullseye, ringsAmount, diamPx, config, modelFeatures,
+                        outputName, sketcher, start_time, video_fps, profiler=None, gateStats=None):
+    '''
+    Analyze a video in keyframe aligned segments on a pool of processes, merge their hits,
+    then write the hits to the output video.
+
+    Parameters:
+        {String} videoPath - The path of the video to analyze
+        {Numpy.array} model - An image of the target that appears in the video
+        {Tuple} bullseye - The bull'seye location in the model image (x, y)
+        {Number} ringsAmount - Amount of rings in the target
+        {Number} diamPx - The diameter of the most inner ring in the target image [px]
+        {AnalysisConfig} config - The analysis options of the round
+        {Function} modelFeatures - Returns the precomputed ModelFeatures for a given frame shape and detector name.
+                                   If None, the features are computed from the model image.
+        {String} outputName - The path of the output file (None to only gather the hits)
+        {Sketcher} sketcher - A Sketcher object to use when writing the data to the output video
+        {Datetime} start_time - The time at which the video started
+        {Number} video_fps - The frame rate of the video
+        {Profiler} profiler - Times the stages of the analysis, of all of the segments together (nothing is timed if None)
+        {GateStats} gateStats - Gathers the decisions of the motion gate, of all of the segments together (not gathered if None)
+
+    Returns:
+        {List} The processed hit information of the round's score.
+    '''
+
+    cap = cv2.VideoCapture(videoPath)
+    _, first_frame = cap.read()
+    frames_amount = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    # the features are prepared once and shared with all of the segments
+    if modelFeatures is None:
+        features = compute_model_features(model, bullseye, first_frame.shape, create_detector(config.detector))
+    else:
+        features = modelFeatures(first_frame.shape, config.detector)
+
+    keyframes, probed_frames_amount = probe_keyframes(videoPath)
+    if probed_frames_amount:
+        frames_amount = probed_frames_amount
+
+    processes = config.segment_processes or billiard.cpu_count()
+    segments_amount = min(processes, int(frames_amount / (MIN_SEGMENT_TIME * video_fps)))
+    segments = split_segments(frames_amount, keyframes, max(1, segments_amount),
+                              config.to_frames(config.segment_overlap_time, video_fps))
+
+    # too short to be worth splitting
+    if len(segments) == 1:
+        analyzer = VideoAnalyzer(videoPath, None, None, ringsAmount, diamPx, config,
+                                 lambda frameShape, detectorName: features, profiler=profiler, gateStats=gateStats)
+        return analyzer.analyze(outputName, sketcher, start_time, video_fps)
+
+    features_data = features_to_bytes(features)
+    tasks = [(videoPath, ringsAmount, diamPx, config, features_data, segment, video_fps) for segment in segments]
+    print(f"analyzing {len(segments)} segments: {segments}")
+
+    # billiard pools can be started from within the (daemonic) celery worker processes
+    pool = billiard.Pool(min(processes, len(tasks)), initializer=_init_segment_worker)
+    try:
+        results = pool.map(_analyze_segment, tasks)
+    finally:
+        # all of the results are already collected, a graceful close lingers on the idle workers
+        pool.terminate()
+        pool.join()
+
+    # the most recent bull'seye point is the frame of reference of the output
+    bullseyes = [segment_bullseye for _, segment_bullseye, _, _ in results if type(segment_bullseye) != type(None)]
+    merged_hits = []
+    if bullseyes:
+        merged_hits = merge_segment_hits([hits for hits, _, _, _ in results], bullseyes[-1], config.hit_tolerance_px)
+
+    if profiler is not None:
+        for _, _, profile, _ in results:
+            if profile is not None:
+                profiler.merge(profile)
+
+    if gateStats is not None:
+        for _, _, _, gate_decisions in results:
+            if gate_decisions is not None:
+                gateStats.merge(gate_decisions)
+
+    sorted_hits = sorted(merged_hits, key=lambda x: x.frame_count)
+
+    if outputName is not None:
+        drawer = VideoAnalyzer(videoPath, None, None, ringsAmount, diamPx, config,
+                               lambda frameShape, detectorName: features, profiler=profiler)
+        drawer.cap.release()
+        drawer.draw_hits(outputName, sketcher, sorted_hits, drawer.read_source_frames(), video_fps)
+
+    return hits_to_results(sorted_hits, start_time, video_fps)
@@ -0,0 +1,190 @@
+import numpy as np
+import cv2
+
+class BurstRecord:
+    def __init__(self, start, roi, size, scale):
+        '''
+        The motion of a burst within a single homography epoch, per downscaled pixel of the target's region.
+
+        {Number} start - The first frame of the burst
+        {Tuple} roi - (x0, y0, x1, y1) the region of the frame the motion was measured in
+        {Tuple} size - The downscaled size of the region (width, height)
+        {Number} scale - The downscaling factor of the region
+        '''
+
+        self.start = start
+        self.roi = roi
+        self.scale = scale
+        self.peak_diff = np.zeros((size[1], size[0]), np.uint8)
+        self.peak_frame = np.zeros((size[1], size[0]), np.int32)
+
+    def update(self, diff, frame_count):
+        '''
+        Parameters:
+            {Numpy.array} diff - The downscaled difference of a frame from the previous one
+            {Number} frame_count - The number of the frame
+        '''
+
+        stronger = diff > self.peak_diff
+        self.peak_diff[stronger] = diff[stronger]
+        self.peak_frame[stronger] = frame_count
+
+    def peak_at(self, point, radius):
+        '''
+        Parameters:
+            {Tuple} point - (x, y) a point in the frame
+            {Number} radius - The radius around the point to search [px]
+
+        Returns:
+            {Number} The strongest difference around the point during the burst (0 if it's outside of the region).
+            {Number} The frame of that difference.
+        '''
+
+        x0, y0, _, _ = self.roi
+        h, w = self.peak_diff.shape
+        col, row = int((point[0] - x0) * self.scale), int((point[1] - y0) * self.scale)
+        if not (0 <= col < w and 0 <= row < h):
+            return 0, None
+
+        reach = max(1, int(np.ceil(radius * self.scale)))
+        rows, cols = slice(max(0, row - reach), row + reach + 1), slice(max(0, col - reach), col + reach + 1)
+        neighbourhood = self.peak_diff[rows, cols]
+        index = np.unravel_index(np.argmax(neighbourhood), neighbourhood.shape)
+        return int(neighbourhood[index]), int(self.peak_frame[rows, cols][index])
+
+class ShotEventDetector:
+    def __init__(self, threshold, pixelThreshold, scale, settleFrames, maxBurstFrames):
+        '''
+        Marks the frames at which projectiles arrive at the target.
+        Consecutive frames are differenced within the target's ring, a burst of motion that settles down
+        for a few frames is an arrival event, dated to the first frame of the burst.
+        The frame in which each part of the target changed the most during a burst is kept,
+        to date a hit to the frame its projectile appeared in.
+
+        {Number} threshold - The fraction of the target's ring that has to change between two frames to count as motion
+        {Number} pixelThreshold - The gray level difference from which a downscaled pixel is considered changed
+        {Number} scale - The downscaling factor of the target's region (e.g. .125 to compare blocks of 8x8 pixels)
+        {Number} settleFrames - Amount of still frames that end a burst of motion
+        {Number} maxBurstFrames - Amount of frames after which a burst that does not settle is reported anyway
+        '''
+
+        self.threshold = threshold
+        self.pixel_threshold = pixelThreshold
+        self.scale = scale
+        self.settle_frames = settleFrames
+        self.max_burst_frames = maxBurstFrames
+
+        self.epoch = None
+        self.mask = None
+        self.mask_area = 1
+        self.size = None
+        self.previous_frame = None
+        self.previous_signature = None
+        self.burst_start = None
+        self.still_frames = 0
+        self.events = []
+        self.bursts = []
+
+    def _prepare(self, epoch):
+        # the ring of the target in downscaled region coordinates
+        x0, y0, x1, y1 = epoch.roi
+        size = (max(1, int((x1 - x0) * self.scale)), max(1, int((y1 - y0) * self.scale)))
+        inside = (~epoch.outside_mask(epoch.estimated_radius)).astype('uint8') * 255
+        self.mask = cv2.resize(inside, size, interpolation=cv2.INTER_NEAREST)
+        self.mask_area = max(1, cv2.countNonZero(self.mask))
+        self.size = size
+        self.epoch = epoch
+
+    def _signature(self, frame):
+        x0, y0, x1, y1 = self.epoch.roi
+        small = cv2.resize(frame[y0:y1, x0:x1], self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def update(self, frame, epoch, frame_count):
+        '''
+        Measure the motion of a frame against the previous one.
+        Frames must be given consecutively, an arrival in a skipped frame would be dated to the next given frame.
+
+        Parameters:
+            {Numpy.array} frame - The frame (before the analysis draws over it)
+            {HomographyEpoch} epoch - The current homography epoch (None if the target is not located)
+            {Number} frame_count - The number of the frame
+
+        Returns:
+            {Number} The frame at which a projectile arrived, once its burst of motion settles (None otherwise).
+        '''
+
+        if epoch is None:
+            self.previous_frame = self.previous_signature = None
+            self.burst_start = None
+            return None
+
+        # a new epoch moves the region, the previous frame is compared within the new one
+        if epoch is not self.epoch:
+            self._prepare(epoch)
+            if self.previous_frame is not None:
+                self.previous_signature = self._signature(self.previous_frame)
+
+        signature = self._signature(frame)
+        previous_signature = self.previous_signature
+        # the analysis thresholds the frame in place, a copy is kept to be compared within the next epoch's region
+        self.previous_frame, self.previous_signature = frame.copy(), signature
+
+        if previous_signature is None:
+            return None
+
+        diff = cv2.absdiff(signature, previous_signature)
+        changed = cv2.compare(diff, self.pixel_threshold, cv2.CMP_GT)
+        motion = cv2.countNonZero(cv2.bitwise_and(changed, self.mask)) / self.mask_area
+
+        if motion >= self.threshold:
+            if self.burst_start is None:
+                self.burst_start = frame_count
+            self.still_frames = 0
+        elif self.burst_start is not None:
+            self.still_frames += 1
+
+        if self.burst_start is None:
+            return None
+
+        # a burst is recorded in the region of each epoch it lasts through
+        burst = self.bursts[-1] if self.bursts else None
+        if burst is None or burst.start != self.burst_start or burst.roi != self.epoch.roi:
+            burst = BurstRecord(self.burst_start, self.epoch.roi, self.size, self.scale)
+            self.bursts.append(burst)
+        burst.update(diff, frame_count)
+
+        if self.still_frames >= self.settle_frames or frame_count - self.burst_start >= self.max_burst_frames:
+            arrival = self.burst_start
+            self.burst_start = None
+            self.still_frames = 0
+            self.events.append(arrival)
+            return arrival
+
+        return None
+
+    def arrival_of(self, point, frame_count, radius, since=0):
+        '''
+        Date a hit to the frame its projectile appeared in: the frame in which its point changed the most,
+        during the bursts of motion up to its detection (a projectile's arrival outweighs the shake of the camera).
+
+        Parameters:
+            {Tuple} point - (x, y) the hit's tip in the frame
+            {Number} frame_count - The frame the hit was detected in
+            {Number} radius - The distance from the tip within which its projectile is searched for [px]
+            {Number} since - Bursts that started before this frame are not considered
+
+        Returns:
+            {Number} The frame of the hit's arrival (frame_count if no burst changed its point).
+        '''
+
+        arrival, strongest = frame_count, self.pixel_threshold
+        for burst in self.bursts:
+            if not since <= burst.start <= frame_count:
+                continue
+
+            peak_diff, peak_frame = burst.peak_at(point, radius)
+            if peak_diff > strongest:
+                arrival, strongest = peak_frame, peak_diff
+
+        return arrival
@@ -1,3 +1,4 @@
+from project.core.Overlay import Overlay
 import cv2
 
 class Sketcher:
@@ -9,6 +10,7 @@ class Sketcher:
 
         self.measure_unit = measureUnit
         self.measure_name = measureName
+        self.overlay = Overlay()
 
     def draw_data_block(self, img):
         '''
@@ -88,10 +90,13 @@ class Sketcher:
 
         Parameters:
             {Numpy.array} img - The img on which to draw
-            {Numpy.array} contour - The external contour of the group
+            {Numpy.array} contour - The external contour of the group (None if there's no group)
         '''
 
-        cv2.drawContours(img, contour, -1, (214,215,97), 2)
+        if type(contour) == type(None):
+            return
+
+        cv2.polylines(img, [contour], True, (214,215,97), 2)
 
     def type_arrows_amount(self, img, amount, dataColor):
         '''
@@ -166,4 +171,72 @@ class Sketcher:
             cv2.putText(img, str(hit.id), (70, text_y), cv2.FONT_HERSHEY_PLAIN, 3, (0xff,0xff,0xff), thickness=5)
 
             cv2.putText(img, score_string, (230, text_y), cv2.FONT_HERSHEY_PLAIN, 3, (0x0,0x0,0x0), thickness=15)
-            cv2.putText(img, score_string, (230, text_y), cv2.FONT_HERSHEY_PLAIN, 3, (0xff,0xff,0xff), thickness=5)
\ No newline at end of file
+            cv2.putText(img, score_string, (230, text_y), cv2.FONT_HERSHEY_PLAIN, 3, (0xff,0xff,0xff), thickness=5)
+
+    def draw_hit_history(self, img, previousHits):
+        '''
+        Draw the hits that were detected so far, the previous hits in a dimmer color
+        and the most recent hit in a brighter color.
+        The hits are only rendered again when they change.
+
+        Parameters:
+            {Numpy.array} img - The img on which to draw
+            {List} previousHits - The hits that were detected so far, sorted by their frame [HitsManager.Hit]
+        '''
+
+        def render_hits(canvas):
+            if not previousHits:
+                return
+
+            # previous hits in a dimmer (grayish) color
+            self.mark_hits(canvas, previousHits, foreground=(0x80,0x80,0x80),
+                           diam=5, withOutline=True, withScore=False)
+
+            # the current hit in full intensity (green)
+            self.mark_hits(canvas, [previousHits[-1]], foreground=(0x0,0xff,0x0),
+                           diam=5, withOutline=True, withScore=True)
+
+        hits_key = tuple((hit.point, hit.score) for hit in previousHits)
+        self.overlay.draw(img, [('hits', hits_key, render_hits)])
+
+    def draw_scoring_overlay(self, img, candidateHits, verifiedHits, groupingContour, groupingDiameter):
+        '''
+        Draw the data block, the round's data, the grouping and the hits.
+        The data block is rendered once per resolution, the rest is only rendered again when it changes.
+
+        Parameters:
+            {Numpy.array} img - The img on which to draw
+            {List} candidateHits - The candidate hits [HitsManager.Hit]
+            {List} verifiedHits - The verified hits [HitsManager.Hit]
+            {Numpy.array} groupingContour - The external contour of the group (None if there's no group)
+            {Number} groupingDiameter - The diameter of the grouping
+        '''
+
+        verified_scores = [h.score for h in verifiedHits]
+        arrows_amount = len(verified_scores)
+
+        def render_data(canvas):
+            self.type_arrows_amount(canvas, arrows_amount, (0x0,0x0,0xff))
+            self.type_total_score(canvas, sum(verified_scores), arrows_amount * 10, (0x0,189,62))
+            self.type_grouping_diameter(canvas, groupingDiameter, (0xff,133,14))
+
+        def render_candidates(canvas):
+            self.mark_hits(canvas, candidateHits, foreground=(0x0,0x0,0xff),
+                           diam=2, withOutline=False, withScore=False)
+
+        def render_verified(canvas):
+            self.mark_hits(canvas, verifiedHits, foreground=(0x0,0xff,0x0),
+                           diam=5, withOutline=True, withScore=True)
+            self.shot_label_table(canvas, verifiedHits)
+
+        has_group = type(groupingContour) != type(None)
+        data_key = (arrows_amount, sum(verified_scores), round(groupingDiameter * self.measure_unit, 1))
+        grouping_key = tuple(map(tuple, groupingContour.reshape(-1, 2).tolist())) if has_group else None
+
+        self.overlay.draw(img, [
+            ('data block', None, self.draw_data_block),
+            ('data', data_key, render_data),
+            ('grouping', grouping_key, lambda canvas: self.draw_grouping(canvas, groupingContour)),
+            ('candidates', tuple(h.point for h in candidateHits), render_candidates),
+            ('verified', tuple((h.point, h.score, h.id) for h in verifiedHits), render_verified),
+        ])
\ No newline at end of file
@@ -3,13 +3,39 @@ from project.core.target_scoring import VisualAnalyzer as visuals
 from project.core.target_scoring import GroupingMetre as grouper
 from project.core.target_scoring import Geometry2D as geo2D
 from project.core.target_scoring import HitsManager as hitsMngr
+from project.core.target_scoring.FrameSpool import FrameSpool
+from project.core.target_scoring.FrameScheduler import FrameScheduler
+from project.core.target_scoring.AnalysisConfig import AnalysisConfig
+from project.core.target_scoring.HomographyTracker import HomographyTracker
+from project.core.target_scoring.HomographyEpoch import HomographyEpoch
+from project.core.target_scoring.MotionGate import MotionGate
+from project.core.target_scoring.ShotEventDetector import ShotEventDetector
+from project.core.FramePipeline import FrameReader, FrameWriter
+from project.core.VideoEncoder import create_video_writer
+from project.core.Profiler import NULL_PROFILER
+from project.core.target_scoring.ModelFeatures import compute_model_features
+from project.core.target_scoring.FeatureDetector import create_detector
+from bisect import bisect_right
 import numpy as np
 import cv2
+import os
 
 HOMOGRAPHY_LIFE_SPAN = 30
+# the tracked points only check their own consistency, so their error builds up from refresh to refresh:
+# the homography is detected on the model again after this many tracked refreshes,
+# or once the tracked corners moved further than this from the detected ones [px]
+MAX_TRACKED_REFRESHES = 2
+MAX_TRACKED_DISPLACEMENT = 8
+ROI_PADDING = 16
+# the fraction of the hit tolerance around a new hit's tip within which its projectile's arrival is searched for
+ARRIVAL_SEARCH_RATIO = .5
+SPOOL_MEMORY_BUDGET = 512 * 1024 * 1024
+# compressed bytes spilled to disk per analysis, longer videos are decoded again for the output
+SPOOL_DISK_BUDGET = 4 * 1024 * 1024 * 1024
 
 class VideoAnalyzer:
-    def __init__(self, videoPath, model, bullseye, ringsAmount, diamPx):
+    def __init__(self, videoPath, model, bullseye, ringsAmount, diamPx, config=None, modelFeatures=None, frameRange=None,
+                 profiler=None, gateStats=None, capture=None, reopenCapture=None):
         '''
         {String} videoName - The path of the video to analyze
         {Numpy.array} model - An image of the target that appears in the video
@@ -19,61 +45,211 @@ class VideoAnalyzer:
                            )
         {Number} ringsAmount - Amount of rings in the target
         {Number} diamPx - The diameter of the most inner ring in the target image [px]
+        {AnalysisConfig} config - The analysis options of the round (defaults if None)
+        {Function} modelFeatures - Returns the precomputed ModelFeatures for a given frame shape and detector name.
+                                   If None, the features are computed from the model image.
+        {Tuple} frameRange - (
+                                {Number} The first frame to analyze,
+                                {Number} The frame at which the analysis stops (exclusive, None for the end of the video)
+                             )
+                             Defaults to the whole video.
+        {Profiler} profiler - Times the stages of the analysis (nothing is timed if None)
+        {GateStats} gateStats - Gathers the decisions of the motion gate (not gathered if None)
+        {Object} capture - The opened video capture to read the frames from, instead of opening videoPath
+                           (e.g. a VideoDecoder.StreamDecoder of a live recording)
+        {Function} reopenCapture - Returns a new capture of the same frames as capture, to decode them again
+                                   for the output (videoPath is opened if None)
         '''
         self.video_path = videoPath
-        self.cap = cv2.VideoCapture(videoPath)
+        self.reopen_capture = reopenCapture
+        self.config = config if config is not None else AnalysisConfig()
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        self.gate_stats = gateStats
+        self.start_frame, self.end_frame = frameRange if frameRange is not None else (0, None)
+        self.cap = capture if capture is not None else cv2.VideoCapture(videoPath)
+        if self.start_frame > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
         _, test_sample = self.cap.read()
+        self.first_frame = test_sample
         frameSize = test_sample.shape
         self.rings_amount = ringsAmount
         self.inner_diam = diamPx
         self.model = model
         self.frame_h, self.frame_w, _ = frameSize
-        self.sift = cv2.SIFT_create()
+        self.detector = create_detector(self.config.detector)
 
         # calculate anchor points and model features
-        self.anchor_points, self.pad_model = geo2D.zero_pad_as(model, frameSize)
-        anchor_a = self.anchor_points[0]
-        bullseye_anchor = (anchor_a[0] + bullseye[0],anchor_a[1] + bullseye[1])
-        self.anchor_points.append(bullseye_anchor)
-        self.anchor_points = np.float32(self.anchor_points).reshape(-1, 1, 2)
-        self.model_keys, self.model_desc = self.sift.detectAndCompute(self.pad_model, None)
+        if modelFeatures is None:
+            features = compute_model_features(model, bullseye, frameSize, self.detector)
+        else:
+            features = modelFeatures(frameSize, self.config.detector)
+
+        self.model_shape = features.model_shape
+        self.anchor_points = features.anchor_points
+        self.pad_model = features.pad_model
+        self.model_keys, self.model_desc = features.keypoints, features.descriptors
+        self.descriptor_index = matcher.get_descriptor_index(self.model_desc, self.config.matcher)
         
-        self.warped_img = None
+        self.epoch = None
         self.bullseye_point = None
         self.warped_vertices = []
         self.scale = None
         self.homography_setup_done = False
+        self.tracker = HomographyTracker()
+        self.tracked_refreshes = 0
+        self.detected_transform = None
+        self.feature_detections = 0
         self.frame_life = 0
-        self.frame_count = 0
+        self.frame_step = 1
+        self.frame_count = self.start_frame
         self.current_hit_id = 1
         
-        self.verified_hits = []
-        self.candidate_hits = []
+        self.hits = hitsMngr.HitTable(self.config.hit_tolerance_px)
+
+    def _apply_homography(self, homography):
+        '''
+        Warp the model over the frame according to a homography, if it's good enough.
+
+        Parameters:
+            {Numpy.array} homography - A 3x3 homography of the padded model over the frame
+
+        Returns:
+            {Boolean} True if the homography was accepted.
+        '''
+
+        warped_transform = cv2.perspectiveTransform(self.anchor_points, homography)
+        self.warped_vertices, warped_edges = geo2D.calc_vertices_and_edges(warped_transform)
+        self.bullseye_point = self.warped_vertices[5]
+
+        # check if homography is good enough to continue
+        if matcher.is_true_homography(self.warped_vertices, warped_edges, (self.frame_w, self.frame_h), .2):
+            # calculate the scale difference
+            self.scale = geo2D.calc_model_scale(warped_edges, self.model_shape)
+            estimated_radius = self.rings_amount * self.inner_diam * self.scale[2]
+
+            # the whole per-frame pipeline runs on a padded crop around the target,
+            # warp the input image over it and keep everything that lasts until the next homography
+            roi = geo2D.calc_roi(self.warped_vertices, estimated_radius * 1.05, (self.frame_h, self.frame_w), ROI_PADDING)
+            with self.profiler.stage('warp'):
+                self.epoch = HomographyEpoch(self.pad_model, homography, self.warped_vertices, roi, estimated_radius)
+            self.homography_setup_done = True
+            self.frame_life = 0
+            return True
+
+        self.homography_setup_done = False
+        return False
+
+    def _setup_homography(self, frame, gray):
+        '''
+        Detect and match the model's features in the frame and set up a new homography.
+        The inliers of a successful homography are handed to the tracker.
+
+        Parameters:
+            {Numpy.array} frame - The frame in which to detect the model
+            {Numpy.array} gray - The same frame in grayscale
+
+        Returns:
+            {Boolean} True if a homography was set up.
+        '''
+
+        self.feature_detections += 1
+        with self.profiler.stage('feature_matching'):
+            if self.config.coarse_scale < 1:
+                matches, (train_keys, train_desc) = matcher.coarse_to_fine_match(self.detector, self.descriptor_index, self.model_keys,
+                                                                                 self.anchor_points, frame, .7, self.config.coarse_scale)
+            else:
+                matches, (train_keys, train_desc) = matcher.ratio_match(self.detector, self.model_desc, frame, .7, self.descriptor_index)
+            if len(matches) >= 4:
+                homography, model_pts, frame_pts = matcher.calc_homography_inliers(self.model_keys, train_keys, matches)
 
-    def _setup_homography(self, frame):
-        matches, (train_keys, train_desc) = matcher.ratio_match(self.sift, self.model_desc, frame, .7)
         if len(matches) >= 4:
-            homography = matcher.calc_homography(self.model_keys, train_keys, matches)
 
             # check if homography succeeded and start warping the model over the detected object
-            if type(homography) != type(None):
-                warped_transform = cv2.perspectiveTransform(self.anchor_points, homography)
-                self.warped_vertices, warped_edges = geo2D.calc_vertices_and_edges(warped_transform)
-                self.bullseye_point = self.warped_vertices[5]
-
-                # check if homography is good enough to continue
-                if matcher.is_true_homography(self.warped_vertices, warped_edges, (self.frame_w, self.frame_h), .2):
-                    # warp the input image over the filmed object and calculate the scale difference
-                    self.warped_img = cv2.warpPerspective(self.pad_model, homography, (self.frame_w, self.frame_h))
-                    self.scale = geo2D.calc_model_scale(warped_edges, self.model.shape)
-                    self.homography_setup_done = True
-                    self.frame_life = 0
-                    return True
+            if type(homography) != type(None) and self._apply_homography(homography):
+                self.tracked_refreshes = 0
+                self.detected_transform = cv2.perspectiveTransform(self.anchor_points, homography)
+                if self.config.tracker:
+                    self.tracker.reset(gray, model_pts, frame_pts)
+                return True
         
         # If homography setup failed
         self.homography_setup_done = False
+        self.tracker.clear()
         return False  # Indicating no match was found
 
+    def _is_near_detection(self, homography):
+        '''
+        Parameters:
+            {Numpy.array} homography - A 3x3 homography of the padded model over the frame
+
+        Returns:
+            {Boolean} True if the homography moves none of the anchor points further than MAX_TRACKED_DISPLACEMENT
+                      from where the last feature detection put them.
+        '''
+
+        warped_transform = cv2.perspectiveTransform(self.anchor_points, homography)
+        displacement = np.linalg.norm((warped_transform - self.detected_transform).reshape(-1, 2), axis=1)
+        return displacement.max() <= MAX_TRACKED_DISPLACEMENT
+
+    def _refresh_homography(self, frame, gray):
+        '''
+        Re-estimate the homography from the tracked points, and fall back to a full feature detection
+        if they drifted, or moved too far from the last detection, or were refreshed too many times since.
+
+        Parameters:
+            {Numpy.array} frame - The current frame
+            {Numpy.array} gray - The same frame in grayscale
+
+        Returns:
+            {Boolean} True if a homography is set up.
+        '''
+
+        if self.tracked_refreshes < MAX_TRACKED_REFRESHES:
+            with self.profiler.stage('tracking'):
+                homography = self.tracker.estimate()
+            if type(homography) != type(None) and self._is_near_detection(homography) and self._apply_homography(homography):
+                self.tracked_refreshes += 1
+                return True
+
+        print("processing...")
+        return self._setup_homography(frame, gray)
+
+    def _locate_target(self, frame):
+        '''
+        Follow the target into a frame, and refresh its homography when it's due.
+
+        Parameters:
+            {Numpy.array} frame - The frame (before the analysis draws over it)
+
+        Returns:
+            {Boolean} True if the target is located in the frame.
+        '''
+
+        with self.profiler.stage('tracking'):
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            self.tracker.track(gray)
+
+        if not self.homography_setup_done or self.frame_life > HOMOGRAPHY_LIFE_SPAN:
+            success = self._refresh_homography(frame, gray)
+            if not success:
+                print("no homographic found")
+                return False
+
+        return True
+
+    def _unstraighten(self, point):
+        '''
+        Parameters:
+            {Tuple} point - (x, y) a hit's point, after the target's oval was straightened
+
+        Returns:
+            {Tuple} The point in the frame (x, y).
+        '''
+
+        origin = self.warped_vertices[0]
+        return ((point[0] - origin[0]) / self.scale[0] + origin[0],
+                (point[1] - origin[1]) / self.scale[1] + origin[1])
+
     def _analyze_frame(self, frame):
         '''
         Analyze a single frame.
@@ -105,32 +281,50 @@ class VideoAnalyzer:
         
         # while (not self.warped_img or not self.bullseye_point or not self.warped_vertices or not self.scale):
         
-        while not self.homography_setup_done or self.frame_life > HOMOGRAPHY_LIFE_SPAN:
-        # if True:
-            success = self._setup_homography(frame)
-            print("processing...")
-            if not success:
-                print("no homographic found")
-                return None, []
-        
-        # process image
-        sub_target = visuals.subtract_background(self.warped_img, frame)
-        pixel_distances = geo2D.calc_distances_from(frame.shape, self.warped_vertices[5])
-        estimated_warped_radius = self.rings_amount * self.inner_diam * self.scale[2]
-        
+        # follow the homography inliers before the frame is modified by the analysis
+        profiler = self.profiler
+        if not self._locate_target(frame):
+            return None, []
         
-        circle_radius, emphasized_lines = visuals.emphasize_lines(sub_target, pixel_distances,
-                                                        estimated_warped_radius, self.frame_life, HOMOGRAPHY_LIFE_SPAN)
-        
-        proj_contours = visuals.reproduce_proj_contours(emphasized_lines, pixel_distances,
-                                                       self.warped_vertices[5], circle_radius)
-                
-        suspect_hits = visuals.find_suspect_hits(proj_contours, self.warped_vertices, self.scale)
+        # process the target's region only, contours are mapped back to frame coordinates
+        epoch = self.epoch
+        x0, y0, x1, y1 = epoch.roi
+        with profiler.stage('background_subtraction'):
+            sub_target = visuals.subtract_prepared_background(epoch.background, frame[y0:y1, x0:x1])
 
-        # calculate hits and draw circles around them
-        scoreboard = hitsMngr.create_scoreboard(suspect_hits, self.scale, self.rings_amount, self.inner_diam, self.frame_count, self.current_hit_id)
+        # find the target's outer ring, or use a rough estimation of its radius
+        if self.frame_life > HOMOGRAPHY_LIFE_SPAN:
+            with profiler.stage('hough_circles'):
+                circle_radius = epoch.find_ring_radius(sub_target)
+        else:
+            circle_radius = epoch.estimated_radius
+
+        outside_mask = epoch.outside_mask(circle_radius)
+
+        raster = self.config.reconstruction == 'raster'
+        with profiler.stage('hough_lines'):
+            if raster:
+                emphasized_lines = visuals.emphasize_lines(sub_target, outside_mask, (x0, y0))
+            else:
+                segments = visuals.find_line_segments(sub_target, outside_mask, (x0, y0))
             
-        self.frame_life += 1
+        with profiler.stage('reconstruction'):
+            if raster:
+                proj_contours = visuals.reproduce_proj_contours(emphasized_lines, outside_mask,
+                                                               self.bullseye_point, circle_radius, (x0, y0), frame.shape)
+            else:
+                tips = visuals.reconstruct_arrow_tips(segments, epoch.bullseye, (x0, y0))
+                    
+        with profiler.stage('suspect_hits'):
+            if raster:
+                suspect_hits = visuals.find_suspect_hits(proj_contours, self.warped_vertices, self.scale)
+            else:
+                suspect_hits = visuals.locate_suspect_hits(tips, self.warped_vertices, self.scale)
+
+            # calculate hits and draw circles around them
+            scoreboard = hitsMngr.create_scoreboard(suspect_hits, self.scale, self.rings_amount, self.inner_diam, self.frame_count, self.current_hit_id)
+            
+        self.frame_life += self.frame_step
 
         return self.bullseye_point, scoreboard
 
@@ -145,8 +339,10 @@ class VideoAnalyzer:
 
         # set output configurations
         frame_size = (self.frame_w, self.frame_h)
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(outputName, fourcc, 24.0, frame_size)
+        out = create_video_writer(outputName, 24.0, frame_size, self.config.encoding)
+        grouping = grouper.Grouping()
+        distance_tolerance = self.config.hit_tolerance_px
+        min_verified_reputation = self.config.to_frames(self.config.verify_time, video_fps)
 
         while True:
             ret, frame = self.cap.read()
@@ -157,42 +353,24 @@ class VideoAnalyzer:
                 
                 # increase reputation of consistent hits
                 # or add them as new candidates
-                for hit in scoreboard:
-                    hitsMngr.sort_hit(hit, 30, HOMOGRAPHY_LIFE_SPAN * 2, self.verified_hits, self.candidate_hits)
+                hitsMngr.sort_hits(scoreboard, distance_tolerance, min_verified_reputation, self.hits, self.frame_step)
                 
                 # decrease reputation of inconsistent hits
-                hitsMngr.discharge_hits(self.candidate_hits)
+                hitsMngr.discharge_hits(self.hits, self.frame_step)
                 
                 # stabilize all hits according to the slightly shifted bull'seye point
                 if type(bullseye) != type(None):
-                    hitsMngr.shift_hits(bullseye, self.verified_hits, self.candidate_hits)
+                    hitsMngr.shift_hits(bullseye, self.hits)
 
                 # reference hit groups
-                candidate_hits = hitsMngr.get_hits(hitsMngr.CANDIDATE, self.verified_hits, self.candidate_hits)
-                verified_hits = hitsMngr.get_hits(hitsMngr.VERIFIED, self.verified_hits, self.candidate_hits)
+                candidate_hits = hitsMngr.get_hits(hitsMngr.CANDIDATE, self.hits)
+                verified_hits = hitsMngr.get_hits(hitsMngr.VERIFIED, self.hits)
 
-                # extract grouping data
-                grouping_contour = grouper.create_group_polygon(frame, verified_hits)
-                has_group = type(grouping_contour) != type(None)
-                grouping_diameter = grouper.measure_grouping_diameter(grouping_contour) if has_group else 0
+                # extract grouping data, only recalculated when the verified hits change
+                grouping_contour, grouping_diameter = grouping.update(self.hits)
                     
-                # write meta data on frame
-                sketcher.draw_data_block(frame)
-                sketcher.draw_meta_data_block(frame)
-                verified_scores = [h.score for h in verified_hits]
-                arrows_amount = len(verified_scores)
-                sketcher.type_arrows_amount(frame, arrows_amount, (0x0,0x0,0xff))
-                sketcher.type_total_score(frame, sum(verified_scores), arrows_amount * 10, (0x0,189,62))
-                sketcher.type_grouping_diameter(frame, grouping_diameter, (0xff,133,14))
-                
-                # mark hits and grouping
-                sketcher.draw_grouping(frame, grouping_contour)
-                sketcher.mark_hits(frame, candidate_hits, foreground=(0x0,0x0,0xff),
-                                   diam=2, withOutline=False, withScore=False)
-                
-                sketcher.mark_hits(frame, verified_hits, foreground=(0x0,0xff,0x0),
-                                   diam=5, withOutline=True, withScore=True)
-                sketcher.shot_label_table(frame, verified_hits)
+                # write meta data on frame, mark hits and grouping
+                sketcher.draw_scoring_overlay(frame, candidate_hits, verified_hits, grouping_contour, grouping_diameter)
                 
                 # write frame to output file
                 out.write(frame)
@@ -214,82 +392,270 @@ class VideoAnalyzer:
                 ),
                 "bullseye_relation": hit.bullseye_relation.tolist()
             }
-            for index, hit in enumerate(sorted(self.verified_hits, key=lambda x: x.id))
+            for index, hit in enumerate(sorted(self.hits.export(hitsMngr.VERIFIED), key=lambda x: x.id))
         ]
         
+    def read_source_frames(self):
+        '''
+        Decode the whole video once more, from its first frame.
+
+        Returns:
+            {Generator} The frames of the video.
+        '''
+
+        drawing_cap = self.reopen_capture() if self.reopen_capture is not None else cv2.VideoCapture(self.video_path)
+        if self.config.pipelined:
+            drawing_cap = FrameReader(drawing_cap)
+
+        while True:
+            ret, frame = drawing_cap.read()
+            if not ret:
+                break
+
+            yield frame
+
+        drawing_cap.release()
+
     def analyze(self, outputName, sketcher, start_time, video_fps):
         '''
         Analyze a video completely to gather verified hits, then write these hits to the output video,
         drawing previous hits in dimmer colors and the current hit in a brighter color.
 
         Parameters:
-            {String} outputName - The path of the output file
+            {String} outputName - The path of the output file (None to only gather the hits)
             {Sketcher} sketcher - A Sketcher object to use when writing the data to the output video
         '''
-        
+
+        # the first frame was already consumed by the constructor
+        spool = None
+        if self.config.single_decode and outputName is not None:
+            spool = FrameSpool(SPOOL_MEMORY_BUDGET, SPOOL_DISK_BUDGET, os.path.dirname(outputName) or None)
+            spool.push(self.first_frame)
+
+        sorted_hits = sorted(self.collect_hits(video_fps, spool), key=lambda x: x.frame_count)
+
+        if outputName is not None:
+            # an overflowed spool holds no frames, the video is decoded again
+            single_pass = spool is not None and not spool.overflowed
+            source_frames = spool.frames() if single_pass else self.read_source_frames()
+            self.draw_hits(outputName, sketcher, sorted_hits, source_frames, video_fps)
+
+        # Release resources
+        if spool is not None:
+            spool.close()
+
+        # Return the processed hit information
+        return hits_to_results(sorted_hits, start_time, video_fps)
+
+    def collect_hits(self, video_fps, spool=None, on_verified=None):
+        '''
+        Analyze the frames of the video (or of its frame range) and gather the verified hits.
+        While the target is stable only a sparse stride of frames is analyzed,
+        once candidate hits appear or change every frame is analyzed.
+        Frames in which the target's region did not change since the last analyzed frame
+        reuse its hits, unless there are unverified candidates.
+        With shot events, hits are only searched for in dense windows after projectiles arrive
+        (and after the target is located), the rest of the frames only follow the target.
+
+        Parameters:
+            {Number} video_fps - The frame rate of the video
+            {FrameSpool} spool - Stores every decoded frame for the output, if given
+            {Function} on_verified - Called with all of the verified hits whenever they change, if given
+                                     (the state is kept across frames, so the hits can be reported while the video is received)
+
+        Returns:
+            {List} The verified hits.
+        '''
+
+        # reputation is measured in frames, so the thresholds are independent of the sampling stride
+        distance_tolerance = self.config.hit_tolerance_px
+        min_verified_reputation = self.config.to_frames(self.config.verify_time, video_fps)
+        scheduler = FrameScheduler(self.config.sparse_stride,
+                                   self.config.to_frames(self.config.dense_hold_time, video_fps))
+        gate = None
+        if self.config.motion_gate:
+            gate = MotionGate(self.config.motion_threshold, self.config.motion_pixel_threshold, self.config.motion_scale,
+                              self.config.to_frames(self.config.motion_max_skip_time, video_fps))
+
+        events = None
+        if self.config.shot_events:
+            events = ShotEventDetector(self.config.event_threshold, self.config.motion_pixel_threshold, self.config.motion_scale,
+                                       self.config.to_frames(self.config.event_settle_time, video_fps),
+                                       self.config.to_frames(self.config.event_max_burst_time, video_fps))
+
+        last_scoreboard = []
+        new_candidates = []
+        located_frame = 0
+
+        # decode ahead of the analysis, frames keep their order
+        if self.config.pipelined:
+            self.cap = FrameReader(self.cap)
+
+        profiler = self.profiler
         while True:
-            ret, frame = self.cap.read()
             self.frame_count += 1
+            if self.end_frame is not None and self.frame_count >= self.end_frame:
+                break
+
+            analyze_frame = scheduler.should_analyze(self.frame_count)
+
+            # skipped frames are not retrieved, unless they are needed for the output or for the shot events
+            with profiler.stage('decode'):
+                if analyze_frame or spool is not None or events is not None:
+                    ret, frame = self.cap.read()
+                else:
+                    ret, frame = self.cap.grab(), None
+
+            if not ret:
+                break
+
+            # store the frame before the analysis draws over it, stop storing once the spool overflows
+            if spool is not None and not spool.push(frame):
+                spool = None
+
+            if events is not None:
+                with profiler.stage('shot_events'):
+                    arrival = events.update(frame, self.epoch if self.homography_setup_done else None, self.frame_count)
+
+                if arrival is not None:
+                    scheduler.open_window(self.frame_count)
+                    analyze_frame = True
+
+            if not analyze_frame:
+                continue
+
+            self.frame_step = scheduler.mark_analyzed(self.frame_count)
+
+            # between the windows the target is only followed, its hits are left as they are
+            if events is not None and self.homography_setup_done and not scheduler.is_dense(self.frame_count):
+                if self._locate_target(frame):
+                    self.frame_life += self.frame_step
+                    hitsMngr.shift_hits(self.bullseye_point, self.hits)
+                continue
+
+            # candidates are only verified by frames that were actually analyzed,
+            # and a due homography refresh is never skipped
+            static = (gate is not None and not new_candidates and self.homography_setup_done
+                      and self.frame_life <= HOMOGRAPHY_LIFE_SPAN)
+            if static:
+                with profiler.stage('motion_gate'):
+                    static = gate.is_static(frame, self.epoch.roi, self.frame_count)
+
+            if static:
+                # the homography inliers are still followed, so the next refresh is unaffected
+                with profiler.stage('tracking'):
+                    self.tracker.track(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+                bullseye, scoreboard = None, last_scoreboard
+                self.frame_life += self.frame_step
+            else:
+                was_located = self.homography_setup_done
+                if gate is not None:
+                    with profiler.stage('motion_gate'):
+                        gate.measure(frame, self.epoch.roi if was_located else None, self.frame_count)
 
-            if ret:
                 bullseye, scoreboard = self._analyze_frame(frame)
-                
-                for hit in scoreboard:
-                    hitsMngr.sort_hit(hit, 30, HOMOGRAPHY_LIFE_SPAN * 2, self.verified_hits, self.candidate_hits)
-                
-                hitsMngr.discharge_hits(self.candidate_hits)
+                last_scoreboard = scoreboard
 
-                if type(bullseye) != type(None):
-                    hitsMngr.shift_hits(bullseye, self.verified_hits, self.candidate_hits)
+                # hits of projectiles that arrived since the target was located are dated to their arrival
+                if events is not None and was_located:
+                    for hit in scoreboard:
+                        hit.frame_count = events.arrival_of(self._unstraighten(hit.point), self.frame_count,
+                                                             distance_tolerance * ARRIVAL_SEARCH_RATIO, located_frame)
+
+                # the hits that are already in the target when it's located are searched for in a window of their own
+                if events is not None and not was_located and self.homography_setup_done:
+                    located_frame = self.frame_count
+                    scheduler.open_window(self.frame_count)
+
+                if gate is not None:
+                    with profiler.stage('motion_gate'):
+                        roi = self.epoch.roi if type(bullseye) != type(None) else None
+                        gate.mark_analyzed(roi, self.frame_count)
             
-            else:
-                break
+            with profiler.stage('hits_manager'):
+                hitsMngr.sort_hits(scoreboard, distance_tolerance, min_verified_reputation, self.hits, self.frame_step)
+                hitsMngr.discharge_hits(self.hits, self.frame_step)
+
+                if type(bullseye) != type(None):
+                    hitsMngr.shift_hits(bullseye, self.hits)
+
+                # candidates that re-detect an already verified hit don't require dense analysis
+                new_candidates = [row for row in self.hits.rows(hitsMngr.CANDIDATE).tolist()
+                                  if not hitsMngr.is_verified_hit(self.hits.point(row), distance_tolerance, self.hits)]
+            verified_amount = self.hits.count(hitsMngr.VERIFIED)
+            if on_verified is not None and verified_amount != scheduler.verified_amount:
+                on_verified(self.hits.export(hitsMngr.VERIFIED))
+
+            scheduler.update_hits(self.frame_count, len(new_candidates), verified_amount)
+
+        self.cap.release()
+        if gate is not None and self.gate_stats is not None:
+            self.gate_stats.merge(gate.to_dict())
+
+        return self.hits.export(hitsMngr.VERIFIED)
+
+    def draw_hits(self, outputName, sketcher, sorted_hits, source_frames, video_fps):
+        '''
+        Write the video with its hits drawn over it, each hit from the frame it was first detected in.
+
+        Parameters:
+            {String} outputName - The path of the output file
+            {Sketcher} sketcher - A Sketcher object to use when writing the data to the output video
+            {List} sorted_hits - The verified hits, sorted by their frame
+            {Iterable} source_frames - The frames of the video, from its first frame
+            {Number} video_fps - The frame rate of the output video
+        '''
 
-        drawing_cap = cv2.VideoCapture(self.video_path)
         frame_size = (self.frame_w, self.frame_h)
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(outputName, fourcc, video_fps, frame_size)
-        
-        sorted_hits = sorted(self.verified_hits, key=lambda x: x.frame_count)
+        out = create_video_writer(outputName, video_fps, frame_size, self.config.encoding)
+        if self.config.pipelined:
+            out = FrameWriter(out)
 
+        # overlay timeline - the frame from which each prefix of the sorted hits is drawn
+        hit_frames = [hit.frame_count for hit in sorted_hits]
         current_drawing_frame = 0
+        profiler = self.profiler
+        source_frames = iter(source_frames)
         
         while True:
-            ret, frame = drawing_cap.read()
-            current_drawing_frame += 1
-            if not ret:
+            with profiler.stage('decode'):
+                frame = next(source_frames, None)
+            if frame is None:
                 break
-            
-            previous_hits = [hit for hit in sorted_hits if hit.frame_count <= current_drawing_frame]
-            
-            if previous_hits:
-                current_hit = previous_hits[-1]
 
-                # Draw previous hits with dimmer color
-                sketcher.mark_hits(frame, previous_hits, foreground=(0x80, 0x80, 0x80),  # Dimmer color (grayish)
-                                diam=5, withOutline=True, withScore=False)
+            current_drawing_frame += 1
+            with profiler.stage('drawing'):
+                previous_hits = sorted_hits[:bisect_right(hit_frames, current_drawing_frame)]
+                sketcher.draw_hit_history(frame, previous_hits)
 
-                # Draw current hits with full intensity
-                sketcher.mark_hits(frame, [current_hit], foreground=(0x0, 0xff, 0x0),    # Full intensity (green)
-                                diam=5, withOutline=True, withScore=True)
+            with profiler.stage('encode'):
+                out.write(frame)
 
-            out.write(frame)
+        with profiler.stage('encode'):
+            out.release()
 
-        # Release resources
-        drawing_cap.release()
-        out.release()
+def hits_to_results(sorted_hits, start_time, video_fps):
+    '''
+    Parameters:
+        {List} sorted_hits - The verified hits, sorted by their frame
+        {Datetime} start_time - The time at which the video started
+        {Number} video_fps - The frame rate of the video
 
-        # Return the processed hit information
-        return [
-            {
-                "id": index + 1,
-                "point": hit.point,
-                "score": hit.score,
-                "frame": hit.frame_count,
-                "hit_time": utils.calculate_time_from_video_frame(
-                    start_time, hit.frame_count, video_fps
-                ),
-                "bullseye_relation": hit.bullseye_relation.tolist()
-            }
-            for index, hit in enumerate(sorted_hits)
-        ]
\ No newline at end of file
+    Returns:
+        {List} The processed hit information of the round's score.
+    '''
+
+    return [
+        {
+            "id": index + 1,
+            "point": hit.point,
+            "score": hit.score,
+            "frame": hit.frame_count,
+            "hit_time": utils.calculate_time_from_video_frame(
+                start_time, hit.frame_count, video_fps
+            ),
+            "bullseye_relation": hit.bullseye_relation.tolist()
+        }
+        for index, hit in enumerate(sorted_hits)
+    ]
@@ -3,11 +3,25 @@ from project.core.target_scoring import Geometry2D as geo2D
 import numpy as np
 import cv2
 
+SEGMENT_ANGLE_TOLERANCE = np.deg2rad(10)
+SEGMENT_LINE_DISTANCE = 8
+
 def color_threshold(frame):
     frame[frame >= 128]= 255
     frame[frame < 128] = 0
     return frame
 
+def prepare_background(img):
+    '''
+    Parameters:
+        {Numpy.array} img - The image to prepare [RGB]
+
+    Returns:
+        {Numpy.array} The color thresholded image, in grayscale.
+    '''
+
+    return cv2.cvtColor(color_threshold(img), cv2.COLOR_RGB2GRAY)
+
 def subtract_background(query, subtrahend):
     '''
     Subtract two images, so only the difference between them is left.
@@ -21,14 +35,22 @@ def subtract_background(query, subtrahend):
     Returns:
         {Numpy.array} The difference image.
     '''
-    
-    # Apply color threshold
-    query = color_threshold(query)
-    subtrahend = color_threshold(subtrahend)
 
-    # Convert to grayscale
-    gray_query = cv2.cvtColor(query, cv2.COLOR_RGB2GRAY)
-    gray_subtrahend = cv2.cvtColor(subtrahend, cv2.COLOR_RGB2GRAY)
+    return subtract_prepared_background(prepare_background(query), subtrahend)
+
+def subtract_prepared_background(grayQuery, subtrahend):
+    '''
+    Subtract a background that was already prepared with prepare_background.
+
+    Parameters:
+        {Numpy.array} grayQuery - The prepared image from which the background is subtracted
+        {Numpy.array} subtrahend - The background to subtract from the query [RGB]
+
+    Returns:
+        {Numpy.array} The difference image.
+    '''
+
+    gray_subtrahend = prepare_background(subtrahend)
 
     # # Apply Gaussian blur
     # kernel = (3, 3)
@@ -36,113 +58,209 @@ def subtract_background(query, subtrahend):
     # gray_subtrahend = cv2.GaussianBlur(gray_subtrahend, kernel, 0)
 
     # Apply a black area on the subtrahend image
-    gray_subtrahend[gray_query == 0] = 0
+    gray_subtrahend[grayQuery == 0] = 0
 
     # Subtract images and apply an absolute difference
-    diff = cv2.absdiff(gray_subtrahend, gray_query)
+    diff = cv2.absdiff(gray_subtrahend, grayQuery)
 
     # Set a threshold to capture more variations (adjust the threshold as needed)
     _, thresholded_diff = cv2.threshold(diff, 20, 255, cv2.THRESH_BINARY)
 
     return thresholded_diff
 
-def emphasize_lines(img, distances, estimatedRadius, frame_count, circle_lift_span):
+def find_outer_ring(img, estimatedRadius):
     '''
-    Emphasize all of the straight lines in the image and get rid of unnecessary noise.
+    Find the target's outer ring.
 
     Parameters:
-        {Numpy.array} img - The image to edit
-        {list} distances - [
-                              {List} [
-                                        {Number} x coordinate of the point,
-                                        {Number} y coordinate of the point,
-                                        {Number} The distance of the point from the bull'seye point
-                                     ]
-                              ...
-                           ]
+        {Numpy.array} img - The background subtracted image of the target
         {Number} estimatedRadius - A rough estimation of the target's radius,
                                    that will be used if for some reason it cannot be calculated on the fly.
 
     Returns:
         {Number} The target's current radius [px].
-        {Numpy.array} An image with the lines emphasized.
     '''
 
-    # find the target's outer ring
-    if (frame_count > circle_lift_span):
-        circles = cv2.HoughCircles(img, cv2.HOUGH_GRADIENT, 1, 20,
-                                param1=50, param2=30, minRadius=0,
-                                maxRadius=int(estimatedRadius * 1.05))
-    
-        # use largest detected circle
-        if type(circles) != type(None):
-            outerCircle = sorted(circles[0], key=lambda x: x[2])[::-1][0]
-            radius = outerCircle[2]
-        else:
-            radius = estimatedRadius
-        
+    circles = cv2.HoughCircles(img, cv2.HOUGH_GRADIENT, 1, 20,
+                            param1=50, param2=30, minRadius=0,
+                            maxRadius=int(estimatedRadius * 1.05))
+
+    # use largest detected circle
+    if type(circles) != type(None):
+        outerCircle = sorted(circles[0], key=lambda x: x[2])[::-1][0]
+        return outerCircle[2]
+
     # use a rough estimation of the target's radius as a fallback
-    else:
-        radius = estimatedRadius
-    # radius = estimatedRadius
+    return estimatedRadius
+
+def find_line_segments(img, outsideMask, offset=(0, 0)):
+    '''
+    Find the straight segments in the image and get rid of unnecessary noise.
+    A crop of the frame is searched at its position in the frame, in an image that ends at the crop's far corner,
+    which makes HoughLinesP slower than on the crop alone but finds the same segments as the whole frame would.
+
+    Parameters:
+        {Numpy.array} img - The image to search (modified)
+        {Numpy.array} outsideMask - A boolean mask of the pixels outside of the target's outer ring
+        {Tuple} offset - The position of the image in the frame (x, y), when it's a crop of the frame
+
+    Returns:
+        {Numpy.array} (N,4) the segments' end points in the image (x1, y1, x2, y2).
+    '''
 
     # zero out all pixels outside of the outer ring
-    img[distances[1] > radius] = 0
+    img[outsideMask] = 0
         
     # apply thresh and morphology
     _, img = cv2.threshold(img, 20, 0xff, cv2.THRESH_BINARY)
     img = cv2.morphologyEx(img, cv2.MORPH_OPEN, np.ones((3,3), np.uint8))
 
+    # the votes round the pixels' distances from the origin, so the crop keeps its coordinates in the frame
+    x0, y0 = offset
+    if x0 or y0:
+        placed = np.zeros((y0 + img.shape[0], x0 + img.shape[1]), dtype=img.dtype)
+        placed[y0:, x0:] = img
+        img = placed
+
     # find the straight segments in the image
     lines = cv2.HoughLinesP(img, 1, np.pi / 180, threshold=50, minLineLength=100, maxLineGap=5)
+    if type(lines) == type(None):
+        return np.empty((0, 4), np.int32)
+
+    return lines.reshape(-1, 4) - np.int32([x0, y0, x0, y0])
+
+def emphasize_lines(img, outsideMask, offset=(0, 0)):
+    '''
+    Emphasize all of the straight lines in the image and get rid of unnecessary noise.
+
+    Parameters:
+        {Numpy.array} img - The image to edit
+        {Numpy.array} outsideMask - A boolean mask of the pixels outside of the target's outer ring
+        {Tuple} offset - The position of the image in the frame (x, y), when it's a crop of the frame
+
+    Returns:
+        {Numpy.array} An image with the lines emphasized.
+    '''
+
     img_copy = np.zeros(img.shape, dtype=img.dtype)
-    if type(lines) != type(None):
-        for line in lines:
-            for x1, y1, x2, y2 in line:
-                cv2.line(img_copy, (x1, y1), (x2, y2), (0xff,0xff,0xff), 5)
+    for x1, y1, x2, y2 in find_line_segments(img, outsideMask, offset):
+        cv2.line(img_copy, (int(x1), int(y1)), (int(x2), int(y2)), (0xff,0xff,0xff), 5)
                 
-    return radius, img_copy
+    return img_copy
+
+def reconstruct_arrow_tips(segments, bullseye, offset=(0, 0)):
+    '''
+    Reconstruct the projectiles analytically from the straight segments found in the image.
+    Each segment is oriented from its end closer to the bull'seye point (its front) to its rear,
+    collinear segments are merged into a single projectile,
+    and the front-most point along each projectile is its tip.
+
+    Parameters:
+        {Numpy.array} segments - (N,4) the segments' end points (x1, y1, x2, y2)
+        {Tuple} bullseye - (
+                              {Number} x coordinate of the bull'seye point,
+                              {Number} y coordinate of the bull'seye point
+                           )
+        {Tuple} offset - Amount of pixels to shift the resulting tips by (x, y),
+                         when the segments are found in a crop of the frame
 
-def reproduce_proj_contours(img, distances, bullseye, radius):
+    Returns:
+        {Numpy.array} (M,2) the tips of the projectiles.
+    '''
+
+    if len(segments) == 0:
+        return np.empty((0, 2), np.float64)
+
+    # orient the segments from their front towards their rear
+    ends = segments.reshape(-1, 2, 2).astype(np.float64)
+    ends_dist = np.hypot(ends[..., 0] - bullseye[0], ends[..., 1] - bullseye[1])
+    flip = ends_dist[:, 1] < ends_dist[:, 0]
+    ends[flip] = ends[flip][:, ::-1]
+    fronts, rears = ends[:, 0], ends[:, 1]
+
+    vectors = rears - fronts
+    lengths = np.maximum(np.hypot(vectors[:, 0], vectors[:, 1]), 1e-9)
+    directions = vectors / lengths[:, None]
+    middles = (fronts + rears) / 2
+
+    # two segments are collinear if they're almost parallel and each one's middle lies near the other's line
+    dx, dy = directions[:, 0], directions[:, 1]
+    sines = np.abs(dx[:, None] * dy[None, :] - dy[:, None] * dx[None, :])
+    offsets = middles[None, :, :] - middles[:, None, :]
+    line_dists = np.abs(dx[:, None] * offsets[..., 1] - dy[:, None] * offsets[..., 0])
+    line_dists = np.maximum(line_dists, line_dists.T)
+    collinear = (sines < np.sin(SEGMENT_ANGLE_TOLERANCE)) & (line_dists < SEGMENT_LINE_DISTANCE)
+
+    # label the connected groups of collinear segments with their smallest index
+    labels = np.arange(len(segments))
+    while True:
+        merged = np.where(collinear, labels[None, :], len(segments)).min(axis=1)
+        merged = np.minimum(merged, labels)
+        if np.array_equal(merged, labels):
+            break
+
+        labels = merged[merged]
+
+    tips = []
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+
+        # the longest segment leads the projectile's direction
+        direction = directions[members[np.argmax(lengths[members])]]
+        group_ends = ends[members].reshape(-1, 2)
+        tips.append(group_ends[np.argmin(group_ends @ direction)])
+
+    return np.array(tips) + np.asarray(offset, np.float64)
+
+def reproduce_proj_contours(img, outsideMask, bullseye, radius, offset=(0, 0), frameShape=None):
     '''
     Extend the emphasized lines outwards the target circle in order to restore
     the shape of the projectiles that might has been broken during the process.
 
     Parameters:
         {Numpy.array} img - The image to edit
-        {list} distances - [
-                              {List} [
-                                        {Number} x coordinate of the point,
-                                        {Number} y coordinate of the point,
-                                        {Number} The distance of the point from the bull'seye point
-                                     ]
-                              ...
-                           ]
+        {Numpy.array} outsideMask - A boolean mask of the pixels outside of the target's outer ring
         {Tuple} bullseye - (
-                              {Number} x coordinate of the bull'seye point,
-                              {Number} y coordinate of the bull'seye point
+                              {Number} x coordinate of the bull'seye point in the frame,
+                              {Number} y coordinate of the bull'seye point in the frame
                            )
         {Number} radius - The radius of the target
+        {Tuple} offset - Amount of pixels to shift the resulting contours by (x, y),
+                         when the image is a crop of the frame
+        {Tuple} frameShape - The shape of the frame the image is cropped from
+                             (the frame is assumed to end with the image if None)
 
     Returns:
         {List} A list of the projectiles' contours.
     '''
 
+    # the extensions reach up to the radius out of the image, and the whole frame would clip them at its edges:
+    # they're drawn on the image padded by that much, within the frame, to extend a crop as the whole frame would,
+    # and they're calculated in the frame's coordinates, since their rounding would change with the crop's position
+    x0, y0 = offset
+    h, w = img.shape[:2]
+    frame_h, frame_w = frameShape[:2] if frameShape is not None else (y0 + h, x0 + w)
+    margin = int(np.ceil(radius)) + cntr.EXTENSION_THICKNESS
+    left, top = max(0, x0 - margin), max(0, y0 - margin)
+    right, bottom = min(frame_w, x0 + w + margin), min(frame_h, y0 + h + margin)
+
     # detect the unconvex contours (true projectile contours)
-    contours = cv2.findContours(img, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)[-2:]
+    contours = cv2.findContours(img, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE, offset=offset)[-2:]
     # rect_contours = cntr.filter_convex_contours(contours[0])
     rect_contours = contours[0]
-    blank_img = np.zeros(img.shape, dtype=img.dtype)
+    padded_img = np.zeros((bottom - top, right - left), dtype=img.dtype)
     
     for cont in rect_contours:
-        cntr.extend_contour_line(blank_img, cont, bullseye, length=radius)
+        cntr.extend_contour_line(padded_img, cont, bullseye, length=radius, origin=(left, top))
+
+    blank_img = padded_img[y0 - top:y0 - top + h, x0 - left:x0 - left + w]
     
     # clear unnecessary noise
-    blank_img[distances[1] > radius] = 0
+    blank_img[outsideMask] = 0
     blank_img = cv2.morphologyEx(blank_img, cv2.MORPH_CLOSE, np.ones((3,3), np.uint8))
     
     # detect contours again, after the extension
-    return cv2.findContours(blank_img, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)[-2:][0]
+    return cv2.findContours(blank_img, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE, offset=offset)[-2:][0]
 
 def find_suspect_hits(contours, vertices, scale):
     '''
@@ -178,25 +296,55 @@ def find_suspect_hits(contours, vertices, scale):
     '''
 
     bullseye = vertices[5]
-    res = []
+    tips = []
     
     for cont in contours:
-        contPts = [(cont[m][0][0],cont[m][0][1]) for m in range(len(cont))]
-        point_A = contPts[0] # some random point on the contour
-
         # find the two furthest points on the contour
-        point_B = cntr.contour_distances_from(contPts, point_A)[::-1][0]
-        point_A = cntr.contour_distances_from(contPts, point_B)[::-1][0]
+        point_A, point_B = geo2D.two_sweep_pair(cont)
         
         # decide which of them is closer to the bullseye point
         A_dist = geo2D.euclidean_dist(point_A, bullseye)
         B_dist = geo2D.euclidean_dist(point_B, bullseye)
-        hit = point_A if A_dist < B_dist else point_B
+        tips.append(point_A if A_dist < B_dist else point_B)
+
+    return locate_suspect_hits(tips, vertices, scale)
+
+def locate_suspect_hits(tips, vertices, scale):
+    '''
+    Straighten the projectiles' tips according to the target's shape.
+
+    Parameters:
+        {List} tips - [
+                         {Tuple} (
+                                    {Number} x coordinate of a projectile's tip,
+                                    {Number} y coordinate of a projectile's tip
+                                 )
+                         ...
+                      ]
+        {Tuple} vertices - A, B, C, D, E vertices and the bull'seye point of the target
+        {Tuple} scale - The scale of the target (see find_suspect_hits)
+
+    Returns:
+        {List} [
+                  {Tuple} (
+                             {Number} x coordinate of the hit,
+                             {Number} y coordinate of the hit,
+                             {Number} The distance of the tip from the bull'seye point,
+                             {Tuple} The bull'seye point
+                          )
+                  ...
+               ]
+    '''
+
+    bullseye = vertices[5]
+    res = []
+
+    for hit in tips:
+        res_dist = geo2D.euclidean_dist(hit, bullseye)
 
         # straighten the target's oval and find the real hit values
         res_x = (hit[0] - vertices[0][0]) * scale[0] + vertices[0][0]
         res_y = (hit[1] - vertices[0][1]) * scale[1] + vertices[0][1]
-        res_dist = geo2D.euclidean_dist(hit, bullseye)
         res_hit = (res_x,res_y,res_dist, bullseye)
         res.append(res_hit)
 
@@ -1,4 +1,7 @@
 import redis
 
 # Initialize Redis client with Docker URL
-redis_client = redis.StrictRedis.from_url('redis://redis', decode_responses=True)
\ No newline at end of file
+redis_client = redis.StrictRedis.from_url('redis://redis', decode_responses=True)
+
+# for binary values, e.g. the chunks of live recordings
+binary_redis_client = redis.StrictRedis.from_url('redis://redis')
\ No newline at end of file
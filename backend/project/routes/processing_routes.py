@@ -5,7 +5,11 @@ from flask import Blueprint, jsonify, request
 from datetime import datetime
 from project.constants.constants import ROUND_COLLECTION
 from project.controllers.decorators import token_required
-from ..controllers.processing_controller import capture_pose_on_shot_detected, get_recording_timestamp, process_pose, process_target, save_recording_timestamp, add_manual_shot_by_id, edit_manual_shot_by_id, remove_manual_shot_by_id
+from project.core.target_scoring.AnalysisConfig import InvalidAnalysisOptionsError, validate_analysis_options
+from ..controllers.processing_controller import capture_pose_on_shot_detected, get_profiling_report, get_recording_timestamp, process_pose, process_target, save_recording_timestamp, upload_pose_videos, upload_target_videos, add_manual_shot_by_id, edit_manual_shot_by_id, remove_manual_shot_by_id
+from ..controllers.overlay_track_controller import get_overlay_track
+from ..controllers.live_scoring_controller import get_live_score
+from ..controllers.chunked_upload_controller import append_video_chunk, finalize_video_upload, start_video_upload
 from ..controllers.processing_controller_dev import capture_pose_on_shot_detected_test, process_pose_test, process_target_test
 from ..db import db
 import os
@@ -55,23 +59,84 @@ def upload_pose_video(_, round_id):
 
     return {"message": "Pose Video uploaded successfully"}, 200
 
+# Resumable uploads: start (or resume from the returned offset), send the chunks in order, then finalize.
+# The videos can be processed while their chunks are still being uploaded.
+# The target camera is not logged in, it authenticates with the upload token of the round (see start_recording).
+@processing_bp.route('/upload-target-video/<round_id>/start', methods=['POST'])
+@token_required
+def start_target_video_upload(user_id, round_id):
+    response = start_video_upload(user_id, "target", round_id)
+    
+    if response[1] == 200:
+        recording_start_timestamp = request.form.get('recording_start_timestamp', "0")
+        save_recording_timestamp(round_id, "target", recording_start_timestamp)
+    
+    return response
+
+@processing_bp.route('/upload-target-video/<round_id>/chunk', methods=['POST'])
+@token_required
+def upload_target_video_chunk(user_id, round_id):
+    return append_video_chunk(user_id, "target", round_id)
+
+@processing_bp.route('/upload-target-video/<round_id>/finalize', methods=['POST'])
+@token_required
+def finalize_target_video_upload(user_id, round_id):
+    return finalize_video_upload(user_id, "target", round_id)
+
+@processing_bp.route('/upload-pose-video/<round_id>/start', methods=['POST'])
+@token_required
+def start_pose_video_upload(user_id, round_id):
+    response = start_video_upload(user_id, "pose", round_id)
+    
+    if response[1] == 200:
+        recording_start_timestamp = request.form.get('recording_start_timestamp', "0")
+        save_recording_timestamp(round_id, "pose", recording_start_timestamp)
+    
+    return response
+
+@processing_bp.route('/upload-pose-video/<round_id>/chunk', methods=['POST'])
+@token_required
+def upload_pose_video_chunk(user_id, round_id):
+    return append_video_chunk(user_id, "pose", round_id)
+
+@processing_bp.route('/upload-pose-video/<round_id>/finalize', methods=['POST'])
+@token_required
+def finalize_pose_video_upload(user_id, round_id):
+    return finalize_video_upload(user_id, "pose", round_id)
+
 @processing_bp.route('/process-target/<round_id>', methods=['POST'])
 @token_required
 def process_target_route(_, round_id):
+    # optional per round overrides of the target analysis (sampling stride, thresholds, ...)
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        return jsonify({"error": "The request body must be an object"}), 400
+    
+    try:
+        analysis_options = validate_analysis_options(body.get('analysis_options'))
+    except InvalidAnalysisOptionsError as e:
+        return jsonify({"error": str(e)}), 400
+    
     video_timestamps = get_recording_timestamp(round_id)
     
+    # The analyses run on the CPU queue, each followed by the upload of its videos on the I/O queue
     chord_tasks = chord(
-        [process_target.s(round_id, video_timestamps), process_pose.s(round_id, video_timestamps)]
+        [process_target.s(round_id, video_timestamps, analysis_options) | upload_target_videos.s(round_id),
+         process_pose.s(round_id, video_timestamps, analysis_options) | upload_pose_videos.s(round_id)]
     )(capture_pose_on_shot_detected.s(round_id))
+    target_upload_task, pose_upload_task = chord_tasks.parent[0], chord_tasks.parent[1]
 
     task_data = {
-        "target_task_id": chord_tasks.parent[0].id,
-        "pose_task_id": chord_tasks.parent[1].id,
+        "target_task_id": target_upload_task.parent.id,
+        "pose_task_id": pose_upload_task.parent.id,
+        "target_upload_task_id": target_upload_task.id,
+        "pose_upload_task_id": pose_upload_task.id,
         "capture_task_id": chord_tasks.id,
-        "target_status": chord_tasks.parent[0].status,
-        "pose_status": chord_tasks.parent[1].status,
+        "target_status": target_upload_task.parent.status,
+        "pose_status": pose_upload_task.parent.status,
         "capture_status": chord_tasks.status,
         "start_process_at": datetime.now(timezone.utc),
+        "analysis_options": analysis_options,
     }
 
     existing_task = round_collection.find_one({"_id": ObjectId(round_id)})
@@ -95,11 +160,13 @@ def process_target_route(_, round_id):
 
     return jsonify({
         "_id": round_id,
-        "target_task_id": chord_tasks.parent[0].id,
-        "pose_task_id": chord_tasks.parent[1].id,
+        "target_task_id": target_upload_task.parent.id,
+        "pose_task_id": pose_upload_task.parent.id,
+        "target_upload_task_id": target_upload_task.id,
+        "pose_upload_task_id": pose_upload_task.id,
         "capture_task_id": chord_tasks.id,
-        "target_status": chord_tasks.parent[0].status,
-        "pose_status": chord_tasks.parent[1].status,
+        "target_status": target_upload_task.parent.status,
+        "pose_status": pose_upload_task.parent.status,
         "capture_status": chord_tasks.status,
     }), 202
     
@@ -164,4 +231,19 @@ def edit_manual_shot(_, round_id, hit_id):
 @processing_bp.route('/delete-shot/<round_id>/<hit_id>', methods=['DELETE'])
 @token_required
 def delete_manual_shot(_, round_id, hit_id):
-    return remove_manual_shot_by_id(round_id, hit_id)
\ No newline at end of file
+    return remove_manual_shot_by_id(round_id, hit_id)
+
+@processing_bp.route('/overlay-track/<round_id>/<kind>', methods=['GET'])
+@token_required
+def overlay_track(_, round_id, kind):
+    return get_overlay_track(round_id, kind)
+
+@processing_bp.route('/profiling-report/<round_id>', methods=['GET'])
+@token_required
+def profiling_report(_, round_id):
+    return get_profiling_report(round_id)
+
+@processing_bp.route('/live-score/<round_id>', methods=['GET'])
+@token_required
+def live_score(_, round_id):
+    return get_live_score(round_id)
\ No newline at end of file
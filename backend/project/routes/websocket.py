@@ -6,7 +6,7 @@ socketio = SocketIO(cors_allowed_origins="*")
 Sessions = SessionSocketController()
 
 def init_websocket(app):
-    return socketio.init_app(app)
+    return socketio.init_app(app, message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'])
 
 @socketio.on('connect')
 def handle_connect():
@@ -62,3 +62,16 @@ def target_video_upload_completed(data):
     session_id = data["sessionId"]
     round_id = data["roundId"]
     Sessions.target_upload_completed(session_id, round_id)
+
+@socketio.on("liveScoringStart")
+def start_live_scoring(data):
+    session_id = data["sessionId"]
+    round_id = data["roundId"]
+    frame_size = (int(data["frameWidth"]), int(data["frameHeight"]))
+    Sessions.start_live_scoring(session_id, round_id, frame_size, data.get("analysisOptions"))
+
+@socketio.on("targetVideoChunk")
+def target_video_chunk(data):
+    session_id = data["sessionId"]
+    round_id = data["roundId"]
+    Sessions.push_target_chunk(session_id, round_id, data["chunk"])
\ No newline at end of file
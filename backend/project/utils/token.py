@@ -14,6 +14,21 @@ def generate_token(user_id):
     except Exception as e:
         return str(e)
 
+# the subject of the tokens that only authorize the uploads of a round
+UPLOAD_SUBJECT_PREFIX = 'round:'
+
+def generate_upload_token(round_id):
+    # lets the devices of a session upload the videos of its round, e.g. the target camera that is not logged in
+    try:
+        payload = {
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1),
+            'iat': datetime.datetime.utcnow(),
+            'sub': f"{UPLOAD_SUBJECT_PREFIX}{round_id}"
+        }
+        return jwt.encode(payload, current_app.config.get('SECRET_KEY'), algorithm='HS256')
+    except Exception as e:
+        return str(e)
+
 def decode_token(bearer_token):
     try:
         token = bearer_token.split(" ")[1]
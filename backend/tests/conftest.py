@@ -0,0 +1,10 @@
+from benchmarks.synthetic_round import load_model
+import pytest
+
+@pytest.fixture(scope='session')
+def olympic_model():
+    return load_model('olympic_standard_target')
+
+@pytest.fixture(scope='session')
+def rounds_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp('rounds')
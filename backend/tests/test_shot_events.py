@@ -0,0 +1,28 @@
+'''
+Hits found within the windows of the shot events must be dated to the exact frame their projectile arrived in,
+as the dense analysis dates them.
+'''
+
+from project.core.target_scoring.VideoAnalyzer import VideoAnalyzer
+from project.core.target_scoring.AnalysisConfig import AnalysisConfig, HIT_TOLERANCE_PX
+from benchmarks.synthetic_round import FPS, generate_round
+from benchmarks.target_pipeline import frame_point, match_hits
+import pytest
+
+# rounds in which the camera shake runs into the arrivals' bursts of motion
+SYNTHETIC_SEEDS = (0, 4, 15)
+
+@pytest.mark.parametrize('seed', SYNTHETIC_SEEDS)
+def test_hits_are_dated_to_their_arrival(seed, rounds_dir, olympic_model):
+    model_data, model = olympic_model
+    video_path = str(rounds_dir / f'round_{seed}.mp4')
+    truth = generate_round(video_path, model_data, model, seed=seed)
+
+    analyzer = VideoAnalyzer(video_path, model, model_data['bullseye_point'], model_data['rings_amount'],
+                             model_data['inner_diameter_px'], AnalysisConfig({'shot_events': True}))
+    hits = analyzer.collect_hits(FPS)
+    pairs = match_hits(truth['arrows'], [frame_point(hit, analyzer) for hit in hits], HIT_TOLERANCE_PX)
+
+    assert len(hits) == len(truth['arrows'])
+    assert [hits[index].frame_count if index is not None else None for _, index in pairs] == \
+           [arrow['frame'] for arrow, _ in pairs]
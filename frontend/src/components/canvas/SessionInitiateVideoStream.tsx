@@ -3,7 +3,7 @@ import { QRCodeSVG } from "qrcode.react";
 import { Keypoint, PoseDetector } from "@tensorflow-models/pose-detection";
 import * as poseDetection from "@tensorflow-models/pose-detection";
 import * as tf from "@tensorflow/tfjs";
-import axios from "axios";
+import { uploadVideoInChunks } from "@/services/chunkedUpload";
 import { Play, Square } from "lucide-react";
 import { db } from "@/services/fireStore";
 import {
@@ -214,19 +214,11 @@ export const SessionInitiateVideoStream = (
     const uploadVideoBlob = async () => {
       // Upload video
       if (videoBlob && roundData && isCameraConnected) {
-        const formData = new FormData();
-        formData.append("video", videoBlob, `session_${session._id}.webm`);
-        formData.append("recording_start_timestamp", `${recordingTimestamp}`);
-
-        await axios.post(
+        await uploadVideoInChunks(
           `${BASE_BACKEND_URL}/upload-pose-video/${roundData?._id}`,
-          formData,
-          {
-            headers: {
-              Authorization: `Bearer ${user?.token || ""}`,
-              "Content-Type": "multipart/form-data",
-            },
-          },
+          videoBlob,
+          recordingTimestamp,
+          { Authorization: `Bearer ${user?.token || ""}` },
         );
         setUploadedPoseVideos((prev) => [...prev, roundData?._id]);
         setRoundData(null);
@@ -10,7 +10,7 @@ import {
 } from "firebase/firestore";
 import { db } from "@/services/fireStore";
 import { socket } from "@/services/socket";
-import axios from "axios";
+import { uploadVideoInChunks } from "@/services/chunkedUpload";
 import { BASE_BACKEND_URL } from "@/services/baseUrl";
 import { QuestionMarkCircledIcon } from "@radix-ui/react-icons";
 import { Button } from "@/components/ui/button";
@@ -38,6 +38,8 @@ export const JoinSession = () => {
   const [sessionReady, setSessionReady] = useState<boolean>(false);
   const [isSessionNotFound, setIsSessionNotFound] = useState<boolean>(false);
   const [roundId, setRoundId] = useState<string | null>(null);
+  // authorizes the uploads of the round, this device is not logged in
+  const [uploadToken, setUploadToken] = useState<string | null>(null);
   const [uploadingStatus, setUploadingStatus] = useState<
     Record<string, number>
   >({});
@@ -48,14 +50,24 @@ export const JoinSession = () => {
   const sessionId = new URLSearchParams(location.search).get("session");
 
   // Start recording the media stream
-  const startRecording = useCallback(() => {
+  const startRecording = useCallback((liveRoundId: string) => {
     if (localVideoRef.current && !isRecording) {
       const stream = localVideoRef.current.srcObject as MediaStream;
       const recorder = new MediaRecorder(stream);
       const chunks: BlobPart[] = [];
+      const { width, height } = stream.getVideoTracks()[0].getSettings();
+      // keeps the chunks in order while they are converted
+      let liveChunks = Promise.resolve();
 
       recorder.ondataavailable = (event) => {
         chunks.push(event.data);
+        liveChunks = liveChunks.then(async () => {
+          socket.emit("targetVideoChunk", {
+            sessionId,
+            roundId: liveRoundId,
+            chunk: await event.data.arrayBuffer(),
+          });
+        });
       };
 
       recorder.onstop = () => {
@@ -67,11 +79,18 @@ export const JoinSession = () => {
         setRecordingTimestamp(Date.now());
       };
 
-      recorder.start();
+      // the target is scored while recording, from one second chunks
+      socket.emit("liveScoringStart", {
+        sessionId,
+        roundId: liveRoundId,
+        frameWidth: width,
+        frameHeight: height,
+      });
+      recorder.start(1000);
       setMediaRecorder(recorder);
       setIsRecording(true);
     }
-  }, [isRecording]);
+  }, [isRecording, sessionId]);
 
   // Stop recording and handle the video blob
   const stopRecording = useCallback(() => {
@@ -193,8 +212,9 @@ export const JoinSession = () => {
 
   useEffect(() => {
     socket.on("recordingStarted", (data: { round_data: Round }) => {
-      startRecording();
+      startRecording(data.round_data._id);
       setRoundId(data.round_data._id);
+      setUploadToken(data.round_data.upload_token || null);
     });
 
     socket.on("recordingStopped", () => {
@@ -206,33 +226,21 @@ export const JoinSession = () => {
     const uploadVideoBlob = async () => {
       // Upload video
       if (videoBlob && roundId) {
-        const formData = new FormData();
-        formData.append("video", videoBlob, `session_${sessionId}.webm`);
-        formData.append("recording_start_timestamp", `${recordingTimestamp}`);
-
-        await axios.post(
+        // uploaded in chunks, a flaky connection resumes instead of starting over
+        await uploadVideoInChunks(
           `${BASE_BACKEND_URL}/upload-target-video/${roundId}`,
-          formData,
-          {
-            headers: {
-              "Content-Type": "multipart/form-data",
-            },
-            onUploadProgress: (progressEvent) => {
-              const totalLength = progressEvent.total;
-              if (totalLength) {
-                const progress = Math.round(
-                  (progressEvent.loaded * 100) / totalLength
-                );
-                setUploadingStatus((prev) => ({
-                  ...prev,
-                  [roundId]: progress,
-                }));
-                socket.emit("targetVideoUploadProgress", {
-                  sessionId,
-                  uploadingStatus: { roundId, progress },
-                });
-              }
-            },
+          videoBlob,
+          recordingTimestamp,
+          { Authorization: `Bearer ${uploadToken || ""}` },
+          (progress) => {
+            setUploadingStatus((prev) => ({
+              ...prev,
+              [roundId]: progress,
+            }));
+            socket.emit("targetVideoUploadProgress", {
+              sessionId,
+              uploadingStatus: { roundId, progress },
+            });
           }
         );
 
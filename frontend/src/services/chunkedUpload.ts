@@ -0,0 +1,64 @@
+import axios from "axios";
+
+const CHUNK_SIZE = 1024 * 1024;
+const MAX_RETRIES = 5;
+const RETRY_DELAY_MS = 2000;
+
+const sha256 = async (data: ArrayBuffer) => {
+  const digest = await crypto.subtle.digest("SHA-256", data);
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, "0"))
+    .join("");
+};
+
+const wait = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Upload a video in chunks, resuming from the offset the server received after a failed chunk.
+// uploadUrl is the upload route of the round, e.g. `${BASE_BACKEND_URL}/upload-target-video/${roundId}`
+export const uploadVideoInChunks = async (
+  uploadUrl: string,
+  video: Blob,
+  recordingTimestamp: number,
+  headers: Record<string, string> = {},
+  onProgress?: (progress: number) => void
+) => {
+  const startForm = new FormData();
+  startForm.append("recording_start_timestamp", `${recordingTimestamp}`);
+  const started = await axios.post(`${uploadUrl}/start`, startForm, { headers });
+
+  let offset: number = started.data.offset;
+  let retries = 0;
+
+  while (!started.data.complete && offset < video.size) {
+    const chunk = await video.slice(offset, offset + CHUNK_SIZE).arrayBuffer();
+    try {
+      const response = await axios.post(`${uploadUrl}/chunk`, chunk, {
+        headers: {
+          ...headers,
+          "Content-Type": "application/octet-stream",
+          "Upload-Offset": `${offset}`,
+          "Upload-Checksum": await sha256(chunk),
+        },
+      });
+      offset = response.data.offset;
+      retries = 0;
+      onProgress?.(Math.round((offset * 100) / video.size));
+    } catch (error) {
+      if (!axios.isAxiosError(error) || retries >= MAX_RETRIES) {
+        throw error;
+      }
+      retries += 1;
+
+      // continue from the bytes the server has, or retry the chunk after a network failure
+      if (error.response?.data?.offset !== undefined) {
+        offset = error.response.data.offset;
+      } else {
+        await wait(RETRY_DELAY_MS);
+      }
+    }
+  }
+
+  const finalizeForm = new FormData();
+  finalizeForm.append("size", `${video.size}`);
+  await axios.post(`${uploadUrl}/finalize`, finalizeForm, { headers });
+};
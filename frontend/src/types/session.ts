@@ -39,8 +39,10 @@ export interface Round {
   _id: string;
   created_at: string;
   session_id: string;
+  upload_token?: string;
   pose_status: string;
   pose_task_id?: string;
+  pose_upload_task_id?: string;
   capture_task_id?: string;
   pose_video?: MediaVideo[];
   pose_video_raw?: MediaVideo[];
@@ -48,6 +50,7 @@ export interface Round {
   target_status: string;
   capture_status: string;
   target_task_id?: string;
+  target_upload_task_id?: string;
   target_video?: MediaVideo[];
   target_video_raw?: MediaVideo[];
   target_error_message?: string;